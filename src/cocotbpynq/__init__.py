@@ -16,12 +16,25 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-from .buffer import allocate
+from .buffer import allocate, ddr, PynqBuffer
+from .axi_memory import AxiMemorySlave
 from .dma import DMA
 from .mmio import MMIO
-from .overlay import DefaultIP, Overlay, hwh_tree, cptop
+from .interrupt import Interrupt
+from . import overlay
+from .overlay import DefaultIP, Overlay, SimulatedDesign
 from .dut import CocotbPynqDut
-from .simulator import synctest, argv
+from .profiler import profiler
+from .recorder import recorder, replay, load_trace
+from .waves import waves
+from . import checkpoint
+from .simulator import synctest, argv, flush, flush_async, set_posted_writes
+
+def __getattr__(name):
+    # Read from overlay on access, as they change with every Overlay loaded
+    if name in ("hwh_tree", "hwh_design", "cptop"):
+        return getattr(overlay, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class PL:
     def reset(self):
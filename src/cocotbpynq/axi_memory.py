@@ -0,0 +1,183 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cocotb
+from cocotb.queue import Queue
+from cocotb.triggers import RisingEdge, ReadOnly
+from .buffer import ddr
+
+AXI_OKAY = 0b00
+AXI_SLVERR = 0b10
+
+BURST_FIXED = 0b00
+BURST_INCR = 0b01
+BURST_WRAP = 0b10
+
+class AxiMemorySlave:
+    """
+    AXI4 slave serving a DUT master bus interface (e.g. an HLS m_axi port)
+    out of the simulated DDR that allocate() buffers live in.
+
+    Reads and writes go straight to the buffers' memory, so data written by
+    the DUT is visible in the numpy arrays the test holds and vice versa.
+    Each channel runs in its own coroutine: up to `max_outstanding` read
+    bursts and `max_outstanding` write bursts are accepted ahead of their data,
+    and read data streams one beat per cycle while further addresses are
+    taken. Bursts are answered in order, which AXI4 permits for any IDs.
+    Accesses outside every live buffer get SLVERR.
+
+    Parameters
+    ----------
+    cpbus : CocotbPynqBusInterface
+        AXI4 master bus interface of the DUT
+    memory : SimulatedDDR
+        Address space to serve
+    max_outstanding : int
+        Number of read bursts, and separately write bursts, in flight
+    """
+    def __init__(self, cpbus, memory=ddr, max_outstanding=8):
+        if max_outstanding < 1:
+            raise ValueError("max_outstanding must be at least 1.")
+        self.cpbus = cpbus
+        self.memory = memory
+        self.max_outstanding = max_outstanding
+        data = cpbus.RDATA if hasattr(cpbus, "RDATA") else cpbus.WDATA
+        self.data_bytes = len(data) // 8
+        self._write_slots = Queue(maxsize=max_outstanding)
+        self._read_slots = Queue(maxsize=max_outstanding)
+        self._write_bursts, self._write_responses = Queue(), Queue()
+        self._read_bursts = Queue()
+        if hasattr(cpbus, "AWVALID"):
+            cpbus.AWREADY.value = 0b0
+            cpbus.WREADY.value = 0b0
+            cpbus.BVALID.value = 0b0
+            cocotb.start_soon(self._accept_address("AW", self._write_slots, self._write_bursts))
+            cocotb.start_soon(self._write_data())
+            cocotb.start_soon(self._write_response())
+        if hasattr(cpbus, "ARVALID"):
+            cpbus.ARREADY.value = 0b0
+            cpbus.RVALID.value = 0b0
+            cocotb.start_soon(self._accept_address("AR", self._read_slots, self._read_bursts))
+            cocotb.start_soon(self._read_data())
+
+    def _sample_address(self, channel):
+        """(id, beat addresses) of the request on the AW or AR channel"""
+        cpbus = self.cpbus
+        address = int(getattr(cpbus, channel + "ADDR").value)
+        length = int(getattr(cpbus, channel + "LEN").value) if hasattr(cpbus, channel + "LEN") else 0
+        size = int(getattr(cpbus, channel + "SIZE").value) if hasattr(cpbus, channel + "SIZE") else self.data_bytes.bit_length() - 1
+        burst = int(getattr(cpbus, channel + "BURST").value) if hasattr(cpbus, channel + "BURST") else BURST_INCR
+        txn_id = int(getattr(cpbus, channel + "ID").value) if hasattr(cpbus, channel + "ID") else 0
+        return txn_id, _beat_addresses(address, length, 1 << size, burst)
+
+    async def _accept_address(self, channel, slots, bursts):
+        """Take addresses on AW or AR while fewer than max_outstanding bursts are in flight"""
+        await self.cpbus.cpdut.await_reset()
+        valid, ready = getattr(self.cpbus, channel + "VALID"), getattr(self.cpbus, channel + "READY")
+        clk_edge, settled = RisingEdge(self.cpbus.clock.signal), ReadOnly()
+        while True:
+            if slots.full():
+                ready.value = 0b0
+            await slots.put(None)
+            ready.value = 0b1
+            await settled
+            while not valid.value:
+                await clk_edge
+                await settled
+            bursts.put_nowait(self._sample_address(channel))
+            await clk_edge
+
+    async def _write_data(self):
+        """Accept W beats for each address taken on AW, in order"""
+        cpbus = self.cpbus
+        clk_edge, settled = RisingEdge(cpbus.clock.signal), ReadOnly()
+        has_strb = hasattr(cpbus, "WSTRB")
+        while True:
+            if self._write_bursts.empty():
+                cpbus.WREADY.value = 0b0
+            txn_id, addresses = await self._write_bursts.get()
+            cpbus.WREADY.value = 0b1
+            response = AXI_OKAY
+            for address in addresses:
+                await settled
+                while not cpbus.WVALID.value:
+                    await clk_edge
+                    await settled
+                window = address - address % self.data_bytes
+                strb = int(cpbus.WSTRB.value) if has_strb else None
+                if not self.memory.write(window, self.data_bytes, int(cpbus.WDATA.value), strb):
+                    response = AXI_SLVERR
+                await clk_edge
+            self._write_responses.put_nowait((txn_id, response))
+
+    async def _write_response(self):
+        """Return a B response per completed write burst, freeing its slot once accepted"""
+        cpbus = self.cpbus
+        clk_edge, settled = RisingEdge(cpbus.clock.signal), ReadOnly()
+        while True:
+            if self._write_responses.empty():
+                cpbus.BVALID.value = 0b0
+            txn_id, response = await self._write_responses.get()
+            if hasattr(cpbus, "BID"):
+                cpbus.BID.value = txn_id
+            if hasattr(cpbus, "BRESP"):
+                cpbus.BRESP.value = response
+            cpbus.BVALID.value = 0b1
+            await settled
+            while not cpbus.BREADY.value:
+                await clk_edge
+                await settled
+            await clk_edge
+            self._write_slots.get_nowait()
+
+    async def _read_data(self):
+        """Stream R beats for each address taken on AR, one beat per cycle while RREADY is high"""
+        cpbus = self.cpbus
+        clk_edge, settled = RisingEdge(cpbus.clock.signal), ReadOnly()
+        has_id, has_resp = hasattr(cpbus, "RID"), hasattr(cpbus, "RRESP")
+        while True:
+            if self._read_bursts.empty():
+                cpbus.RVALID.value = 0b0
+            txn_id, addresses = await self._read_bursts.get()
+            if has_id:
+                cpbus.RID.value = txn_id
+            last = len(addresses) - 1
+            for beat, address in enumerate(addresses):
+                data, ok = self.memory.read(address - address % self.data_bytes, self.data_bytes)
+                cpbus.RDATA.value = data
+                if has_resp:
+                    cpbus.RRESP.value = AXI_OKAY if ok else AXI_SLVERR
+                cpbus.RLAST.value = int(beat == last)
+                cpbus.RVALID.value = 0b1
+                await settled
+                while not cpbus.RREADY.value:
+                    await clk_edge
+                    await settled
+                await clk_edge
+            self._read_slots.get_nowait()
+
+
+def _beat_addresses(address, length, size, burst):
+    """Start address of each of the length+1 beats of a burst of `size` byte transfers"""
+    if burst == BURST_FIXED:
+        return [address] * (length + 1)
+    aligned = address - address % size
+    if burst == BURST_WRAP:
+        total = size * (length + 1)
+        lower = address - address % total
+        return [address] + [lower + (aligned - lower + beat * size) % total for beat in range(1, length + 1)]
+    return [address] + [aligned + beat * size for beat in range(1, length + 1)]
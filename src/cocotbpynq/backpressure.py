@@ -0,0 +1,203 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from fractions import Fraction
+from itertools import product
+import random
+from cocotb.utils import get_sim_time as gst
+from .profiler import profiler
+
+class Backpressure:
+    """
+    Per-cycle activity pattern for a DMA channel: `active()` is called once
+    per clock cycle the channel is streaming and says whether it may move a
+    beat in that cycle.
+    Subclasses restart their pattern (and random seed) on `reset()`.
+    """
+    def reset(self):
+        return
+
+    def active(self):
+        return True
+
+    def __repr__(self):
+        return "FullRate()"
+
+
+class Pattern(Backpressure):
+    """Repeats a fixed sequence of active (truthy) and idle cycles"""
+    def __init__(self, pattern):
+        self.pattern = [bool(cycle) for cycle in pattern]
+        if not any(self.pattern):
+            raise ValueError("A backpressure pattern needs at least one active cycle")
+        self.reset()
+
+    def reset(self):
+        self._position = 0
+
+    def active(self):
+        active = self.pattern[self._position]
+        self._position = (self._position + 1) % len(self.pattern)
+        return active
+
+    def __repr__(self):
+        return f"Pattern({''.join(str(int(cycle)) for cycle in self.pattern)})"
+
+
+class BurstIdle(Pattern):
+    """`burst` active cycles followed by `idle` idle cycles, repeated"""
+    def __init__(self, burst, idle):
+        self.burst, self.idle = burst, idle
+        super().__init__([1] * burst + [0] * idle)
+
+    def __repr__(self):
+        return f"BurstIdle({self.burst}, {self.idle})"
+
+
+class DutyCycle(Pattern):
+    """
+    Active for exactly a `duty` fraction of every `period` cycles, spread
+    evenly over the period. Without a period, the shortest one (up to
+    `max_period`) that represents `duty` exactly is used, e.g. 100 for 0.01
+    and 3 for 1/3. A duty that cannot be represented raises ValueError
+    rather than being rounded.
+    """
+    def __init__(self, duty, period=None, max_period=1024):
+        if not 0 < duty <= 1:
+            raise ValueError("duty must be in (0, 1]")
+        fraction = Fraction(duty).limit_denominator(max_period)
+        if abs(float(fraction) - duty) > 1e-9 * duty:
+            raise ValueError(f"duty {duty} is not a fraction of a period of at most {max_period} cycles")
+        if period is None:
+            period = fraction.denominator
+        active = fraction * period
+        if active.denominator != 1:
+            raise ValueError(f"duty {duty} cannot be applied over a period of {period} cycles")
+        active = int(active)
+        self.duty, self.period = duty, period
+        super().__init__([(i + 1) * active // period - i * active // period for i in range(period)])
+
+    def __repr__(self):
+        return f"DutyCycle({self.duty}, {self.period})"
+
+
+class RandomStall(Backpressure):
+    """Active with probability `duty` on each cycle, from a seeded generator so runs repeat exactly"""
+    def __init__(self, duty, seed=0):
+        if not 0 < duty <= 1:
+            raise ValueError("duty must be in (0, 1]")
+        self.duty, self.seed = duty, seed
+        self.reset()
+
+    def reset(self):
+        self._random = random.Random(self.seed)
+
+    def active(self):
+        return self._random.random() < self.duty
+
+    def __repr__(self):
+        return f"RandomStall({self.duty}, seed={self.seed})"
+
+
+def grid(**axes):
+    """Cartesian product of per-channel settings, e.g. grid(send=[None, DutyCycle(0.5)], recv=[...])"""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in product(*(axes[name] for name in names))]
+
+
+def sweep(transfer, channels, points, repeats=1):
+    """
+    Rerun a transfer for every point of a grid of backpressure settings.
+
+    Call from a synctest. For each point the models are (re)applied to the
+    named channels, `transfer()` is run (it must start the DMA transfers and
+    wait for them, e.g. send, receive, wait both) and the profiler records
+    it produced are reduced to throughput and latency.
+
+    Parameters
+    ----------
+    transfer : callable
+        Blocking function performing one measured run
+    channels : dict
+        Name -> DMA_Channel, e.g. {"send": dma.sendchannel, "recv": dma.recvchannel}
+    points : list
+        Dicts of name -> Backpressure (or None for full rate), e.g. from `grid`
+    repeats : int
+        Runs per point; results are averaged
+
+    Returns
+    -------
+    list : one dict per point with its settings, elapsed cycles, latency in
+        cycles and board microseconds, and per-channel bytes, bytes/cycle and MB/s
+    """
+    was_enabled, kept_records = profiler.enabled, profiler.records
+    results = []
+    try:
+        profiler.enabled = True
+        for point in points:
+            elapsed = 0
+            runs = []
+            for _ in range(repeats):
+                for name, channel in channels.items():
+                    channel.set_backpressure(point.get(name))
+                profiler.records = []
+                start_step = gst("step")
+                transfer()
+                elapsed += gst("step") - start_step
+                runs.append(profiler.records)
+            results.append(_reduce_point(point, channels, runs, elapsed / repeats))
+    finally:
+        for channel in channels.values():
+            channel.set_backpressure(None)
+        profiler.enabled, profiler.records = was_enabled, kept_records
+    return results
+
+
+def _reduce_point(point, channels, runs, elapsed_steps):
+    clock = next(iter(channels.values())).cpbus.clock
+    result = {
+        "settings": {name: repr(point.get(name) or Backpressure()) for name in channels},
+        "elapsed_cycles": elapsed_steps / clock.period,
+        "latency_us": clock.cycles_to_seconds(elapsed_steps / clock.period) * 1e6,
+    }
+    for name, channel in channels.items():
+        track = f"{channel.cpbus.cpdut.instance_name}.{channel.cpbus.portname}"
+        records = [txn for run in runs for txn in run if txn.channel == track]
+        nbytes = sum(txn.nbytes for txn in records) / len(runs)
+        cycles = sum(txn.cycles for txn in records) / len(runs)
+        result[name] = {
+            "bytes": nbytes,
+            "cycles": cycles,
+            "dut_stall_cycles": sum(txn.dut_stall for txn in records) / len(runs),
+            "bytes_per_cycle": nbytes / cycles if cycles else 0.0,
+            "MBps": nbytes / channel.cpbus.clock.cycles_to_seconds(cycles) / 1e6 if cycles else 0.0,
+        }
+    return result
+
+
+def format_sweep(results):
+    """Sweep results as a text table"""
+    if not results:
+        return ""
+    names = list(results[0]["settings"])
+    header = " ".join(f"{name:<24}" for name in names) + f" {'cycles':>10} {'lat. us':>9}" + "".join(f" {name + ' B/cyc':>12} {name + ' stall':>12}" for name in names)
+    lines = [header, "-" * len(header)]
+    for result in results:
+        line = " ".join(f"{result['settings'][name]:<24}" for name in names) + f" {result['elapsed_cycles']:>10.0f} {result['latency_us']:>9.2f}"
+        line += "".join(f" {result[name]['bytes_per_cycle']:>12.3f} {result[name]['dut_stall_cycles']:>12.0f}" for name in names)
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Driver hot-path benchmarks on the bundled poly sample.
+
+    python3 -m cocotbpynq.bench --output bench.json
+
+Builds the sample design, runs the DMA, MMIO and Overlay workloads in
+workloads.py under the simulator, times HWH loading on synthetic HWH files
+outside of it, and writes everything as one JSON document.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+import cocotb
+from cocotbpynq import hwh
+from cocotbpynq.runner import run
+from cocotbpynq.bench.rss import peak_rss_kb, reset_peak_rss
+from cocotbpynq.bench.synthetic import make_synthetic_hwh
+
+sampledir = Path(__file__).resolve().parent.parent / "sample"
+
+def hwh_load_workload(hwh_name):
+    """Time a cold parse and a cache hit of one HWH"""
+    rss_reset = reset_peak_rss()
+    size = os.path.getsize(hwh_name)
+    start = time.perf_counter()
+    design = hwh.parse_hwh(hwh_name)
+    parse_time = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["COCOTBPYNQ_CACHE_DIR"] = cache_dir
+        hwh._loaded.clear()
+        hwh.load_hwh(hwh_name) # populates the on-disk cache
+        hwh._loaded.clear()
+        start = time.perf_counter()
+        hwh.load_hwh(hwh_name)
+        cached_time = time.perf_counter() - start
+        del os.environ["COCOTBPYNQ_CACHE_DIR"]
+    return {
+        "workload": "hwh_load",
+        "params": {"hwh": os.path.basename(hwh_name), "bytes": size, "modules": len(design.modules)},
+        "wall_s": parse_time,
+        "cached_wall_s": cached_time,
+        "peak_rss_kb": peak_rss_kb() if rss_reset else None,
+    }
+
+def hwh_load_workloads(hwh_names):
+    return [hwh_load_workload(hwh_name) for hwh_name in hwh_names]
+
+def main():
+    parser = argparse.ArgumentParser(prog="python3 -m cocotbpynq.bench", description=__doc__.splitlines()[1])
+    parser.add_argument("--output", default="bench.json", help="JSON file to write results to")
+    parser.add_argument("--simulator", default="verilator")
+    parser.add_argument("--sizes", default="64,1024,16384", help="comma-separated DMA transfer sizes in words")
+    parser.add_argument("--mmio-ops", type=int, default=1000, help="MMIO accesses per storm")
+    parser.add_argument("--overlay-ips", default="100,1000", help="comma-separated IP counts of synthetic HWH files")
+    parser.add_argument("--profile", default="perf", help="build profile, see cocotbpynq.runner.PROFILES")
+    parser.add_argument("--threads", type=int, default=1, help="Verilator threads in the perf profile")
+    parser.add_argument("--workdir", help="directory the simulator runs in (results.xml, logs), a temporary one by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as hwh_dir:
+        workdir = Path(args.workdir or os.path.join(hwh_dir, "sim")).resolve()
+        workdir.mkdir(parents=True, exist_ok=True)
+        shutil.copy(sampledir / "sample.hwh", hwh_dir)
+        synthetic_bitfiles = []
+        for num_ips in [int(n) for n in args.overlay_ips.split(",") if n]:
+            make_synthetic_hwh(sampledir / "sample.hwh", os.path.join(hwh_dir, f"synthetic_{num_ips}.hwh"), num_ips)
+            synthetic_bitfiles.append(f"synthetic_{num_ips}.bit")
+        results = hwh_load_workloads([os.path.join(hwh_dir, Path(bitfile).stem + ".hwh") for bitfile in synthetic_bitfiles])
+
+        results_name = os.path.join(hwh_dir, "results.jsonl")
+        run(
+            test_module=["cocotbpynq.bench.workloads"],
+            sources=[sampledir / "poly_axi.v", sampledir / "poly_AXILiteS_s_axi.v"],
+            hwh_name=os.path.join(hwh_dir, "sample.hwh"),
+            test_dir=workdir,
+            simulator=args.simulator,
+            profile=args.profile,
+            threads=args.threads,
+            extra_env={
+                "COCOTBPYNQ_CACHE_DIR": os.path.join(hwh_dir, "cache"),
+                "COCOTBPYNQ_BENCH_RESULTS": results_name,
+                "COCOTBPYNQ_BENCH_SIZES": args.sizes,
+                "COCOTBPYNQ_BENCH_MMIO_OPS": str(args.mmio_ops),
+                "COCOTBPYNQ_BENCH_OVERLAYS": ",".join(synthetic_bitfiles),
+            }
+        )
+        if os.path.isfile(results_name):
+            with open(results_name) as results_file:
+                results += [json.loads(line) for line in results_file]
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cocotb": cocotb.__version__,
+            "simulator": args.simulator,
+            "profile": args.profile,
+            "argv": sys.argv[1:],
+        },
+        "workloads": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    for result in results:
+        print(f"{result['workload']:<22} {json.dumps(result['params']):<50} {result['wall_s']:.4f} s")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+def reset_peak_rss():
+    """
+    Restart the kernel's peak RSS count (Linux only), so `peak_rss_kb` covers
+    only what runs next. getrusage's ru_maxrss cannot be reset and is even
+    inherited across fork and exec, so it would report the largest earlier
+    workload instead.
+
+    Returns
+    -------
+    bool : whether the count was reset
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_kb():
+    """Peak RSS (VmHWM) in kB since the last reset, or None if it cannot be read"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
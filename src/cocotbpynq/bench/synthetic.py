@@ -0,0 +1,68 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import copy
+from xml.etree import ElementTree
+
+def make_synthetic_hwh(src_hwh, dst_hwh, num_modules, template_instance="poly_eval_axi_dma"):
+    """
+    Write a copy of src_hwh padded with num_modules extra addressable IPs.
+
+    Each extra IP is a copy of template_instance with its own INSTANCE,
+    FULLNAME, BUSNAMEs and a MEMRANGE in the processing system's memory map,
+    so it shows up in Overlay's hierarchy exactly like a real IP would.
+
+    Parameters
+    ----------
+    src_hwh : str
+        HWH to extend (e.g. the sample's sample.hwh)
+    dst_hwh : str
+        Path of the synthetic HWH to write
+    num_modules : int
+        Number of IPs to add
+    template_instance : str
+        INSTANCE of the module to replicate
+    """
+    tree = ElementTree.parse(src_hwh)
+    modules_el = tree.getroot().find("./MODULES")
+    template_el = modules_el.find(f"./MODULE[@INSTANCE='{template_instance}']")
+    processing_system_el = modules_el.find("./MODULE[@MODTYPE='processing_system7']")
+    memorymap_el = processing_system_el.find("./MEMORYMAP")
+    for i in range(num_modules):
+        instance = f"bench_ip_{i}"
+        module_el = copy.deepcopy(template_el)
+        module_el.set("INSTANCE", instance)
+        module_el.set("FULLNAME", f"/bench/ip_{i}")
+        for bus_interface_el in module_el.findall("./BUSINTERFACES/BUSINTERFACE"):
+            bus_interface_el.set("BUSNAME", f"{bus_interface_el.get('BUSNAME')}_{instance}")
+        modules_el.append(module_el)
+        base = 0x80000000 + (i << 16)
+        ElementTree.SubElement(memorymap_el, "MEMRANGE", {
+            "ADDRESSBLOCK": "Reg",
+            "BASENAME": "C_BASEADDR",
+            "BASEVALUE": hex(base),
+            "HIGHNAME": "C_HIGHADDR",
+            "HIGHVALUE": hex(base + 0xFFFF),
+            "INSTANCE": instance,
+            "IS_DATA": "TRUE",
+            "IS_INSTRUCTION": "TRUE",
+            "MASTERBUSINTERFACE": "M_AXI_GP0",
+            "MEMTYPE": "REGISTER",
+            "SLAVEBUSINTERFACE": "S_AXI_LITE",
+        })
+    tree.write(dst_hwh, encoding="UTF-8", xml_declaration=True)
@@ -0,0 +1,151 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""cocotb test module run by `python -m cocotbpynq.bench`; each workload appends JSON lines to COCOTBPYNQ_BENCH_RESULTS"""
+
+import json
+import os
+from time import perf_counter
+import numpy as np
+import cocotb
+from cocotb.utils import get_sim_time as gst
+import cocotbpynq
+from cocotbpynq import Overlay, MMIO, allocate
+from cocotbpynq.bench.rss import peak_rss_kb, reset_peak_rss
+
+IP_BASE_ADDRESS = 0x43C10000
+ADDRESS_RANGE = 0x1000
+# poly's data registers a, b and c (0x10, 0x18, 0x20) as one register block
+DATA_WINDOW = 0x10
+DATA_WINDOW_WORDS = 5
+DMA_SIZES = [int(size) for size in os.getenv("COCOTBPYNQ_BENCH_SIZES", "64,1024,16384").split(",")]
+MMIO_OPS = int(os.getenv("COCOTBPYNQ_BENCH_MMIO_OPS", "1000"))
+OVERLAY_BITFILES = [name for name in os.getenv("COCOTBPYNQ_BENCH_OVERLAYS", "").split(",") if name]
+
+
+class Measurement:
+    """
+    Context manager timing one workload: wall time, sim cycles, simulator
+    callbacks into Python and peak RSS (None where it cannot be measured
+    per workload, see `reset_peak_rss`).
+
+    Callbacks are counted by wrapping the scheduler's trigger entry point,
+    which is private cocotb API and only acceptable in a benchmark.
+    """
+    def __init__(self, name, clk_period, **params):
+        self.name = name
+        self.clk_period = clk_period
+        self.params = params
+        self.beats = 0
+        self.callbacks = 0
+
+    def _count(self, trigger):
+        self.callbacks += 1
+        self._react(trigger)
+
+    def __enter__(self):
+        self._react = cocotb.scheduler._react
+        cocotb.scheduler._react = self._count
+        self.rss_reset = reset_peak_rss()
+        self.start_step = gst("step")
+        self.wall_start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = perf_counter() - self.wall_start
+        sim_cycles = (gst("step") - self.start_step) // self.clk_period if self.clk_period else None
+        del cocotb.scheduler._react
+        result = {
+            "workload": self.name,
+            "params": self.params,
+            "wall_s": wall,
+            "sim_cycles": sim_cycles,
+            "beats": self.beats,
+            "callbacks": self.callbacks,
+            "callbacks_per_beat": self.callbacks / self.beats if self.beats else None,
+            "beats_per_s": self.beats / wall if wall else None,
+            "peak_rss_kb": peak_rss_kb() if self.rss_reset else None,
+        }
+        results_name = os.getenv("COCOTBPYNQ_BENCH_RESULTS")
+        if results_name:
+            with open(results_name, "a") as results_file:
+                results_file.write(json.dumps(result) + "\n")
+        return False
+
+
+def dma_transfers(dut=None):
+    overlay = Overlay("./sample.bit")
+    dma = overlay.poly_eval.axi_dma
+    clk_period = cocotbpynq.overlay.cptop.clk_period
+    mmio = MMIO(IP_BASE_ADDRESS, ADDRESS_RANGE)
+    mmio.write(0x10, 1)
+    mmio.write(0x18, 2)
+    mmio.write(0x20, 3)
+    for size in DMA_SIZES:
+        in_buffer = allocate(shape=(size,), dtype=np.uint32)
+        out_buffer = allocate(shape=(size,), dtype=np.uint32)
+        in_buffer[:] = np.arange(size, dtype=np.uint32) % 1024
+        with Measurement("dma_transfer", clk_period, words=size) as measurement:
+            dma.recvchannel.transfer(out_buffer)
+            dma.sendchannel.transfer(in_buffer)
+            dma.sendchannel.wait()
+            dma.recvchannel.wait()
+            measurement.beats = size
+        assert (out_buffer == in_buffer*in_buffer + 2*in_buffer + 3).all()
+
+
+def mmio_storm(dut=None):
+    Overlay("./sample.bit")
+    mmio = MMIO(IP_BASE_ADDRESS, ADDRESS_RANGE)
+    clk_period = cocotbpynq.overlay.cptop.clk_period
+    registers = [0x10, 0x18, 0x20]
+    with Measurement("mmio_write", clk_period, ops=MMIO_OPS) as measurement:
+        for i in range(MMIO_OPS):
+            mmio.write(registers[i % 3], i)
+        measurement.beats = MMIO_OPS
+    with Measurement("mmio_read", clk_period, ops=MMIO_OPS) as measurement:
+        for i in range(MMIO_OPS):
+            mmio.read(registers[i % 3])
+        measurement.beats = MMIO_OPS
+    # Blocks only cover the a/b/c data window (0x10-0x23, the gaps are unmapped), never the
+    # control registers at 0x0-0x0C, so the kernel is not started by the benchmark
+    blocks = MMIO_OPS // DATA_WINDOW_WORDS
+    block = np.arange(DATA_WINDOW_WORDS, dtype=np.uint32)
+    with Measurement("mmio_block_write", clk_period, words=blocks * DATA_WINDOW_WORDS, block_words=DATA_WINDOW_WORDS) as measurement:
+        for _ in range(blocks):
+            mmio.write(DATA_WINDOW, block)
+        measurement.beats = blocks * DATA_WINDOW_WORDS
+    with Measurement("mmio_read_array", clk_period, words=blocks * DATA_WINDOW_WORDS, block_words=DATA_WINDOW_WORDS) as measurement:
+        for _ in range(blocks):
+            mmio.read_array(DATA_WINDOW, DATA_WINDOW_WORDS)
+        measurement.beats = blocks * DATA_WINDOW_WORDS
+
+
+def overlay_construction(dut=None):
+    # Only one Overlay per test may own the DUT clock, so the largest synthetic HWH is used
+    if not OVERLAY_BITFILES:
+        return
+    bitfile = OVERLAY_BITFILES[-1]
+    with Measurement("overlay_construction", None, bitfile=bitfile) as measurement:
+        overlay = Overlay(bitfile)
+        measurement.params["ips"] = len(overlay.ip_dict)
+
+
+dma_transfers = cocotbpynq.synctest(dma_transfers)
+mmio_storm = cocotbpynq.synctest(mmio_storm)
+overlay_construction = cocotbpynq.synctest(overlay_construction)
@@ -15,7 +15,177 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from bisect import bisect_right, insort
+import weakref
 import numpy
 
+# Simulated DDR seen by the PL through the Zynq HP/ACP ports
+DDR_BASE = 0x10000000
+DDR_SIZE = 0x10000000
+# allocate() hands out page aligned buffers, like PYNQ's CMA allocator
+DDR_ALIGNMENT = 4096
+
+class SimulatedDDR:
+    """
+    Physical address space that allocate() buffers are carved from.
+
+    Each allocation is backed by its own numpy byte array, and `read`/`write`
+    access those arrays in place, so a DUT's AXI master and the test see the
+    same memory without copies in either direction.
+
+    Parameters
+    ----------
+    base : int
+        First physical address of the region
+    size : int
+        Size of the region in bytes
+    alignment : int
+        Alignment of every allocation
+    """
+    def __init__(self, base=DDR_BASE, size=DDR_SIZE, alignment=DDR_ALIGNMENT):
+        self.base = base
+        self.size = size
+        self.alignment = alignment
+        self._free = [(base, size)] # Sorted, coalesced (address, size) extents
+        self._bases = [] # Sorted addresses of live allocations
+        self._allocations = {} # address -> (reserved size, backing byte array)
+
+    def alloc(self, nbytes):
+        """Reserve `nbytes` (first fit) and return (physical address, backing uint8 array)"""
+        reserved = max(self.alignment, -(-nbytes // self.alignment) * self.alignment)
+        for i, (address, size) in enumerate(self._free):
+            if size >= reserved:
+                if size == reserved:
+                    del self._free[i]
+                else:
+                    self._free[i] = (address + reserved, size - reserved)
+                break
+        else:
+            raise MemoryError(f"Simulated DDR exhausted, cannot allocate {nbytes} bytes")
+        # Backed up to the reserved size, so bus-width reads of a buffer's last bytes stay in range (and read 0)
+        backing = numpy.zeros(reserved, dtype=numpy.uint8)
+        self._allocations[address] = (reserved, backing)
+        insort(self._bases, address)
+        return address, backing
+
+    def free(self, address):
+        reserved, _ = self._allocations.pop(address)
+        del self._bases[bisect_right(self._bases, address) - 1]
+        i = bisect_right(self._free, (address, reserved))
+        self._free.insert(i, (address, reserved))
+        # Coalesce with the following, then the preceding extent
+        if i + 1 < len(self._free) and address + reserved == self._free[i + 1][0]:
+            self._free[i] = (address, reserved + self._free.pop(i + 1)[1])
+        if i > 0 and self._free[i - 1][0] + self._free[i - 1][1] == address:
+            self._free[i - 1] = (self._free[i - 1][0], self._free[i - 1][1] + self._free.pop(i)[1])
+
+    def resolve(self, address):
+        """(backing array, offset) of the allocation containing address, or (None, 0)"""
+        i = bisect_right(self._bases, address) - 1
+        if i >= 0:
+            base = self._bases[i]
+            backing = self._allocations[base][1]
+            if address - base < len(backing):
+                return backing, address - base
+        return None, 0
+
+    def read(self, address, nbytes):
+        """Little-endian integer of `nbytes` from address; unallocated bytes read as 0. Returns (value, ok)"""
+        backing, offset = self.resolve(address)
+        if backing is None:
+            return 0, False
+        if offset + nbytes <= len(backing):
+            return int.from_bytes(backing.data[offset:offset + nbytes], "little"), True
+        value, ok = self.read(address + len(backing) - offset, nbytes - (len(backing) - offset))
+        return int.from_bytes(backing.data[offset:], "little") | value << (8 * (len(backing) - offset)), ok
+
+    def write(self, address, nbytes, value, strb=None):
+        """Write the `nbytes` little-endian bytes of value whose bit is set in strb (all if None). Returns ok"""
+        backing, offset = self.resolve(address)
+        if backing is None:
+            return False
+        if strb is None or strb == (1 << nbytes) - 1:
+            if offset + nbytes <= len(backing):
+                backing.data[offset:offset + nbytes] = value.to_bytes(nbytes, "little")
+                return True
+            strb = (1 << nbytes) - 1
+        data = value.to_bytes(nbytes, "little")
+        ok = True
+        for lane in range(nbytes):
+            if strb >> lane & 1:
+                if offset + lane < len(backing):
+                    backing[offset + lane] = data[lane]
+                else:
+                    ok = self.write(address + lane, 1, data[lane]) and ok
+        return ok
+
+
+ddr = SimulatedDDR()
+
+class PynqBuffer(numpy.ndarray):
+    """
+    Drop in replacement for Pynq's PynqBuffer: a numpy array living in
+    simulated DDR at `physical_address`. Views keep pointing at the address
+    of their first element; arrays computed from a buffer have no address.
+    """
+    def __array_finalize__(self, obj):
+        self._backing = getattr(obj, "_backing", None)
+        self._backing_address = getattr(obj, "_backing_address", None)
+        self._release = getattr(obj, "_release", None)
+        self.cacheable = getattr(obj, "cacheable", False)
+
+    @property
+    def physical_address(self):
+        if self._backing is None:
+            return None
+        offset = self.ctypes.data - self._backing.ctypes.data
+        if not 0 <= offset < max(len(self._backing), 1):
+            return None
+        return self._backing_address + offset
+
+    @property
+    def device_address(self):
+        return self.physical_address
+
+    def freebuffer(self):
+        """Return the buffer's memory to the simulated DDR (also done when it is garbage collected)"""
+        if self._release is not None:
+            self._release()
+
+    def close(self):
+        self.freebuffer()
+
+    def flush(self):
+        return
+
+    def invalidate(self):
+        return
+
+    def sync_to_device(self):
+        return
+
+    def sync_from_device(self):
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.freebuffer()
+        return False
+
+
 def allocate(shape, dtype="u4", target=None, **kwargs):
-    return numpy.ndarray(shape, dtype=dtype, **kwargs)
\ No newline at end of file
+    """
+    Drop in replacement for pynq.allocate: a PynqBuffer carved from the
+    simulated DDR (`ddr`), so DUT AXI masters can address it
+    """
+    dtype = numpy.dtype(dtype)
+    nbytes = int(numpy.prod(shape)) * dtype.itemsize
+    address, backing = ddr.alloc(nbytes)
+    buffer = PynqBuffer(shape, dtype=dtype, buffer=backing, order=kwargs.get("order", "C"))
+    buffer._backing = backing
+    buffer._backing_address = address
+    buffer.cacheable = kwargs.get("cacheable", False)
+    buffer._release = weakref.finalize(buffer, ddr.free, address)
+    return buffer
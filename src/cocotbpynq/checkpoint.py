@@ -0,0 +1,123 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import cocotb
+import numpy as np
+from .simulator import posted
+
+_checkpoints = {}
+
+
+def save(name, *mmios, buffers=(), path=None):
+    """Checkpoint the state a setup phase left behind, for `restore` in later tests.
+
+    A checkpoint holds the registers mapped by each MMIO's backdoor (see
+    `MMIO.enable_backdoor`, which must be enabled) and the contents of the
+    allocate() buffers given. State the backdoor cannot reach, such as data
+    in flight in a pipeline, is not part of it.
+
+    Parameters
+    ----------
+    name : str
+        Name of the setup phase
+    *mmios : MMIO
+        MMIOs whose mapped registers are saved
+    buffers : list
+        Buffers whose contents are saved
+    path : str
+        .npz file to also keep the checkpoint in, for later simulator runs.
+        Remove it whenever the design changes
+    """
+    if posted.enabled:
+        posted.post(save_async(name, *mmios, buffers=buffers, path=path))
+    else:
+        _save_blocking(name, mmios, buffers, path)
+
+
+def restore(name, *mmios, buffers=(), path=None):
+    """
+    Restore a checkpoint saved with the same MMIOs and buffers.
+
+    Returns
+    -------
+    bool : False if there is no such checkpoint (or it was taken of other registers), so the setup must be run
+    """
+    return _restore_blocking(name, mmios, buffers, path)
+
+
+@cocotb.function
+async def _save_blocking(name, mmios, buffers, path):
+    await save_async(name, *mmios, buffers=buffers, path=path)
+
+
+@cocotb.function
+async def _restore_blocking(name, mmios, buffers, path):
+    return await restore_async(name, *mmios, buffers=buffers, path=path)
+
+
+async def save_async(name, *mmios, buffers=(), path=None):
+    """Coroutine version of `save`, without the synctest thread bridge"""
+    await posted.drain()
+    state = {"buffer_sizes": np.array([buffer.nbytes for buffer in buffers], dtype=np.int64)}
+    for i, mmio in enumerate(mmios):
+        offsets = _mapped_offsets(mmio)
+        state[f"offsets{i}"] = np.array(offsets, dtype=np.int64)
+        state[f"values{i}"] = np.array(await mmio._sample_words([mmio.backdoor[offset] for offset in offsets]), dtype=np.uint32)
+    for i, buffer in enumerate(buffers):
+        state[f"buffer{i}"] = np.ascontiguousarray(buffer).reshape(-1).view(np.uint8).copy()
+    _checkpoints[name] = state
+    if path is not None:
+        np.savez(_npz_path(path), **state)
+
+
+async def restore_async(name, *mmios, buffers=(), path=None):
+    """Coroutine version of `restore`, without the synctest thread bridge"""
+    await posted.drain()
+    state = _checkpoints.get(name)
+    if state is None and path is not None and os.path.isfile(_npz_path(path)):
+        with np.load(_npz_path(path)) as checkpoint_file:
+            state = dict(checkpoint_file)
+        _checkpoints[name] = state
+    if state is None or not _matches(state, mmios, buffers):
+        return False
+    for i, mmio in enumerate(mmios):
+        offsets = state[f"offsets{i}"].tolist()
+        await mmio._deposit_words([mmio.backdoor[offset] for offset in offsets], state[f"values{i}"].tolist())
+    for i, buffer in enumerate(buffers):
+        # Saved in C order; copyto also fills non-contiguous buffers, where reshape would write to a copy
+        np.copyto(buffer, state[f"buffer{i}"].view(buffer.dtype).reshape(buffer.shape))
+    return True
+
+
+def _npz_path(path):
+    """np.savez appends .npz to a path without it; restore must look for the same file"""
+    path = os.fspath(path)
+    return path if path.endswith(".npz") else path + ".npz"
+
+
+def _mapped_offsets(mmio):
+    if mmio.backdoor is None:
+        raise RuntimeError("Checkpoints hold backdoor-mapped registers: call enable_backdoor() on every MMIO first")
+    return sorted(mmio.backdoor)
+
+
+def _matches(state, mmios, buffers):
+    if state["buffer_sizes"].tolist() != [buffer.nbytes for buffer in buffers]:
+        return False
+    return all(f"offsets{i}" in state and state[f"offsets{i}"].tolist() == _mapped_offsets(mmio)
+               for i, mmio in enumerate(mmios))
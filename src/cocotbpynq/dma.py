@@ -17,103 +17,604 @@
 
 import cocotb
 from .dut import CocotbPynqBusInterface, CocotbPynqDut
-from cocotb.triggers import Event, RisingEdge, ReadOnly
+from .hwh import HwhModule
+from .profiler import profiler
+from .recorder import recorder
+from .simulator import posted
+from cocotb.queue import Queue
+from cocotb.triggers import Event, RisingEdge
 import numpy as np
+from itertools import islice
+import math
 from threading import Lock
+from time import perf_counter
 
 class DMA:
-    def __init__(self, cp_businterfaces, axi_dma_el):
+    def __init__(self, cp_businterfaces, axi_dma: HwhModule):
         cp_read_bus = None
         cp_write_bus = None
 
         # Discover read/write busses between axi_dma and DUT
-        for bus_interface_el in axi_dma_el.findall("./BUSINTERFACES/BUSINTERFACE"):
-            busname = bus_interface_el.get("BUSNAME")
+        for bus_interface in axi_dma.bus_interfaces:
+            busname = bus_interface.busname
             for cpbus_interface in cp_businterfaces.values():
                 if(cpbus_interface.busname == busname):
-                    if(bus_interface_el.get("VLNV").split(":")[:3] != ["xilinx.com","interface","axis"]):
+                    if(not bus_interface.is_vlnv("xilinx.com","interface","axis")):
                         raise AttributeError(f"non-AXI-Stream but between axi_dma and dut exists: {busname}")
-                    if (bus_interface_el.get("TYPE") == "INITIATOR"):
+                    if (bus_interface.type == "INITIATOR"):
                         cp_write_bus = cpbus_interface
                         if(cp_read_bus is not None): break
-                    elif (bus_interface_el.get("TYPE") == "TARGET"):    
+                    elif (bus_interface.type == "TARGET"):    
                         cp_read_bus = cpbus_interface
                         if(cp_write_bus is not None): break
 
         if(cp_write_bus != None):
-            self.sendchannel = DMA_Channel(cp_write_bus, "write")
+            self.sendchannel = channel_of(cp_write_bus, "write")
         if(cp_read_bus != None):
-            self.recvchannel = DMA_Channel(cp_read_bus, "read")
+            self.recvchannel = channel_of(cp_read_bus, "read")
+
+
+def channel_of(cpbus, direction):
+    """The DMA_Channel driving an AXI-Stream bus interface; DMA objects sharing a stream share its engine"""
+    if(not hasattr(cpbus, "dma_channel")):
+        cpbus.dma_channel = DMA_Channel(cpbus, direction)
+    return cpbus.dma_channel
+
+
+class DMA_Descriptor:
+    """
+    One transfer queued on a DMA_Channel, like a scatter-gather descriptor.
+    `wait()` blocks until this transfer alone has completed, and re-raises
+    an error that ended it.
+    """
+    def __init__(self, array, start, nbytes, beats=None, last_keep=None, last=True):
+        self.array = array
+        self.start = start
+        self.nbytes = nbytes
+        # Pre-packed beats and whether the final one carries TLAST (send direction only)
+        self.beats = beats
+        self.last_keep = last_keep
+        self.last = last
+        self.done = Event()
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.done.is_set()
+
+    @cocotb.function
+    async def wait(self):
+        await self.wait_async()
+
+    async def wait_async(self):
+        """Coroutine version of `wait`, without the synctest thread bridge"""
+        await posted.drain()
+        await self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class DMA_StreamDescriptor(DMA_Descriptor):
+    """
+    A queued stream fed from (send) or drained into (receive) chunks, so
+    only one chunk is ever held in memory. `nbytes` counts the bytes
+    streamed so far.
+    """
+    def __init__(self, source=None, sink=None, limit=0, chunk_bytes=1 << 20, last="end", packets=0):
+        super().__init__(None, 0, 0)
+        self.source = source
+        self.sink = sink
+        self.limit = limit
+        self.chunk_bytes = chunk_bytes
+        self.last = last
+        self.packets = packets
 
 
 class DMA_Channel():
     def __init__(self, cpbus: CocotbPynqBusInterface, direction: str):
         self.direction = direction
         self.cpbus = cpbus
+        self.channel = f"{cpbus.cpdut.instance_name}.{cpbus.portname}"
         self.idle_lock = Lock()
         self.is_idle = Event()
+        self.is_idle.set()
+        # Descriptors accepted but not yet completed; only touched while the simulator is paused or from its coroutines
+        self._pending = 0
+        self._descriptors = Queue()
+        # First error that ended a transfer since the last wait(), re-raised by it
+        self._error = None
+        # Stream width comes from the HWH, falling back to the physical TDATA width
+        self.beat_bytes = int(cpbus.parameters.get("TDATA_NUM_BYTES", len(cpbus.TDATA) // 8))
+        self.has_tkeep = hasattr(cpbus, "TKEEP")
+        # Optional Backpressure model throttling our side of the stream, see set_backpressure
+        self.backpressure = None
+        self._throttled = 0
         if(self.direction == "write"):
             self.cpbus.TVALID.value = 0b0
+            if(self.has_tkeep):
+                self.cpbus.TKEEP.value = 0
         else:
             self.cpbus.TREADY.value = 0b0
+        cocotb.start_soon(self._run())
+
     @cocotb.function
     async def wait(self):
+        """Wait until every queued transfer has completed"""
+        await self.wait_async()
+
+    async def wait_async(self):
+        """Coroutine version of `wait` (as PYNQ's), awaited directly on the scheduler
+        rather than through the synctest thread bridge"""
+        await posted.drain()
         await self.is_idle.wait()
-        self.idle_lock.release()
+        if self.idle_lock.locked():
+            self.idle_lock.release()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
 
     def transfer(self, array, start=0, nbytes=0):
-        if start % 4:
-            raise MemoryError("Unaligned transfer: start must be multiple of 4.")
-        if nbytes % 4:
-            raise MemoryError("Unaligned transfer: nbytes must be multiple of 4.")
-        if nbytes == 0:
-            nbytes = array.nbytes - start
-        if(self.direction not in ["read", "write"]):
-            raise ValueError("direction must be \"read\" or \"write\"")
+        """Start a DMA transfer of (part of) a numpy array.
+
+        Contiguous arrays are packed into beats of the stream width using
+        zero-copy byte views, so any dtype can be sent over any TDATA
+        width. Strided arrays are packed element by element in logical
+        order, without making a contiguous copy first. A final partial
+        beat is only allowed when the bus has a TKEEP signal. In posted-write
+        mode the transfer starts after all previously posted MMIO writes.
+        As on PYNQ, the channel must be `wait()`ed before the next transfer;
+        use `queue_transfer` to stream several buffers back to back.
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            Source (write) or destination (read) buffer.
+        start : int
+            Byte offset into the array to start from.
+        nbytes : int
+            Number of bytes to transfer, 0 transfers the rest of the array.
+        """
+        descriptor = self._descriptor(array, start, nbytes)
         if(not self.idle_lock.acquire(False)):
             raise InterruptedError("DMA can not be accessed again until it has been waited")
-        self.is_idle.clear()
+        self._enqueue(descriptor)
+
+    def set_backpressure(self, model):
+        """Throttle this channel with a Backpressure model (see cocotbpynq.backpressure), None for full rate.
+
+        The model advances once per clock cycle on both sides. A send channel
+        starves the DUT by holding TVALID low between beats on the model's
+        inactive cycles (a beat already offered stays offered until accepted);
+        a receive channel lowers TREADY on them.
+        Throttled cycles are reported as overhead, not DUT stall, by the profiler.
+        """
+        if model is not None:
+            model.reset()
+        self.backpressure = model
+
+    def queue_transfer(self, array, start=0, nbytes=0, last=True):
+        """Queue a transfer behind any already queued, without waiting for them.
+
+        Queued transfers are streamed back to back: TVALID (send) or TREADY
+        (receive) stays high from one buffer into the next, so there are no
+        idle cycles between them, as with the AXI DMA in scatter-gather mode.
+        `array`, `start` and `nbytes` are as for `transfer`.
+
+        Parameters
+        ----------
+        last : bool
+            Send only: assert TLAST on the final beat. False continues the
+            packet into the next queued transfer
+
+        Returns
+        -------
+        DMA_Descriptor : whose `wait()` returns once this transfer is complete
+        """
+        if (self.direction != "write" and not last):
+            raise ValueError("last is only supported on a send channel")
+        descriptor = self._descriptor(array, start, nbytes, last)
+        self._enqueue(descriptor)
+        return descriptor
+
+    def stream_from(self, source, chunk_bytes=1 << 20, last="end"):
+        """Queue a send fed lazily from an iterable of arrays or a (memory-mapped) array.
+
+        Arrays are sent `chunk_bytes` at a time and iterables one item at a
+        time, as the stream reaches them, so e.g. a generator reading a
+        sensor log or a `np.memmap` of any size streams with flat memory use.
+
+        Parameters
+        ----------
+        source : numpy.ndarray or iterable
+            Array (e.g. np.memmap) or iterable of arrays to send, in order
+        chunk_bytes : int
+            Bytes packed per step when `source` is an array
+        last : str
+            "end" asserts TLAST only on the final beat of the whole stream,
+            "chunk" on the last beat of every chunk (iterable item)
+
+        Returns
+        -------
+        DMA_StreamDescriptor
+        """
+        if (self.direction != "write"):
+            raise ValueError("stream_from is only supported on a send channel")
+        if last not in ("end", "chunk"):
+            raise ValueError("last must be \"end\" or \"chunk\"")
+        if isinstance(source, np.ndarray) and source.nbytes % self.beat_bytes and not self.has_tkeep:
+            raise MemoryError(f"Unaligned transfer: nbytes must be multiple of {self.beat_bytes} for a stream without TKEEP.")
+        descriptor = DMA_StreamDescriptor(source=source, chunk_bytes=chunk_bytes, last=last)
+        self._enqueue(descriptor)
+        return descriptor
+
+    def stream_to(self, sink, nbytes=0, chunk_bytes=1 << 20, packets=0):
+        """Queue a receive written out `chunk_bytes` at a time, across TLAST boundaries.
+
+        Parameters
+        ----------
+        sink : numpy.ndarray or callable
+            Contiguous array (e.g. np.memmap opened "w+") filled front to
+            back, or a callable given each received chunk as a uint8 array
+        nbytes : int
+            Bytes to receive, 0 for the size of an array sink
+        chunk_bytes : int
+            Bytes buffered before they are written to the sink
+        packets : int
+            If non-zero, also stop after this many TLASTs
+
+        Returns
+        -------
+        DMA_StreamDescriptor
+        """
+        if (self.direction != "read"):
+            raise ValueError("stream_to is only supported on a receive channel")
+        if isinstance(sink, np.ndarray):
+            if not sink.flags.c_contiguous:
+                raise MemoryError("Stream sink must be a contiguous array.")
+            nbytes = nbytes or sink.nbytes
+            if nbytes > sink.nbytes:
+                raise MemoryError("Transfer exceeds the bounds of the buffer.")
+        elif not callable(sink):
+            raise TypeError("sink must be an array or a callable")
+        if nbytes <= 0 and packets <= 0:
+            raise ValueError("A callable sink needs nbytes or packets to know when the stream ends")
+        descriptor = DMA_StreamDescriptor(sink=sink, limit=nbytes, chunk_bytes=max(chunk_bytes, self.beat_bytes), packets=packets)
+        self._enqueue(descriptor)
+        return descriptor
+
+    def _descriptor(self, array, start, nbytes, last=True):
+        if(self.direction not in ["read", "write"]):
+            raise ValueError("direction must be \"read\" or \"write\"")
+        if nbytes == 0:
+            nbytes = array.nbytes - start
+        if start < 0 or nbytes < 0 or start + nbytes > array.nbytes:
+            raise MemoryError("Transfer exceeds the bounds of the buffer.")
+        if not array.flags.c_contiguous and (start % array.itemsize or nbytes % array.itemsize):
+            raise MemoryError("Unaligned transfer: start and nbytes must be multiples of the element size for strided arrays.")
+        if nbytes % self.beat_bytes and not self.has_tkeep:
+            raise MemoryError(f"Unaligned transfer: nbytes must be multiple of {self.beat_bytes} for a stream without TKEEP.")
         if (self.direction == "write"):
-            cocotb.start_soon(self.write_axi_stream(np.frombuffer(array, np.uint32, nbytes>>2, start)))
+            return DMA_Descriptor(array, start, nbytes, *_pack_beats(array, start, nbytes, self.beat_bytes), last=last)
+        return DMA_Descriptor(array, start, nbytes)
+
+    def _enqueue(self, descriptor):
+        self._pending += 1
+        self.is_idle.clear()
+        if posted.enabled:
+            # Start streaming only once previously posted writes have gone out
+            posted.post(self._put(descriptor))
         else:
-            cocotb.start_soon(self.read_axi_stream(np.frombuffer(array, np.uint32, nbytes>>2, start)))
-        # buf = np.frombuffer(data, np.uint32, num_words, 0)
+            cocotb.start_soon(self._put(descriptor))
 
-    async def write_axi_stream(self, array: np.ndarray):
-        await self.cpbus.cpdut.await_reset()
-        self.cpbus.TVALID.value = 0b1
-        for i in range(array.size):
-            self.cpbus.TDATA.value = int(array.flat[i])
-            self.cpbus.TLAST.value = 0b1 if (i == len(array) - 1) else 0b0
-            await ReadOnly()
-            x_ready = self.cpbus.TREADY.value
-            while(x_ready == 0b0):
-                await RisingEdge(self.cpbus.cpdut.clk)
-                await ReadOnly()
-                x_ready = self.cpbus.TREADY.value
-            await RisingEdge(self.cpbus.cpdut.clk)
-        self.cpbus.TVALID.value = 0b0
-        self.is_idle.set()
-    
-    async def read_axi_stream(self, array: np.ndarray):
+    async def _put(self, descriptor):
+        self._descriptors.put_nowait(descriptor)
+
+    async def _run(self):
+        """Stream queued descriptors, only dropping TVALID/TREADY when the queue runs dry"""
         await self.cpbus.cpdut.await_reset()
-        max_num_words = array.size
-        self.cpbus.TREADY.value = 0b1
+        kind = "dma_" + ("send" if self.direction == "write" else "recv")
+        while True:
+            if self._descriptors.empty():
+                if (self.direction == "write"):
+                    self.cpbus.TVALID.value = 0b0
+                else:
+                    self.cpbus.TREADY.value = 0b0
+            descriptor = await self._descriptors.get()
+            record = profiler.begin(kind, self.channel, self.cpbus.clock, nbytes=descriptor.nbytes)
+            # An error ends only this transfer; it is re-raised by wait(), and the engine carries on
+            try:
+                if isinstance(descriptor, DMA_StreamDescriptor):
+                    if (self.direction == "write"):
+                        await self._stream_send(descriptor, record)
+                    else:
+                        await self._stream_receive(descriptor, record)
+                elif (self.direction == "write"):
+                    await self.write_axi_stream(descriptor.beats, descriptor.last_keep, record, descriptor.last)
+                else:
+                    await self.read_axi_stream(descriptor.array, descriptor.start, descriptor.nbytes, record)
+            except (MemoryError, ValueError, TypeError, OSError) as error:
+                descriptor.error = error
+                if self._error is None:
+                    self._error = error
+            descriptor.done.set()
+            self._pending -= 1
+            if self._pending == 0:
+                self.is_idle.set()
+
+    async def write_axi_stream(self, beats: list, last_keep: int, record=None, last=True):
+        """Send one buffer's beats, TLAST on the final one if `last`; TVALID is left high for the next descriptor"""
+        wall_start = perf_counter()
+        throttled = self._throttled
+        cycles = await self._send_beats(beats, last_keep, last)
+        profiler.end(record, len(beats), cycles - len(beats) - (self._throttled - throttled))
+        self._log_throughput(len(beats), cycles, perf_counter() - wall_start)
+
+    async def read_axi_stream(self, array: np.ndarray, start: int, nbytes: int, record=None):
+        """Receive one buffer (up to TLAST); TREADY is left high for the next descriptor"""
+        wall_start = perf_counter()
+        throttled = self._throttled
+        beats, last_keep, cycles, _ = await self._receive_beats(-(-nbytes // self.beat_bytes))
+        profiler.end(record, len(beats), cycles - len(beats) - (self._throttled - throttled))
+        _unpack_beats(beats, last_keep, array, start, nbytes, self.beat_bytes)
+        self._log_throughput(len(beats), cycles, perf_counter() - wall_start)
+
+    async def _stream_send(self, descriptor, record):
+        wall_start = perf_counter()
+        throttled = self._throttled
+        total_beats = cycles = 0
+        chunks = _chunk_beats(descriptor.source, descriptor.chunk_bytes, self.beat_bytes, descriptor.last == "chunk")
+        # Hold one chunk back, so the final one is known when TLAST is only sent at the end
+        pending = next(chunks, None)
+        while pending is not None:
+            beats, last_keep = pending
+            pending = next(chunks, None)
+            if last_keep != (1 << self.beat_bytes) - 1 and not self.has_tkeep:
+                raise MemoryError(f"Unaligned transfer: nbytes must be multiple of {self.beat_bytes} for a stream without TKEEP.")
+            if beats:
+                cycles += await self._send_beats(beats, last_keep, descriptor.last == "chunk" or pending is None)
+            total_beats += len(beats)
+            descriptor.nbytes += len(beats) * self.beat_bytes - (self.beat_bytes - last_keep.bit_length() if beats else 0)
+        if record is not None:
+            record.nbytes = descriptor.nbytes
+        profiler.end(record, total_beats, cycles - total_beats - (self._throttled - throttled))
+        self._log_throughput(total_beats, cycles, perf_counter() - wall_start)
+
+    async def _stream_receive(self, descriptor, record):
+        wall_start = perf_counter()
+        throttled = self._throttled
+        total_beats = cycles = packets = 0
+        sink = descriptor.sink
+        flat = sink.reshape(-1).view(np.uint8) if isinstance(sink, np.ndarray) else None
+        chunk_beats = descriptor.chunk_bytes // self.beat_bytes
+        while (not descriptor.limit or descriptor.nbytes < descriptor.limit) and (not descriptor.packets or packets < descriptor.packets):
+            max_beats = chunk_beats
+            if descriptor.limit:
+                max_beats = min(max_beats, -(-(descriptor.limit - descriptor.nbytes) // self.beat_bytes))
+            # Returns early at each TLAST; TREADY stays high into the next call, so packets run back to back
+            beats, last_keep, chunk_cycles, saw_last = await self._receive_beats(max_beats)
+            cycles += chunk_cycles
+            total_beats += len(beats)
+            packets += saw_last
+            data = _beats_to_bytes(beats, last_keep, self.beat_bytes)
+            if descriptor.limit:
+                data = data[:descriptor.limit - descriptor.nbytes]
+            if flat is not None:
+                flat[descriptor.nbytes:descriptor.nbytes + data.size] = data
+            else:
+                sink(data)
+            descriptor.nbytes += data.size
+        if flat is not None and hasattr(sink, "flush"):
+            sink.flush()
+        if record is not None:
+            record.nbytes = descriptor.nbytes
+        profiler.end(record, total_beats, cycles - total_beats - (self._throttled - throttled))
+        self._log_throughput(total_beats, cycles, perf_counter() - wall_start)
+
+    async def _send_beats(self, beats: list, last_keep: int, last: bool):
+        """Drive beats, TLAST on the final one if `last`. TVALID stays high unless backpressure starves the DUT. Returns cycles taken"""
+        # Resolve handles/triggers once, outside the beat loop
+        tdata, tlast = self.cpbus.TDATA, self.cpbus.TLAST
+        tvalid, tready = self.cpbus.TVALID, self.cpbus.TREADY
+        tkeep = self.cpbus.TKEEP if self.has_tkeep else None
+        clk_edge = RisingEdge(self.cpbus.clock.signal)
+        final = len(beats) - 1
+        cycles = 0
+        row = recorder.begin("dma_send", self.channel, self.cpbus.clock)
+        if(tkeep is not None):
+            tkeep.value = (1 << self.beat_bytes) - 1
+        tvalid.value = 0b1
+        tlast.value = 0b0
+        throttle = self.backpressure
+        for i, word in enumerate(beats):
+            if throttle is not None:
+                # Starve the DUT between beats only, as TVALID may not drop once a beat is offered
+                while not throttle.active():
+                    tvalid.value = 0b0
+                    await clk_edge
+                    cycles += 1
+                    self._throttled += 1
+                tvalid.value = 0b1
+            tdata.value = word
+            if(i == final):
+                tlast.value = last
+                if(tkeep is not None):
+                    tkeep.value = last_keep
+            # One edge per cycle, until the beat is accepted: TREADY is read as the DUT sampled it at that edge
+            await clk_edge
+            cycles += 1
+            while not tready.value:
+                if throttle is not None:
+                    # The pattern advances every cycle, also while the DUT holds a beat back
+                    throttle.active()
+                await clk_edge
+                cycles += 1
+        if row is not None:
+            recorder.end(row, len(beats), payload=_beats_to_bytes(beats, last_keep, self.beat_bytes), last=last)
+        return cycles
+
+    async def _receive_beats(self, max_beats: int):
+        """Accept up to max_beats, stopping after a TLAST beat. TREADY stays high unless backpressure lowers it.
+
+        Returns
+        -------
+        (list, int, int, bool) : beats, TKEEP of the final beat, cycles taken, whether TLAST ended it
+        """
+        tdata, tlast = self.cpbus.TDATA, self.cpbus.TLAST
+        tvalid, tready = self.cpbus.TVALID, self.cpbus.TREADY
+        tkeep = self.cpbus.TKEEP if self.has_tkeep else None
+        clk_edge = RisingEdge(self.cpbus.clock.signal)
+        full_keep = (1 << self.beat_bytes) - 1
+        beats = []
+        last_keep = full_keep
+        cycles = 0
+        row = recorder.begin("dma_recv", self.channel, self.cpbus.clock)
         y_last = 0b0
-        for i in range(max_num_words):
-            await ReadOnly()
-            y_valid = self.cpbus.TVALID.value
-            while(y_valid == 0b0):
-                await RisingEdge(self.cpbus.cpdut.clk)
-                await ReadOnly()
-                y_valid = self.cpbus.TVALID.value
-            y_last = self.cpbus.TLAST.value
-            array.flat[i] = (int(self.cpbus.TDATA.value))
-            await RisingEdge(self.cpbus.cpdut.clk)
-            if(y_last == 0b1):
-                break
-        self.cpbus.TREADY.value = 0b0
-        self.is_idle.set()
-    
+        tready.value = 0b1
+        throttle = self.backpressure
+        while len(beats) < max_beats:
+            if throttle is not None:
+                ready = throttle.active()
+                tready.value = ready
+                if not ready:
+                    await clk_edge
+                    cycles += 1
+                    self._throttled += 1
+                    continue
+            # One edge per cycle: TVALID and the beat are read as they were at that edge, with TREADY high
+            await clk_edge
+            cycles += 1
+            if tvalid.value:
+                beats.append(int(tdata.value))
+                y_last = tlast.value
+                if(tkeep is not None):
+                    last_keep = int(tkeep.value)
+                    if(last_keep != full_keep and not (y_last and _is_low_mask(last_keep))):
+                        raise ValueError(f"Unsupported TKEEP {bin(last_keep)}: only the TLAST beat may be partial, with low bytes kept")
+                if y_last:
+                    break
+        if row is not None:
+            recorder.end(row, len(beats), payload=_beats_to_bytes(beats, last_keep, self.beat_bytes), last=bool(y_last))
+        return beats, last_keep, cycles, bool(y_last)
+
+    def _log_throughput(self, beats, cycles, wall_time):
+        if wall_time > 0:
+            clock = self.cpbus.clock
+            board_time = clock.cycles_to_seconds(cycles)
+            board_rate = f", ~{beats*self.beat_bytes/board_time/1e6:.1f} MB/s" if board_time > 0 else ""
+            self.cpbus.cpdut.dut._log.debug(
+                f"DMA {self.direction}: {beats} beats in {cycles} cycles "
+                f"({beats/wall_time:.0f} beats/s wall-clock; ~{board_time*1e6:.2f} us on board at {clock.freq_hz/1e6:g} MHz{board_rate})")
+
+
+def _is_low_mask(keep):
+    return keep & (keep + 1) == 0
+
+
+def _element_words(array, first, count):
+    """Integers for `count` elements of array (logical order) starting at element `first`"""
+    if array.itemsize in (1, 2, 4, 8):
+        # Same-itemsize views are valid for any strides, so nothing is copied here
+        elems = array.view(f"<u{array.itemsize}")
+        if elems.ndim == 1:
+            return elems[first:first + count].tolist()
+        return [int(elem) for elem in islice(elems.flat, first, first + count)]
+    return [int.from_bytes(elem.tobytes(), "little") for elem in islice(array.flat, first, first + count)]
+
+
+def _pack_beats(array, start, nbytes, beat_bytes):
+    """Pack a byte range of array into a list of TDATA beats
+
+    Returns
+    -------
+    (list, int) : beat values and the TKEEP mask of the final beat
+    """
+    tail = nbytes % beat_bytes
+    last_keep = (1 << (tail or beat_bytes)) - 1
+    if array.flags.c_contiguous:
+        data = array.reshape(-1).view(np.uint8)[start:start + nbytes]
+        full = nbytes - tail
+        if beat_bytes in (1, 2, 4, 8):
+            beats = data[:full].view(f"<u{beat_bytes}").tolist()
+        else:
+            view = memoryview(data)
+            beats = [int.from_bytes(view[i:i + beat_bytes], "little") for i in range(0, full, beat_bytes)]
+        if tail:
+            beats.append(int.from_bytes(memoryview(data)[full:], "little"))
+        return beats, last_keep
+
+    # Strided array: gather elements in logical order and pack/split them into beats
+    itemsize = array.itemsize
+    words = _element_words(array, start // itemsize, nbytes // itemsize)
+    if itemsize >= beat_bytes:
+        if itemsize % beat_bytes:
+            raise MemoryError(f"Element size {itemsize} is not a multiple of stream width {beat_bytes}.")
+        mask = (1 << (8 * beat_bytes)) - 1
+        beats = [(word >> (8 * beat_bytes * j)) & mask for word in words for j in range(itemsize // beat_bytes)]
+    else:
+        if beat_bytes % itemsize:
+            raise MemoryError(f"Stream width {beat_bytes} is not a multiple of element size {itemsize}.")
+        per_beat = beat_bytes // itemsize
+        shift = 8 * itemsize
+        beats = []
+        for i in range(0, len(words), per_beat):
+            beat = 0
+            for j, word in enumerate(words[i:i + per_beat]):
+                beat |= word << (shift * j)
+            beats.append(beat)
+    return beats, last_keep
+
+
+def _chunk_beats(source, chunk_bytes, beat_bytes, packetised):
+    """
+    Lazily pack an array (chunk_bytes at a time) or an iterable of arrays
+    into (beats, last TKEEP) pieces. Unless `packetised`, bytes of an item
+    that do not fill a beat are carried into the next item's first beat.
+    """
+    if isinstance(source, np.ndarray):
+        step = math.lcm(beat_bytes, source.itemsize)
+        step = max(chunk_bytes - chunk_bytes % step, step)
+        for start in range(0, source.nbytes, step):
+            yield _pack_beats(source, start, min(step, source.nbytes - start), beat_bytes)
+        return
+    carry = np.empty(0, np.uint8)
+    for chunk in source:
+        chunk = np.asarray(chunk)
+        if packetised:
+            if chunk.nbytes:
+                yield _pack_beats(chunk, 0, chunk.nbytes, beat_bytes)
+            continue
+        data = np.ascontiguousarray(chunk).reshape(-1).view(np.uint8)
+        if carry.size:
+            data = np.concatenate((carry, data))
+        full = data.size - data.size % beat_bytes
+        if full:
+            yield _pack_beats(data[:full], 0, full, beat_bytes)
+        carry = data[full:].copy()
+    if carry.size:
+        yield _pack_beats(carry, 0, carry.size, beat_bytes)
+
+
+def _beats_to_bytes(beats, last_keep, beat_bytes):
+    """Bytes carried by TDATA beats, as a uint8 array (the final beat limited by its TKEEP)"""
+    nfull = len(beats) if last_keep == (1 << beat_bytes) - 1 else len(beats) - 1
+    if beat_bytes in (1, 2, 4, 8):
+        received = np.array(beats[:nfull], dtype=f"<u{beat_bytes}").view(np.uint8)
+    else:
+        received = np.frombuffer(b"".join(beat.to_bytes(beat_bytes, "little") for beat in beats[:nfull]), np.uint8)
+    if nfull < len(beats):
+        tail = np.frombuffer(beats[-1].to_bytes(beat_bytes, "little")[:last_keep.bit_length()], np.uint8)
+        received = np.concatenate((received, tail))
+    return received
 
 
+def _unpack_beats(beats, last_keep, array, start, nbytes, beat_bytes):
+    """Write received TDATA beats back into a byte range of array"""
+    if not beats:
+        return
+    received = _beats_to_bytes(beats, last_keep, beat_bytes)[:nbytes]
+    if array.flags.c_contiguous:
+        array.reshape(-1).view(np.uint8)[start:start + received.size] = received
+    else:
+        # Strided array: only whole elements can be written back, in logical order
+        count = received.size // array.itemsize
+        array.flat[start // array.itemsize:start // array.itemsize + count] = received[:count * array.itemsize].view(array.dtype)
@@ -16,43 +16,100 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import cocotb
-from cocotb.clock import Clock
-from cocotb.triggers import ClockCycles, Event
-from cocotb.utils import get_sim_time as gst
-from xml.etree import ElementTree
+from cocotb.triggers import ClockCycles, Event, Timer
+from cocotb.utils import get_sim_time as gst, get_sim_steps
 from cocotb.handle import SimHandleBase
+from .hwh import HwhBusInterface, HwhModule
+
+# Fabric clock assumed when the HWH gives no frequency for a clock port (PYNQ's default FCLK0)
+DEFAULT_FREQ_HZ = 100000000
+
+class CocotbPynqClock:
+    """
+        A clock input of the dut, driven at the frequency the HWH gives for it
+    """
+    def __init__(self, name, signal, freq_hz):
+        self.name = name
+        self.signal = signal
+        self.freq_hz = freq_hz
+        # Period in sim steps, rounded to an even number so both clock phases are whole steps
+        period = get_sim_steps(1e12 / freq_hz, "ps", round_mode="round")
+        self.period = max(2, period + period % 2)
+
+    def cycles_to_seconds(self, cycles):
+        """Time `cycles` of this clock take on the board"""
+        return cycles / self.freq_hz
+
+    async def drive(self):
+        """
+        Toggle the clock forever. Unlike cocotb's Clock, edges are written
+        immediately from the timer callback instead of through the scheduler's
+        write phase, which saves two callbacks per cycle on every design
+        """
+        half_period = Timer(self.period // 2, "step")
+        while True:
+            self.signal.setimmediatevalue(1)
+            await half_period
+            self.signal.setimmediatevalue(0)
+            await half_period
+
 
 class CocotbPynqDut:
-    def __init__(self, dut: SimHandleBase, dut_module_el, reset_on_init=True):
+    """
+        Driver context of one simulated HWH instance. Its ports are the signals
+        `prefix + port name` of the `dut` handle: the toplevel itself, a
+        sub-instance, or a wrapper toplevel exposing several instances' ports
+        with a per-instance prefix
+    """
+    def __init__(self, dut: SimHandleBase, dut_module: HwhModule, reset_on_init=True, prefix=""):
         self.dut = dut
-        if(str(dut) != dut_module_el.get("MODTYPE")):
+        self.prefix = prefix
+        if(not prefix and str(dut) not in (dut_module.modtype, dut_module.instance)):
             raise ValueError("Given module is not the same module type as dut")
+        self.clocks = self._find_clocks(dut_module)
+        # The first clock port stays the dut's main clock (reset, await_reset and legacy clk/clk_period users)
+        main_clock = next(iter(self.clocks.values()))
+        self.clk = main_clock.signal
+        self.clk_period = main_clock.period # in sim steps
         self.bus_interfaces = {}
-        for bus_interface_el in dut_module_el.findall("./BUSINTERFACES/BUSINTERFACE"):
-            cpbus = CocotbPynqBusInterface(self, bus_interface_el)
+        for bus_interface in dut_module.bus_interfaces:
+            if bus_interface.is_vlnv("xilinx.com", "signal", "clock") or bus_interface.is_vlnv("xilinx.com", "signal", "reset"):
+                continue
+            cpbus = CocotbPynqBusInterface(self, bus_interface, self._bus_clock(dut_module, bus_interface))
             self.bus_interfaces[cpbus.portname] = cpbus
         # Create Synchronization event to avoid changing signals in reset state
         self.done_reset = Event() 
         self.done_reset.clear()
 
-        # Automatically find dut clk/reset names and reset polarity from HWH
-        clk_el = dut_module_el.find("./PORTS/PORT[@SIGIS='clk']")
-        rst_el = dut_module_el.find("./PORTS/PORT[@SIGIS='rst']")
-        self.clk = getattr(self.dut, clk_el.get("NAME"))
-        self.rst = getattr(self.dut, rst_el.get("NAME"))
-        self.rst_active_low = (rst_el.get("POLARITY") == "ACTIVE_LOW")
-        # Start common signals
-        cocotb.start_soon(Clock(dut.clk, 1000, 'step').start())
-        if(reset_on_init):
-            # Reset dut for 3 cycles, then wait 4 cycles before allowing anyone to touch dut
-            cocotb.start_soon(self.reset_dut(3, 4))
+        # Automatically find dut reset name and polarity from HWH
+        rst_port = dut_module.find_port("rst")
+        self.rst = self.signal(rst_port.name)
+        self.rst_active_low = (rst_port.polarity == "ACTIVE_LOW")
+        self.instance_name = dut_module.instance
+        self._clock_tasks = []
+        self.start(reset_on_init)
+
+    def start(self, reset=True, reset_cycles=3, waiting_cycles=4):
+        """(Re)start every clock at its own frequency and, if `reset`, reset the dut.
+
+        cocotb ends all coroutines of a test when it finishes, so a dut kept
+        for the next test of the same session is started again with this
+        """
+        self._clock_tasks = [cocotb.start_soon(clock.drive()) for clock in self.clocks.values()]
+        if(reset):
+            # Reset dut for reset_cycles, then wait waiting_cycles before allowing anyone to touch dut
+            self.done_reset.clear()
+            cocotb.start_soon(self.reset_dut(reset_cycles, waiting_cycles))
 
-        self.instance_name = dut_module_el.get("INSTANCE")
+    @property
+    def running(self):
+        """Whether the clocks started by `start` are still running, i.e. this is still the test that started them"""
+        return all(not task.done() for task in self._clock_tasks)
 
     async def reset_dut(self, reset_cycles: int, waiting_cycles: int):
         self.done_reset.clear()
         self.rst.value = not self.rst_active_low
-        await ClockCycles(self.dut.clk, reset_cycles)
+        await ClockCycles(self.clk, reset_cycles)
         self.rst.value = self.rst_active_low
         self.rst._log.info("Reset complete")
         await ClockCycles(self.clk, waiting_cycles)
@@ -67,6 +124,47 @@ class CocotbPynqDut:
         time2 = gst('step')
         self.rst._log.info(f"Waited {time2-time} timesteps for DUT reset")
         return
+
+    def signal(self, port_name):
+        """Handle of one of this instance's HWH ports"""
+        return getattr(self.dut, self.prefix + port_name)
+
+    def _find_clocks(self, dut_module: HwhModule):
+        """CocotbPynqClock per clock port, frequency from CLKFREQUENCY or the clock bus interface's FREQ_HZ"""
+        clock_freqs = {}
+        for bus_interface in dut_module.bus_interfaces:
+            if bus_interface.is_vlnv("xilinx.com", "signal", "clock") and "FREQ_HZ" in bus_interface.parameters:
+                clock_freqs[bus_interface.portmaps.get("CLK")] = int(float(bus_interface.parameters["FREQ_HZ"]))
+        clocks = {}
+        for port in dut_module.ports:
+            if port.sigis != "clk":
+                continue
+            freq_hz = port.attrs.get("CLKFREQUENCY") or clock_freqs.get(port.name) or DEFAULT_FREQ_HZ
+            clocks[port.name] = CocotbPynqClock(port.name, self.signal(port.name), int(float(freq_hz)))
+        if not clocks:
+            raise ValueError(f"No clock port (SIGIS=clk) found on {dut_module.instance} in HWH")
+        return clocks
+
+    def _bus_clock(self, dut_module: HwhModule, bus_interface: HwhBusInterface):
+        """
+            Clock a bus interface is synchronous to: the clock whose bus interface lists it in
+            ASSOCIATED_BUSIF, else the only clock with the same FREQ_HZ, else the main clock
+        """
+        if len(self.clocks) == 1:
+            return next(iter(self.clocks.values()))
+        for clock_interface in dut_module.bus_interfaces:
+            if not clock_interface.is_vlnv("xilinx.com", "signal", "clock"):
+                continue
+            if bus_interface.name in clock_interface.parameters.get("ASSOCIATED_BUSIF", "").split(":"):
+                clock = self.clocks.get(clock_interface.portmaps.get("CLK"))
+                if clock is not None:
+                    return clock
+        if "FREQ_HZ" in bus_interface.parameters:
+            freq_hz = int(float(bus_interface.parameters["FREQ_HZ"]))
+            matching = [clock for clock in self.clocks.values() if clock.freq_hz == freq_hz]
+            if len(matching) == 1:
+                return matching[0]
+        return next(iter(self.clocks.values()))
     
 class CocotbPynqBusInterface:
     """
@@ -74,15 +172,20 @@ class CocotbPynqBusInterface:
         directly attached to a cocotb device
     """    
 
-    def __init__(self, cpdut, bus_interface_el: ElementTree.Element):
+    def __init__(self, cpdut, bus_interface: HwhBusInterface, clock: CocotbPynqClock):
         """_summary_
 
         Args:
             cpdut (_type_): _description_
-            bus_int_el (ElementTree.Element): _description_
+            bus_interface (HwhBusInterface): _description_
+            clock (CocotbPynqClock): clock the bus interface is synchronous to
         """        
         self.cpdut = cpdut
-        self.busname = bus_interface_el.get("BUSNAME")
-        self.portname = bus_interface_el.get("NAME")
-        for portmap in bus_interface_el.findall("./PORTMAPS/PORTMAP"):
-            self.__setattr__(portmap.get("LOGICAL"), cpdut.dut.__getattr__(portmap.get("PHYSICAL")))
\ No newline at end of file
+        self.clock = clock
+        self.busname = bus_interface.busname
+        self.portname = bus_interface.name
+        self.type = bus_interface.type
+        self.vlnv = bus_interface.vlnv
+        self.parameters = bus_interface.parameters
+        for logical, physical in bus_interface.portmaps.items():
+            self.__setattr__(logical, cpdut.signal(physical))
\ No newline at end of file
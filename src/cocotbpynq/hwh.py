@@ -0,0 +1,265 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from bisect import bisect_right
+import hashlib
+import os
+import pickle
+from xml.etree import ElementTree
+
+# Bump whenever the pickled model layout changes, so stale caches are ignored
+MODEL_VERSION = 3
+
+class HwhPort:
+    """A PORT of an HWH MODULE"""
+    __slots__ = ("name", "dir", "sigis", "polarity", "attrs", "connections")
+
+    def __init__(self, port_el: ElementTree.Element):
+        self.attrs = dict(port_el.attrib)
+        self.name = self.attrs.get("NAME")
+        self.dir = self.attrs.get("DIR")
+        self.sigis = self.attrs.get("SIGIS")
+        self.polarity = self.attrs.get("POLARITY")
+        # (instance, port) pairs this port is wired to
+        self.connections = [(conn.get("INSTANCE"), conn.get("PORT")) for conn in port_el.findall("./CONNECTIONS/CONNECTION")]
+
+
+class HwhBusInterface:
+    """A BUSINTERFACE of an HWH MODULE, with its PARAMETERs and LOGICAL->PHYSICAL PORTMAPs"""
+    __slots__ = ("name", "busname", "type", "vlnv", "parameters", "portmaps")
+
+    def __init__(self, bus_interface_el: ElementTree.Element):
+        self.name = bus_interface_el.get("NAME")
+        self.busname = bus_interface_el.get("BUSNAME")
+        self.type = bus_interface_el.get("TYPE")
+        self.vlnv = bus_interface_el.get("VLNV") or ""
+        self.parameters = {param.get("NAME"): param.get("VALUE") for param in bus_interface_el.findall("./PARAMETER")}
+        self.portmaps = {portmap.get("LOGICAL"): portmap.get("PHYSICAL") for portmap in bus_interface_el.findall("./PORTMAPS/PORTMAP")}
+
+    def is_vlnv(self, vendor, library, name):
+        return self.vlnv.split(":")[:3] == [vendor, library, name]
+
+
+class HwhMemRange:
+    """A MEMRANGE of a master's MEMORYMAP, with BASEVALUE/HIGHVALUE decoded"""
+    __slots__ = ("instance", "base", "high", "slave_bus_interface", "master_bus_interface", "addressblock", "memtype")
+
+    def __init__(self, memrange_el: ElementTree.Element):
+        self.instance = memrange_el.get("INSTANCE")
+        self.base = int(memrange_el.get("BASEVALUE"), 16)
+        self.high = int(memrange_el.get("HIGHVALUE"), 16)
+        self.slave_bus_interface = memrange_el.get("SLAVEBUSINTERFACE")
+        self.master_bus_interface = memrange_el.get("MASTERBUSINTERFACE")
+        self.addressblock = memrange_el.get("ADDRESSBLOCK")
+        self.memtype = memrange_el.get("MEMTYPE")
+
+
+class HwhRegister:
+    """A REGISTER of an ADDRESSBLOCK, with its offset and size decoded"""
+    __slots__ = ("name", "offset", "size", "access", "reset_value")
+
+    def __init__(self, register_el: ElementTree.Element):
+        properties = {prop.get("NAME"): prop.get("VALUE") for prop in register_el.findall("./PROPERTY")}
+        self.name = register_el.get("NAME")
+        self.offset = int(properties.get("ADDRESS_OFFSET", "0"), 0)
+        self.size = int(properties.get("SIZE", "32"))
+        self.access = properties.get("ACCESS")
+        reset_value = properties.get("RESET_VALUE")
+        self.reset_value = int(reset_value, 0) if reset_value else None
+
+
+class HwhAddressBlock:
+    """An ADDRESSBLOCK of a slave interface and the REGISTERs it declares"""
+    __slots__ = ("name", "interface", "range", "usage", "registers")
+
+    def __init__(self, block_el: ElementTree.Element):
+        self.name = block_el.get("NAME")
+        self.interface = block_el.get("INTERFACE")
+        self.range = int(block_el.get("RANGE") or 0)
+        self.usage = block_el.get("USAGE")
+        self.registers = [HwhRegister(register_el) for register_el in block_el.findall("./REGISTERS/REGISTER")]
+
+
+class AddressMap:
+    """
+    Address decoder over a master's MEMRANGEs.
+
+    Ranges are kept sorted by base address (a master's ranges never overlap),
+    so resolving an address is a binary search rather than a scan.
+
+    Parameters
+    ----------
+    memranges : list
+        HwhMemRange objects to index
+    """
+    def __init__(self, memranges):
+        self.memranges = sorted(memranges, key=lambda memrange: memrange.base)
+        self._bases = [memrange.base for memrange in self.memranges]
+
+    def resolve(self, address, length=1):
+        """The HwhMemRange containing [address, address+length), or None"""
+        i = bisect_right(self._bases, address) - 1
+        if i < 0:
+            return None
+        memrange = self.memranges[i]
+        if address + length - 1 > memrange.high:
+            return None
+        return memrange
+
+
+class HwhModule:
+    """A MODULE of the HWH, reduced to the information cocotbpynq uses"""
+    __slots__ = ("instance", "modtype", "vlnv", "fullname", "parameters", "ports", "bus_interfaces", "memranges", "addressblocks")
+
+    def __init__(self, module_el: ElementTree.Element):
+        self.instance = module_el.get("INSTANCE")
+        self.modtype = module_el.get("MODTYPE")
+        self.vlnv = module_el.get("VLNV") or ""
+        self.fullname = module_el.get("FULLNAME")
+        self.parameters = {param.get("NAME"): param.get("VALUE") for param in module_el.findall("./PARAMETERS/PARAMETER")}
+        self.ports = [HwhPort(port_el) for port_el in module_el.findall("./PORTS/PORT")]
+        self.bus_interfaces = [HwhBusInterface(bus_el) for bus_el in module_el.findall("./BUSINTERFACES/BUSINTERFACE")]
+        self.memranges = [HwhMemRange(memrange_el) for memrange_el in module_el.findall("./MEMORYMAP/MEMRANGE")]
+        self.addressblocks = [HwhAddressBlock(block_el) for block_el in module_el.findall("./ADDRESSBLOCKS/ADDRESSBLOCK")]
+
+    def is_vlnv(self, vendor, library, name):
+        return self.vlnv.split(":")[:3] == [vendor, library, name]
+
+    def find_addressblock(self, name):
+        for block in self.addressblocks:
+            if block.name == name:
+                return block
+        return None
+
+    def find_port(self, sigis):
+        """First port with the given SIGIS (e.g. 'clk', 'rst'), or None"""
+        for port in self.ports:
+            if port.sigis == sigis:
+                return port
+        return None
+
+
+class HwhDesign:
+    """
+    Pre-indexed model of an HWH file.
+
+    Modules are indexed by INSTANCE and MODTYPE, and every BUSNAME maps to the
+    (module, bus interface) pairs attached to it, so lookups that used to be
+    XPath scans over the whole tree are dict accesses. The processing system's
+    memory map is indexed once in `address_map`.
+
+    Parameters
+    ----------
+    modules : list
+        HwhModule objects, in HWH order
+    """
+    def __init__(self, modules):
+        self.modules = {}
+        self.modules_by_type = {}
+        self.buses = {}
+        for module in modules:
+            self.modules[module.instance] = module
+            self.modules_by_type.setdefault(module.modtype, []).append(module)
+            for bus_interface in module.bus_interfaces:
+                self.buses.setdefault(bus_interface.busname, []).append((module, bus_interface))
+        processing_system = self.processing_system
+        self.address_map = AddressMap(processing_system.memranges if processing_system else [])
+
+    def module(self, instance):
+        return self.modules.get(instance)
+
+    def module_of_type(self, modtype):
+        """First module with the given MODTYPE, or None"""
+        modules = self.modules_by_type.get(modtype)
+        return modules[0] if modules else None
+
+    @property
+    def processing_system(self):
+        return self.module_of_type("processing_system7")
+
+
+def is_simulated_module(module, toplevel=None):
+    """
+    Whether cocotbpynq simulates a MODULE rather than modelling it with a driver:
+    HLS kernels, RTL module references, and any module (e.g. packaged RTL IP)
+    whose MODTYPE is the simulated toplevel's name
+    """
+    return module.vlnv.split(":")[1:2] in (["hls"], ["module_ref"]) or (toplevel is not None and module.modtype == toplevel)
+
+
+def parse_hwh(hwh_name):
+    """Build an HwhDesign by streaming the HWH, discarding each MODULE once indexed"""
+    modules = []
+    path = []
+    for event, el in ElementTree.iterparse(hwh_name, events=("start", "end")):
+        if event == "start":
+            path.append(el.tag)
+            continue
+        path.pop()
+        if el.tag == "MODULE" and path and path[-1] == "MODULES":
+            modules.append(HwhModule(el))
+            el.clear()
+    return HwhDesign(modules)
+
+
+def _cache_dir():
+    return os.getenv("COCOTBPYNQ_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cocotbpynq"))
+
+
+_loaded = {}
+
+def load_hwh(hwh_name, use_cache=True):
+    """
+    Load the design model for an HWH file.
+
+    The model is memoised per process and persisted in COCOTBPYNQ_CACHE_DIR
+    (default ~/.cache/cocotbpynq) under the SHA-256 of the HWH contents, so
+    repeated simulator launches skip XML parsing entirely.
+
+    Parameters
+    ----------
+    hwh_name : str
+        Path to the HWH file
+    use_cache : bool
+        Read/write the on-disk cache
+    """
+    with open(hwh_name, "rb") as hwh_file:
+        digest = hashlib.sha256(hwh_file.read()).hexdigest()
+    if digest in _loaded:
+        return _loaded[digest]
+    cache_name = os.path.join(_cache_dir(), f"{digest}.v{MODEL_VERSION}.pickle")
+    design = None
+    if use_cache and os.path.isfile(cache_name):
+        try:
+            with open(cache_name, "rb") as cache_file:
+                design = pickle.load(cache_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            design = None
+    if design is None:
+        design = parse_hwh(hwh_name)
+        if use_cache:
+            try:
+                os.makedirs(_cache_dir(), exist_ok=True)
+                # Write to a temporary name first so concurrent launches never read a partial cache
+                tmp_name = f"{cache_name}.{os.getpid()}.tmp"
+                with open(tmp_name, "wb") as cache_file:
+                    pickle.dump(design, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, cache_name)
+            except OSError:
+                pass
+    _loaded[digest] = design
+    return design
@@ -0,0 +1,100 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cocotb
+from cocotb.triggers import Edge, First
+from .simulator import posted
+
+
+class Interrupt:
+    """
+    Drop in replacement for PYNQ's Interrupt class.
+
+    The pin is resolved through the HWH to the interrupt ports (SIGIS=INTERRUPT)
+    of simulated instances driving it, directly or through axi_intc and
+    xlconcat, and `wait()` blocks on their edges instead of any register
+    polling. As on the board, an interrupt is level sensitive: `wait()`
+    returns at once while any source is active.
+
+    Parameters
+    ----------
+    pinname : str
+        Hierarchical name of the interrupt pin, e.g. "poly_eval/poly_0/interrupt"
+    """
+    def __init__(self, pinname):
+        from . import overlay
+        design = overlay.current_design
+        if (design is None):
+            raise RuntimeError("No Overlay has been loaded")
+        path, _, port_name = pinname.rpartition("/")
+        modules = {module.fullname.lstrip("/"): module for module in design.hwh_design.modules.values()}
+        if path not in modules:
+            raise ValueError(f"No IP {path} for interrupt pin {pinname}")
+        self.pinname = pinname
+        # (cpdut, signal handle, active level) of every simulated source
+        self.sources = []
+        for module, port in _interrupt_sources(design.hwh_design, modules[path].instance, port_name, set()):
+            cpdut = design.cpduts.get(module.instance)
+            if cpdut is None:
+                continue
+            active = 0 if port.attrs.get("SENSITIVITY") in ("LEVEL_LOW", "EDGE_FALLING") else 1
+            self.sources.append((cpdut, cpdut.signal(port.name), active))
+        if not self.sources:
+            raise RuntimeError(f"Interrupt pin {pinname} is not driven by any simulated instance")
+
+    @property
+    def active(self):
+        return any(signal.value == active for _, signal, active in self.sources)
+
+    @cocotb.function
+    async def wait(self):
+        """Wait for the interrupt to be active. Blocks the synctest thread like the rest of its API, where PYNQ's is an asyncio coroutine"""
+        await self.wait_async()
+
+    async def wait_async(self):
+        """Coroutine version of `wait` for native cocotb tests, without the synctest thread bridge"""
+        await posted.drain()
+        for cpdut, _, _ in self.sources:
+            await cpdut.await_reset()
+        edges = [Edge(signal) for _, signal, _ in self.sources]
+        while not self.active:
+            await (edges[0] if len(edges) == 1 else First(*edges))
+
+
+def _interrupt_sources(hwh_design, instance, port_name, seen):
+    """(module, port) interrupt outputs driving a pin, followed back through axi_intc and xlconcat"""
+    if (instance, port_name) in seen:
+        return []
+    seen.add((instance, port_name))
+    module = hwh_design.module(instance)
+    if module is None:
+        return []
+    port = next((port for port in module.ports if port.name == port_name), None)
+    if port is None:
+        raise ValueError(f"No pin {port_name} on {module.fullname}")
+    if port.dir == "I":
+        return [source for conn_instance, conn_port in port.connections
+                for source in _interrupt_sources(hwh_design, conn_instance, conn_port, seen)]
+    if module.is_vlnv("xilinx.com", "ip", "axi_intc"):
+        inputs = [port for port in module.ports if port.name == "intr"]
+    elif module.is_vlnv("xilinx.com", "ip", "xlconcat"):
+        inputs = [port for port in module.ports if port.dir == "I"]
+    elif port.sigis == "INTERRUPT":
+        return [(module, port)]
+    else:
+        return []
+    return [source for port in inputs for source in _interrupt_sources(hwh_design, instance, port.name, seen)]
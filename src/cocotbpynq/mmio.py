@@ -17,15 +17,22 @@
 
 import cocotb
 from .dut import CocotbPynqDut
+from .profiler import profiler
+from .recorder import recorder
+from .waves import waves
+from .simulator import posted
 import numpy as np
-from cocotb.triggers import RisingEdge, ReadOnly
+from cocotb.queue import Queue
+from cocotb.handle import HierarchyObject
+from cocotb.triggers import Edge, Event, First, RisingEdge, ReadOnly, Timer
+from cocotb.utils import get_sim_time as gst
 
 class MMIO():
     """
     Drop in replacement for Pynq MMIO class.
-    Finds hwh_tree(associated with most recent overlay creation), and
-    finds the correct MMIO port  in a design based on inputted base_addr
-    and length
+    Resolves base_addr and length through the address map of the current
+    design (associated with most recent overlay creation) to the simulated
+    instance and AXI-Lite slave port that serve them
 
     Parameters
     ----------
@@ -33,31 +40,130 @@ class MMIO():
         The base address of the MMIO's address range
     length : int
         Size of MMIO's address range
+    max_outstanding : int
+        Number of reads and of writes the AXI-Lite master may keep in flight.
+        Only used by the first MMIO created on a given bus interface
     """
-    def __init__(self, base_addr, length=4):
-        from .overlay import hwh_tree, cptop
+    def __init__(self, base_addr, length=4, max_outstanding=4):
+        from . import overlay
+        if (overlay.current_design is None):
+            raise RuntimeError("No Overlay has been loaded")
+        hwh_design, cpduts = overlay.current_design.hwh_design, overlay.current_design.cpduts
         self.base_addr = base_addr
         self.length = length # Number of accessible bytes
-        self.cpdut: CocotbPynqDut = cptop
-        processing_system_el = hwh_tree.find("./MODULES/MODULE[@MODTYPE='processing_system7']")
-        if (processing_system_el is None):
+        if (hwh_design.processing_system is None):
             raise RuntimeError("No processing_system7 found. Please check that the HWH file you have generated is for a Zynq device. Only Zynq devices are supported at this time")
-        mmio_memrange_el = None
-        for memrange_el in processing_system_el.findall("./MEMORYMAP/MEMRANGE"):
-            if(memrange_el.get("INSTANCE") != self.cpdut.instance_name):
-                continue
-            if(int(memrange_el.get("BASEVALUE"),16) > base_addr) | (int(memrange_el.get("HIGHVALUE"),16) < base_addr+length):
-                continue
-            mmio_memrange_el = memrange_el
-        if(mmio_memrange_el == None):
-            raise RuntimeError("No MMIO block found attached to DUT for that memory range")
-        mmio_bus_interface_name = mmio_memrange_el.get("SLAVEBUSINTERFACE")
+        mmio_memrange = hwh_design.address_map.resolve(base_addr, length)
+        if(mmio_memrange == None):
+            raise RuntimeError("No MMIO block found for that memory range")
+        if(mmio_memrange.instance not in cpduts):
+            raise RuntimeError(f"MMIO block for that memory range belongs to {mmio_memrange.instance}, which is not simulated")
+        self.cpdut: CocotbPynqDut = cpduts[mmio_memrange.instance]
+        mmio_bus_interface_name = mmio_memrange.slave_bus_interface
         self.cpbus = self.cpdut.bus_interfaces[mmio_bus_interface_name]
-        self.cpbus.ARVALID.value = 0b0
-        self.cpbus.AWVALID.value = 0b0
-        self.cpbus.BREADY.value = 0b0
-        self.cpbus.RREADY.value = 0b0
-        self.cpbus.WVALID.value = 0b0
+        # MMIO objects sharing a bus interface must share its master
+        if(not hasattr(self.cpbus, "axi_lite_master")):
+            self.cpbus.axi_lite_master = AxiLiteMaster(self.cpbus, max_outstanding)
+        self.master: AxiLiteMaster = self.cpbus.axi_lite_master
+        # Backdoor register map (offset from the address block base -> (handle, lsb, width)), see enable_backdoor
+        self.backdoor = None
+        self._block_offset = base_addr - mmio_memrange.base
+        self._addressblock = hwh_design.module(mmio_memrange.instance).find_addressblock(mmio_memrange.addressblock)
+        # Polling coalescing (see set_poll_coalescing): off, and the last read as (key, value, master writes, repeats)
+        self.poll_repeats = 0
+        self.poll_max_cycles = 0
+        self._poll = None
+
+    def set_poll_coalescing(self, repeats=2, max_cycles=1000000):
+        """Fast-forward `read` polling loops on a status register.
+
+        Once the same register has read the same value `repeats` times in a
+        row, with no write through this bus interface in between, the next
+        `read` keeps re-reading it on the scheduler side and only returns
+        when the value changes, or after `max_cycles`. A loop spinning on
+        ap_done then costs one thread bridge instead of one per poll. With
+        the backdoor enabled for the register, its signal's edges are awaited
+        instead of re-reading it.
+
+        Parameters
+        ----------
+        repeats : int
+            Identical reads before coalescing starts, 0 disables it
+        max_cycles : int
+            Bus clock cycles to wait for a change before returning the unchanged value
+        """
+        self.poll_repeats = repeats
+        self.poll_max_cycles = max_cycles
+        self._poll = None
+
+    def enable_backdoor(self, register_map=None):
+        """Access mapped registers by depositing into / sampling their signals, in zero sim time.
+
+        Only meant for test setup such as register-file preloads: no AXI-Lite
+        transaction takes place, so the DUT's bus logic and any read/write
+        side effects are bypassed. Accesses touching an unmapped register
+        still go through the bus (frontdoor), which stays the default.
+
+        Parameters
+        ----------
+        register_map : dict
+            Offset (from this MMIO's base address) -> signal handle, path
+            relative to the DUT instance (e.g. "poly_AXILiteS_s_axi_U.int_a_V"),
+            or (handle or path, lsb) for a 32-bit slice of a wider signal.
+            Without a map, the HWH REGISTERs of this address block are bound
+            to signals named int_<name>, int_<name>_V or <name> in the DUT
+            instance or one of its direct sub-instances
+
+        Returns
+        -------
+        dict : offset -> signal handle of every register mapped
+        """
+        backdoor = {}
+        if register_map is None:
+            registers = self._addressblock.registers if self._addressblock is not None else []
+            for register in registers:
+                handle = _find_register_signal(self.cpdut.dut, self.cpdut.prefix, register.name)
+                if handle is not None:
+                    backdoor[register.offset] = (handle, 0, register.size)
+        else:
+            for offset, target in register_map.items():
+                lsb = 0
+                if isinstance(target, tuple):
+                    target, lsb = target
+                handle = _resolve_path(self.cpdut, target) if isinstance(target, str) else target
+                backdoor[self._block_offset + offset] = (handle, lsb, 32)
+        self.backdoor = backdoor
+        return {offset - self._block_offset: handle for offset, (handle, _, _) in backdoor.items()}
+
+    def disable_backdoor(self):
+        self.backdoor = None
+
+    def _backdoor_targets(self, offset, count):
+        """Backdoor (handle, lsb, width) for `count` consecutive words from offset, or None unless all are mapped"""
+        if self.backdoor is None:
+            return None
+        targets = [self.backdoor.get(self._block_offset + offset + 4*i) for i in range(count)]
+        return None if None in targets else targets
+
+    async def _deposit_words(self, targets, words):
+        await self.cpdut.await_reset()
+        self.master.writes += 1
+        for (handle, lsb, width), word in zip(targets, words):
+            if lsb == 0 and width <= 32 and len(handle) <= 32:
+                handle.setimmediatevalue(word & ((1 << len(handle)) - 1))
+            else:
+                mask = 0xFFFFFFFF << lsb
+                handle.setimmediatevalue((int(handle.value) & ~mask) | ((word << lsb) & mask))
+
+    async def _sample_words(self, targets):
+        await self.cpdut.await_reset()
+        return [(int(handle.value) >> lsb) & 0xFFFFFFFF for handle, lsb, _ in targets]
+
+    @cocotb.function
+    async def _deposit_words_blocking(self, targets, words):
+        await posted.drain()
+        await self._deposit_words(targets, words)
+
     @cocotb.function
     async def read(self, offset=0, length=4, word_order="little"):
         """The method to read data from MMIO.
@@ -90,6 +196,34 @@ class MMIO():
             A list of data read out from MMIO
 
         """
+        key = (offset, length, word_order)
+        poll = self._poll
+        repeated = poll is not None and poll[0] == key and poll[2] == self.master.writes
+        if self.poll_repeats and repeated and poll[3] >= self.poll_repeats:
+            value = await self._read_until_change(offset, length, word_order, poll[1])
+        else:
+            value = await self.read_async(offset, length, word_order)
+        if self.poll_repeats:
+            repeats = poll[3] + 1 if repeated and poll[1] == value else 1
+            self._poll = (key, value, self.master.writes, repeats)
+        return value
+
+    async def _read_until_change(self, offset, length, word_order, value):
+        """Re-read until the value differs from `value`, for at most poll_max_cycles"""
+        deadline = gst("step") + self.poll_max_cycles * self.cpbus.clock.period
+        targets = self._backdoor_targets(offset, 2 if length == 8 else 1)
+        while gst("step") < deadline:
+            if targets is not None:
+                # Backdoor reads take no sim time: wait for the register to change instead
+                await First(*[Edge(handle) for handle, _, _ in targets], Timer(deadline - gst("step"), "step"))
+            new_value = await self.read_async(offset, length, word_order)
+            if new_value != value:
+                return new_value
+        return value
+
+    async def read_async(self, offset=0, length=4, word_order="little"):
+        """Coroutine version of `read`, for native cocotb tests: awaited
+        directly on the scheduler, without the synctest thread bridge"""
         await self.cpdut.await_reset()
         if length not in [1, 2, 4, 8]:
             raise ValueError(
@@ -101,20 +235,35 @@ class MMIO():
             raise ValueError("MMIO only supports big and little endian.")
         if offset % 4:
             raise MemoryError("Unaligned read: offset must be multiple of 4.")
+        await posted.drain()
+
+        targets = self._backdoor_targets(offset, 2 if length == 8 else 1)
+        if targets is not None:
+            words = await self._sample_words(targets)
+            if length == 8:
+                return (words[1] << 32) + words[0] if word_order == "little" else (words[0] << 32) + words[1]
+            return words[0] & ((2 ** (8 * length)) - 1)
 
-        # Read data out
-        lsb = int(await self.single_read_axi_lite(offset))
+        # Read data out, both words of an 8-byte read are in flight together
         if length == 8:
+            lsb_read = await self.master.issue_read(offset)
+            msb_read = await self.master.issue_read(offset + 4)
+            lsb = await self.master.result(lsb_read)
+            msb = await self.master.result(msb_read)
             if word_order == "little":
-                return ((int(await self.single_read_axi_lite(offset + 4))) << 32) + lsb
+                return (msb << 32) + lsb
             else:
-                return (lsb << 32) + int(await self.single_read_axi_lite(offset + 4))
+                return (lsb << 32) + msb
         else:
+            lsb = await self.single_read_axi_lite(offset)
             return lsb & ((2 ** (8 * length)) - 1)   
-    @cocotb.function
-    async def write(self, offset, data):
+    def write(self, offset, data):
         """The method to write data to MMIO.
 
+        In posted-write mode (see `cocotbpynq.set_posted_writes`) the write is
+        queued and this returns immediately; it is issued, in order, before the
+        next read, DMA wait() or flush() completes.
+
         NOTE: This function is heavily inspired by the PYNQ MMIO read function
         for the sake of parity, but must be copied to cocotbpynq to remove
         any PYNQ dependency(which would prevent this from running on
@@ -123,34 +272,125 @@ class MMIO():
         ----------
         offset : int
             The write offset from the MMIO base address.
-        data : int / bytes
-            The integer(s) to be written into MMIO.
+        data : int / bytes / numpy.ndarray
+            The integer(s) to be written into MMIO. bytes and arrays are
+            written as a block of consecutive 32-bit registers.
 
         Returns
         -------
         None
 
         """
+        words = _write_words_of(offset, data)
+        targets = self._backdoor_targets(offset, len(words))
+        if targets is not None:
+            if posted.enabled:
+                posted.post(self._deposit_words(targets, words))
+            else:
+                self._deposit_words_blocking(targets, words)
+        elif posted.enabled:
+            posted.post(self._write_words(offset, words))
+        else:
+            self._write_words_blocking(offset, words)
+
+    async def write_async(self, offset, data):
+        """Coroutine version of `write`: returns once the write response is
+        received, after any posted work, without the synctest thread bridge"""
+        words = _write_words_of(offset, data)
+        await posted.drain()
+        targets = self._backdoor_targets(offset, len(words))
+        if targets is not None:
+            await self._deposit_words(targets, words)
+        else:
+            await self._write_words(offset, words)
+
+    async def _write_words(self, offset, words):
+        await self.cpdut.await_reset()
+        await self.write_block_axi_lite(offset, words)
+
+    @cocotb.function
+    async def _write_words_blocking(self, offset, words):
+        await self._write_words(offset, words)
+
+    @cocotb.function
+    async def read_array(self, offset, count):
+        """Read a contiguous window of 32-bit registers in one call.
+
+        All reads are pipelined through the AXI-Lite master inside a single
+        coroutine, so the window costs one thread bridge rather than one
+        per register.
+
+        Parameters
+        ----------
+        offset : int
+            The read offset of the first register from the MMIO base address.
+        count : int
+            The number of 32-bit registers to read.
+
+        Returns
+        -------
+        numpy.ndarray
+            uint32 array of `count` register values
+
+        """
+        return await self.read_array_async(offset, count)
+
+    async def read_array_async(self, offset, count):
+        """Coroutine version of `read_array`, without the synctest thread bridge"""
         await self.cpdut.await_reset()
         if offset < 0:
             raise ValueError("Offset cannot be negative.")
-
         if offset % 4:
-            raise MemoryError("Unaligned write: offset must be multiple of 4.")
-
-        if type(data) is int:
-            await self.single_write_axi_lite(offset, data)
-        elif type(data) is bytes:
-            length = len(data)
-            num_words = length >> 2
-            if length % 4:
-                raise MemoryError("Unaligned write: data length must be multiple of 4.")
-            buf = np.frombuffer(data, np.uint32, num_words, 0)
-            for i in range(len(buf)):
-                await self.single_write_axi_lite(offset + 4*i, data)
-        else:
-            raise ValueError("Data type must be int or bytes.")
-        
+            raise MemoryError("Unaligned read: offset must be multiple of 4.")
+        if count < 0:
+            raise ValueError("Count cannot be negative.")
+        await posted.drain()
+        targets = self._backdoor_targets(offset, count)
+        if targets is not None:
+            return np.array(await self._sample_words(targets), dtype=np.uint32)
+        return np.array(await self.read_block_axi_lite(offset, count), dtype=np.uint32)
+
+    async def write_block_axi_lite(self, offset, words):
+        """Write consecutive 32-bit words, keeping the master's write pipeline full.
+
+        Parameters
+        ----------
+        offset : int
+            The write offset of the first word from the MMIO base address.
+        words : list
+            The integers to be written into MMIO.
+
+        Returns
+        -------
+        None
+
+        """
+        writes = []
+        for i, word in enumerate(words):
+            writes.append(await self.master.issue_write(offset + 4*i, word))
+        for write in writes:
+            await self.master.result(write)
+
+    async def read_block_axi_lite(self, offset, count):
+        """Read consecutive 32-bit words, keeping the master's read pipeline full.
+
+        Parameters
+        ----------
+        offset : int
+            The read offset of the first word from the MMIO base address.
+        count : int
+            The number of words to read.
+
+        Returns
+        -------
+        list : Values read from base address + offset onwards
+
+        """
+        reads = []
+        for i in range(count):
+            reads.append(await self.master.issue_read(offset + 4*i))
+        return [await self.master.result(read) for read in reads]
+
     async def single_write_axi_lite(self, offset, data):
         """The method to carry out AXI Lite write transaction at cocotb level.
 
@@ -158,53 +398,15 @@ class MMIO():
         ----------
         offset : int
             The write offset from the MMIO base address.
-        data : int / bytes
-            The integer(s) to be written into MMIO.
+        data : int
+            The integer to be written into MMIO.
 
         Returns
         -------
         None
 
         """
-        # Assert address
-        self.cpbus.AWADDR.value = offset
-        self.cpbus.AWVALID.value = 0b1
-        await ReadOnly()
-        periph_addr_ready = self.cpbus.AWREADY.value
-        while(periph_addr_ready == 0b0):
-            await RisingEdge(self.cpdut.clk)
-            await ReadOnly()
-            periph_addr_ready = self.cpbus.AWREADY.value
-        await RisingEdge(self.cpdut.clk)
-        self.cpbus.AWVALID.value = 0b0
-
-        # Send Data
-        self.cpbus.WVALID.value = 0b1
-        self.cpbus.WDATA.value = data
-        self.cpbus.WSTRB.value = 0xF
-        await ReadOnly()
-        periph_data_ready = self.cpbus.WREADY.value
-        while(periph_data_ready == 0b0):
-            await RisingEdge(self.cpdut.clk)
-            await ReadOnly()
-            periph_data_ready = self.cpbus.WREADY.value
-        await RisingEdge(self.cpdut.clk)
-        self.cpbus.WVALID.value = 0b0
-        self.cpbus.WSTRB.value = 0x0
-
-        # Accept response back
-        self.cpbus.BREADY.value = 0b1
-        await ReadOnly()
-        periph_resp_valid = self.cpbus.BVALID.value
-        while(periph_resp_valid == 0b0):
-            await RisingEdge(self.cpdut.clk)
-            await ReadOnly()
-            periph_resp_valid = self.cpbus.BVALID.value
-        write_resp = self.cpbus.BRESP.value
-        await RisingEdge(self.cpdut.clk)
-        self.cpbus.BREADY.value = 0b0
-        if (write_resp == 0b00):
-            print(f"Write Error occured. Response: {bin(write_resp)}")
+        await self.master.write(offset, data)
 
     async def single_read_axi_lite(self, offset):
         """The method to carry out AXI Lite read transaction at cocotb level.
@@ -219,30 +421,215 @@ class MMIO():
         int : Value read from base address + given offset
 
         """
-        # Assert address
+        return await self.master.read(offset)
+
+
+def _resolve_path(cpdut, path):
+    """Signal handle for a dotted path relative to a DUT instance"""
+    names = path.split(".")
+    handle = cpdut.signal(names[0]) if len(names) == 1 else getattr(cpdut.dut, names[0])
+    for name in names[1:]:
+        handle = getattr(handle, name)
+    return handle
+
+
+def _find_register_signal(dut, prefix, register_name):
+    """Storage signal of an HLS-style register: int_<name>, int_<name>_V or <name>, in dut or a direct sub-instance"""
+    candidates = [f"int_{register_name}", f"int_{register_name}_V", register_name]
+    for candidate in candidates:
+        if hasattr(dut, prefix + candidate):
+            return getattr(dut, prefix + candidate)
+    if prefix:
+        return None
+    for sub_handle in dut:
+        if isinstance(sub_handle, HierarchyObject):
+            for candidate in candidates:
+                if hasattr(sub_handle, candidate):
+                    return getattr(sub_handle, candidate)
+    return None
+
+
+def _write_words_of(offset, data):
+    """Validate an MMIO write and return the 32-bit words it writes"""
+    if offset < 0:
+        raise ValueError("Offset cannot be negative.")
+
+    if offset % 4:
+        raise MemoryError("Unaligned write: offset must be multiple of 4.")
+
+    if type(data) is int:
+        return [data]
+    elif type(data) is bytes or isinstance(data, np.ndarray):
+        # Whole register block: the byte image of data is written word by word
+        if type(data) is bytes:
+            buf = np.frombuffer(data, np.uint8)
+        else:
+            buf = np.ascontiguousarray(data).reshape(-1).view(np.uint8)
+        if buf.size % 4:
+            raise MemoryError("Unaligned write: data length must be multiple of 4.")
+        return buf.view("<u4").tolist()
+    else:
+        raise ValueError("Data type must be int, bytes or numpy.ndarray.")
+
+
+class AxiLiteMaster:
+    """
+    Pipelined AXI-Lite master for one DUT slave bus interface.
+
+    Each of the AW, W and AR channels is driven by its own coroutine and the
+    B and R channels are accepted by two more, so an address and its write data
+    go out in the same cycle, and up to `max_outstanding` reads and
+    `max_outstanding` writes can be in flight while their responses come back
+    in order (AXI-Lite has no IDs). As on the bus, reads are not ordered
+    behind writes still in flight: await a write's `result` before reading
+    back what it wrote.
+
+    Parameters
+    ----------
+    cpbus : CocotbPynqBusInterface
+        AXI-Lite slave bus interface of the DUT
+    max_outstanding : int
+        Maximum number of reads, and separately writes, awaiting a response
+    """
+    def __init__(self, cpbus, max_outstanding=4):
+        if max_outstanding < 1:
+            raise ValueError("max_outstanding must be at least 1.")
+        self.cpbus = cpbus
+        self.channel = f"{cpbus.cpdut.instance_name}.{cpbus.portname}"
+        self.max_outstanding = max_outstanding
+        # Writes issued so far, so polling coalescing can tell a register may have been changed by us
+        self.writes = 0
+        self._write_slots = Queue(maxsize=max_outstanding)
+        self._read_slots = Queue(maxsize=max_outstanding)
+        self._aw, self._w, self._b = Queue(), Queue(), Queue()
+        self._ar, self._r = Queue(), Queue()
+        cpbus.ARVALID.value = 0b0
+        cpbus.AWVALID.value = 0b0
+        cpbus.BREADY.value = 0b0
+        cpbus.RREADY.value = 0b0
+        cpbus.WVALID.value = 0b0
+        cocotb.start_soon(self._drive("AW", self._aw, cpbus.AWVALID, cpbus.AWREADY, self._assign_aw))
+        cocotb.start_soon(self._drive("W", self._w, cpbus.WVALID, cpbus.WREADY, self._assign_w))
+        cocotb.start_soon(self._drive("AR", self._ar, cpbus.ARVALID, cpbus.ARREADY, self._assign_ar))
+        cocotb.start_soon(self._accept(self._b, self._write_slots, cpbus.BVALID, cpbus.BREADY, self._sample_b))
+        cocotb.start_soon(self._accept(self._r, self._read_slots, cpbus.RVALID, cpbus.RREADY, self._sample_r))
+
+    async def issue_write(self, offset, data, strb=0xF):
+        """Queue a write, blocking only while `max_outstanding` writes are in flight.
+
+        Returns
+        -------
+        Event : Set with the BRESP value once the write response is accepted
+        """
+        await self._write_slots.put(None)
+        self.writes += 1
+        done = Event()
+        record = profiler.begin("mmio_write", self.channel, self.cpbus.clock, offset, 4)
+        row = recorder.begin("mmio_write", self.channel, self.cpbus.clock, offset, data)
+        self._aw.put_nowait((offset, record))
+        self._w.put_nowait(((data, strb), record))
+        self._b.put_nowait(((done, row), record))
+        return done
+
+    async def issue_read(self, offset):
+        """Queue a read, blocking only while `max_outstanding` reads are in flight.
+
+        Returns
+        -------
+        Event : Set with (RDATA, RRESP) once the read data is accepted
+        """
+        await self._read_slots.put(None)
+        done = Event()
+        record = profiler.begin("mmio_read", self.channel, self.cpbus.clock, offset, 4)
+        row = recorder.begin("mmio_read", self.channel, self.cpbus.clock, offset)
+        self._ar.put_nowait((offset, record))
+        self._r.put_nowait(((done, row), record))
+        return done
+
+    async def result(self, done):
+        """Wait for an issued transaction and return its data (reads) or response (writes)"""
+        await done.wait()
+        if isinstance(done.data, tuple):
+            read_data, read_resp = done.data
+            if (read_resp != 0b00):
+                self.cpbus.cpdut.dut._log.error(f"{self.channel}: read error response {bin(read_resp)}")
+            return read_data
+        if (done.data != 0b00):
+            self.cpbus.cpdut.dut._log.error(f"{self.channel}: write error response {bin(done.data)}")
+        return done.data
+
+    async def write(self, offset, data, strb=0xF):
+        return await self.result(await self.issue_write(offset, data, strb))
+
+    async def read(self, offset):
+        return await self.result(await self.issue_read(offset))
+
+    def _assign_aw(self, offset):
+        self.cpbus.AWADDR.value = offset
+
+    def _assign_w(self, item):
+        self.cpbus.WDATA.value, self.cpbus.WSTRB.value = item
+
+    def _assign_ar(self, offset):
         self.cpbus.ARADDR.value = offset
-        self.cpbus.ARVALID.value = 0b1
-        await ReadOnly()
-        periph_addr_ready = self.cpbus.ARREADY.value
-        while(periph_addr_ready == 0b0):
-            await RisingEdge(self.cpdut.clk)
-            await ReadOnly()
-            periph_addr_ready = self.cpbus.ARREADY.value
-        await RisingEdge(self.cpdut.clk)
-        self.cpbus.ARVALID.value = 0b0
-
-        # Accept value back
-        self.cpbus.RREADY.value = 0b1
-        await ReadOnly()
-        periph_data_valid = self.cpbus.RVALID.value
-        while(periph_data_valid == 0b0):
-            await RisingEdge(self.cpdut.clk)
-            await ReadOnly()
-            periph_data_valid = self.cpbus.RVALID.value
-        read_data = int(self.cpbus.RDATA.value)
-        read_resp = self.cpbus.RRESP.value
-        await RisingEdge(self.cpdut.clk)
-        self.cpbus.RREADY.value = 0b0
-        if (read_resp == 0b00):
-            print(f"Read Error occured: {bin(read_resp)}")
-        return read_data
\ No newline at end of file
+
+    def _sample_b(self):
+        return int(self.cpbus.BRESP.value)
+
+    def _sample_r(self):
+        return (int(self.cpbus.RDATA.value), int(self.cpbus.RRESP.value))
+
+    async def _drive(self, name, requests, valid, ready, assign):
+        """Drive a VALID/READY request channel back to back from a queue"""
+        await self.cpbus.cpdut.await_reset()
+        clk_edge, settled = RisingEdge(self.cpbus.clock.signal), ReadOnly()
+        while True:
+            if requests.empty():
+                valid.value = 0b0
+            payload, record = await requests.get()
+            assign(payload)
+            valid.value = 0b1
+            await settled
+            accepted = ready.value
+            await clk_edge
+            stall = 0
+            while not accepted:
+                await settled
+                accepted = ready.value
+                await clk_edge
+                stall += 1
+            if record is not None:
+                record.stalls[name] = stall
+
+    async def _accept(self, pending, slots, valid, ready, sample):
+        """Hold READY on a response channel while transactions are in flight"""
+        await self.cpbus.cpdut.await_reset()
+        clk_edge, settled = RisingEdge(self.cpbus.clock.signal), ReadOnly()
+        while True:
+            if pending.empty():
+                ready.value = 0b0
+            (done, row), record = await pending.get()
+            ready.value = 0b1
+            accepted = False
+            stall = 0
+            while not accepted:
+                await settled
+                accepted = valid.value
+                if accepted:
+                    response = sample()
+                    if waves.on_error and (response[1] if isinstance(response, tuple) else response) != 0b00:
+                        waves.trigger(f"{self.channel} error response")
+                elif record is not None and _address_phase_done(record):
+                    stall += 1
+                await clk_edge
+            slots.get_nowait()
+            if record is not None:
+                # AW and W stall in parallel, the response wait only counts once both are done
+                address_stall = max(record.stalls.get("AW", 0), record.stalls.get("W", 0)) + record.stalls.get("AR", 0)
+                profiler.end(record, 2, address_stall + stall)
+            recorder.end(row, 2, response[0] if isinstance(response, tuple) else None)
+            done.set(response)
+
+
+def _address_phase_done(record):
+    return "AR" in record.stalls or ("AW" in record.stalls and "W" in record.stalls)
@@ -15,14 +15,120 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from .axi_memory import AxiMemorySlave
 from .dma import DMA
 from cocotb import top as cocotop
 from .dut import CocotbPynqDut
+from .hwh import HwhDesign, is_simulated_module, load_hwh
+from .interrupt import Interrupt
 import os
 from xml.etree import ElementTree
 
-hwh_tree: ElementTree.Element = None
+# Design of the most recently loaded Overlay. Like the PL of a board, it is what
+# MMIO physical addresses are decoded against; drivers get their context from it
+current_design = None
+# Kept for scripts written against earlier versions: the current design's HWH
+# model, its first simulated instance, and all of them by INSTANCE name
+hwh_design: HwhDesign = None
 cptop: CocotbPynqDut = None
+cpduts: dict = {}
+# SimulatedDesign per HWH path, kept for the rest of the simulator session
+_designs = {}
+# HWH of the current design, and its ElementTree roots once parsed for `hwh_tree`
+_hwh_name = None
+_hwh_trees = {}
+
+def __getattr__(name):
+    # hwh_tree (the raw HWH ElementTree root) is only parsed if an older script still asks for it
+    if name == "hwh_tree":
+        if _hwh_name is None:
+            return None
+        if _hwh_name not in _hwh_trees:
+            _hwh_trees[_hwh_name] = ElementTree.parse(_hwh_name).getroot()
+        return _hwh_trees[_hwh_name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class SimulatedDesign:
+    """
+    Driver context of one Overlay: its HWH model and a CocotbPynqDut for
+    every simulated instance found in it.
+
+    Each instance's ports are looked up, in order, on a sub-instance of the
+    toplevel named after the HWH instance, as toplevel ports prefixed with
+    "<instance>_" (a wrapper exposing several kernels), or on the toplevel
+    itself when it is the only instance of its module type. Instances with none of these are not
+    simulated. Every instance gets its own clocks, reset, AXI-Lite masters
+    and DMA engines, so traffic to different instances interleaves freely.
+
+    Parameters
+    ----------
+    hwh_design : HwhDesign
+        Model of the overlay's HWH
+    top : SimHandleBase
+        cocotb toplevel handle
+    """
+    def __init__(self, hwh_design: HwhDesign, top):
+        self.hwh_design = hwh_design
+        self.top = top
+        self.cpduts = {}
+        modules = [module for module in hwh_design.modules.values() if is_simulated_module(module, str(top))]
+        for module in modules:
+            handle, prefix = self._find_handle(top, module, modules)
+            if handle is None:
+                continue
+            cpdut = CocotbPynqDut(handle, module, True, prefix)
+            self.cpduts[cpdut.instance_name] = cpdut
+            self._attach_memory(cpdut)
+        if not self.cpduts:
+            raise RuntimeError(f"No instance of the HWH is simulated by toplevel {top}")
+
+    @staticmethod
+    def _attach_memory(cpdut):
+        """Serve the instance's AXI4 master ports (e.g. HLS m_axi) from allocate() buffers"""
+        for cpbus in cpdut.bus_interfaces.values():
+            if cpbus.type == "MASTER" and cpbus.vlnv.split(":")[:3] == ["xilinx.com", "interface", "aximm"]:
+                cpbus.axi_memory_slave = AxiMemorySlave(cpbus)
+
+    @property
+    def running(self):
+        """Whether the clocks and drivers of this design belong to the running test"""
+        return all(cpdut.running for cpdut in self.cpduts.values())
+
+    def restart(self, reset_cycles=3, waiting_cycles=4):
+        """
+        Make the design usable by a new test of the same simulator session:
+        restart the clocks, reset every instance and drop the previous test's
+        AXI-Lite masters and DMA engines (their coroutines ended with it), to be
+        created again on first use. The HWH model, handles and clock and bus
+        interface objects are kept.
+        """
+        for cpdut in self.cpduts.values():
+            for cpbus in cpdut.bus_interfaces.values():
+                for driver in ("axi_lite_master", "dma_channel", "axi_memory_slave"):
+                    if hasattr(cpbus, driver):
+                        delattr(cpbus, driver)
+            cpdut.start(True, reset_cycles, waiting_cycles)
+            self._attach_memory(cpdut)
+
+    @staticmethod
+    def _find_handle(top, module, modules):
+        """(handle, port prefix) simulating module, or (None, "")"""
+        if hasattr(top, module.instance):
+            return getattr(top, module.instance), ""
+        clk_port = module.find_port("clk")
+        if clk_port is not None and hasattr(top, module.instance + "_" + clk_port.name):
+            return top, module.instance + "_"
+        # Otherwise the toplevel itself, if it is the only instance of its type
+        if str(top) == module.modtype and [other.modtype for other in modules].count(module.modtype) == 1:
+            return top, ""
+        return None, ""
+
+    def bus_interfaces(self):
+        """Bus interfaces of every simulated instance, keyed by instance.port"""
+        return {f"{instance}.{portname}": cpbus for instance, cpdut in self.cpduts.items()
+                for portname, cpbus in cpdut.bus_interfaces.items()}
+
 
 class DefaultIP:
     """ Currently just used to allow recursive hierarchical reference"""
@@ -30,20 +136,21 @@ class DefaultIP:
 
 class HierarchyObject:
     """
-    Hierarchy object used by overlay class to hierarchically reference IPs
+    Hierarchy object used by overlay class to hierarchically reference IPs.
+    IP driver objects (and sub-hierarchies) are only created the first time
+    they are accessed as attributes.
 
     Parameters
     ----------
     hierarchy : str/dict
         IP names or hierarchy of IP names
     """
-    def __init__(self, hierarchy):
-        self.hierarchy_dict = {}
-        for hierarchy_object in hierarchy.keys():
-            if(type(hierarchy[hierarchy_object]) == str):
-                self.hierarchy_dict[hierarchy_object] = self.create_IP(hierarchy[hierarchy_object])
-            else:
-                self.hierarchy_dict[hierarchy_object] = HierarchyObject(hierarchy[hierarchy_object])
+    __slots__ = ("hierarchy_dict", "_instantiated", "_design")
+
+    def __init__(self, hierarchy, design: SimulatedDesign):
+        self.hierarchy_dict = hierarchy
+        self._instantiated = {}
+        self._design = design
 
     def create_IP(self, instance_name):
         """
@@ -54,16 +161,36 @@ class HierarchyObject:
         hierarchy : str/dict
             IP instance type
         """
-        instance_el = hwh_tree.find(f"./MODULES/MODULE[@INSTANCE='{instance_name}']")
+        instance = self._design.hwh_design.module(instance_name)
         
         # Currently only DMA is supported here. Add more cases for more IP blocks as needed
-        if(instance_el.get("VLNV").split(":")[:3] == ["xilinx.com", "ip", "axi_dma"]):
-            return DMA(cptop.bus_interfaces, instance_el)
-        else:
-            return DefaultIP()
+        if(instance.is_vlnv("xilinx.com", "ip", "axi_dma")):
+            return DMA(self._design.bus_interfaces(), instance)
+        ip = DefaultIP()
+        # As in PYNQ, a simulated IP's interrupt pins are attributes named after the pin
+        if(instance.instance in self._design.cpduts):
+            for port in instance.ports:
+                if(port.sigis == "INTERRUPT" and port.dir == "O"):
+                    setattr(ip, port.name, Interrupt(f"{instance.fullname.lstrip('/')}/{port.name}"))
+        return ip
 
     def __getattr__(self, key):
-        return self.hierarchy_dict[key]
+        # Unset slots (of this class or a subclass, e.g. Overlay.ip_dict) also end up here;
+        # never try to resolve them as IPs
+        if any(key in getattr(cls, "__slots__", ()) for cls in type(self).__mro__):
+            raise AttributeError(key)
+        if key not in self._instantiated:
+            if key not in self.hierarchy_dict:
+                raise AttributeError(f"{type(self).__name__} has no IP or hierarchy named {key}")
+            hierarchy_object = self.hierarchy_dict[key]
+            if(type(hierarchy_object) == str):
+                self._instantiated[key] = self.create_IP(hierarchy_object)
+            else:
+                self._instantiated[key] = HierarchyObject(hierarchy_object, self._design)
+        return self._instantiated[key]
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.hierarchy_dict))
 
 
 class Overlay(HierarchyObject):
@@ -74,7 +201,15 @@ class Overlay(HierarchyObject):
     ----------
     bitfile_name : str
         Name of bitstream file. Used to determine hwh file with same name. Needed for parity with PYNQ
+
+    Attributes
+    ----------
+    ip_dict : dict
+        PYNQ-style description of every addressable IP, keyed by hierarchical
+        name. Building it does not instantiate any driver
     """
+    __slots__ = ("ip_dict",)
+
     def __init__(self, bitfile_name=None):
         bitstream_dir = os.getenv("HWH_LOCATION_DIR")
         if(not bitstream_dir):
@@ -84,30 +219,45 @@ class Overlay(HierarchyObject):
         if(not os.path.isfile(hwh_name)):
             raise ValueError(f"HWH file does not exist at {hwh_name}")
 
-        # Create global variable hwh_tree
-        global hwh_tree
-        hwh_tree = ElementTree.parse(hwh_name).getroot()
-
-        dut_module_name = str(cocotop)
-        dut_module_el = hwh_tree.find(f"./MODULES/MODULE[@MODTYPE='{dut_module_name}']")
+        # The design is built once per simulator session; later tests (and Overlays) restart and reuse it
+        design = _designs.get(hwh_name)
+        if design is None or design.top is not cocotop:
+            # HWH is parsed once, then served from the on-disk cache
+            design = SimulatedDesign(load_hwh(hwh_name), cocotop)
+            _designs[hwh_name] = design
+        elif not design.running:
+            design.restart()
 
-        # Create global variable cptop
-        global cptop
-        cptop = CocotbPynqDut(cocotop, dut_module_el, True)
+        global current_design, hwh_design, cptop, _hwh_name
+        current_design = design
+        _hwh_name = hwh_name
+        hwh_design = design.hwh_design
+        cptop = next(iter(design.cpduts.values()))
+        cpduts.clear()
+        cpduts.update(design.cpduts)
 
         # discover all hierarchichally referenceble instances, as per how pynq library discovers them (for Zynq)
-        processing_system_el = hwh_tree.find(f"./MODULES/MODULE[@MODTYPE='processing_system7']")
-        if (processing_system_el is None):
+        processing_system = hwh_design.processing_system
+        if (processing_system is None):
             raise RuntimeError("No processing_system7 found. Please check that the HWH file you have generated is for a Zynq device. Only Zynq devices are supported at this time")
         instances_to_add = []
-        for memrange in processing_system_el.findall("./MEMORYMAP/MEMRANGE"):
-            instances_to_add.append(memrange.get("INSTANCE"))
+        self.ip_dict = {}
+        for memrange in processing_system.memranges:
+            instances_to_add.append(memrange.instance)
+            instance = hwh_design.module(memrange.instance)
+            self.ip_dict[instance.fullname.lstrip("/")] = {
+                "fullpath": instance.fullname.lstrip("/"),
+                "type": instance.vlnv,
+                "phys_addr": memrange.base,
+                "addr_range": memrange.high - memrange.base + 1,
+                "mem_id": memrange.slave_bus_interface,
+                "parameters": instance.parameters,
+            }
 
         # Create pre-processor dict hierarchy
         hierarchy_to_add = {}
         for instance_name in instances_to_add:
-            instance_el = hwh_tree.find(f"./MODULES/MODULE[@INSTANCE='{instance_name}']")
-            instance_fullname = instance_el.get("FULLNAME")
+            instance_fullname = hwh_design.module(instance_name).fullname
             instance_hierarchy = instance_fullname.lstrip("/").split("/")
             imm_hierarchy = hierarchy_to_add
             for next_hierarchy_item in instance_hierarchy:
@@ -118,4 +268,4 @@ class Overlay(HierarchyObject):
                 imm_hierarchy = imm_hierarchy[next_hierarchy_item]
 
         # Create actual referenceable hierarchy structure recursively
-        super().__init__(hierarchy_to_add)
+        super().__init__(hierarchy_to_add, design)
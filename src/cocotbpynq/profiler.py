@@ -0,0 +1,166 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+from time import perf_counter
+from cocotb.utils import get_sim_time as gst, get_time_from_sim_steps
+
+class Transaction:
+    """
+    Profile record of one MMIO access or DMA transfer.
+
+    Cycles are split into beats actually transferred, `dut_stall` cycles spent
+    waiting for the DUT's READY/VALID, and `overhead` cycles in which the
+    driver itself was not yet (or no longer) presenting the transaction.
+    `board_time` is the time those cycles take at the channel's HWH clock
+    frequency, i.e. the estimated duration on the board.
+    """
+    __slots__ = ("kind", "channel", "address", "nbytes", "clk_period", "freq_hz", "start_step", "end_step",
+                 "beats", "cycles", "dut_stall", "overhead", "wall_start", "wall", "stalls")
+
+    def __init__(self, kind, channel, clock, address=None, nbytes=0):
+        self.kind = kind
+        self.channel = channel
+        self.address = address
+        self.nbytes = nbytes
+        self.clk_period = clock.period
+        self.freq_hz = clock.freq_hz
+        self.start_step = gst("step")
+        self.end_step = None
+        self.beats = 0
+        self.cycles = 0
+        self.dut_stall = 0
+        self.overhead = 0
+        self.wall_start = perf_counter()
+        self.wall = 0.0
+        # Stall cycles per AXI channel, filled in by the channel drivers
+        self.stalls = {}
+
+    @property
+    def board_time(self):
+        return self.cycles / self.freq_hz
+
+    def as_dict(self):
+        record = {name: getattr(self, name) for name in self.__slots__ if name != "stalls"}
+        record["board_time"] = self.board_time
+        return record
+
+
+class Profiler:
+    """
+    Transaction-level profiler for MMIO and DMA traffic.
+
+    Disabled by default; enable it with `profiler.enable()` or by setting
+    COCOTBPYNQ_PROFILE to the path of a Chrome/Perfetto trace to write at the
+    end of each synctest.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.records = []
+        # Callables given every completed Transaction, e.g. wave capture triggers
+        self.listeners = []
+
+    def enable(self, trace_path=None):
+        self.enabled = True
+        self.trace_path = trace_path
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.records = []
+
+    def begin(self, kind, channel, clock, address=None, nbytes=0):
+        """Start a record on a CocotbPynqClock's domain, or return None when profiling is disabled"""
+        if not self.enabled:
+            return None
+        return Transaction(kind, channel, clock, address, nbytes)
+
+    def end(self, txn, beats, dut_stall):
+        if txn is None:
+            return
+        txn.end_step = gst("step")
+        txn.wall = perf_counter() - txn.wall_start
+        txn.beats = beats
+        txn.cycles = (txn.end_step - txn.start_step) // txn.clk_period
+        txn.dut_stall = dut_stall
+        txn.overhead = max(txn.cycles - beats - dut_stall, 0)
+        self.records.append(txn)
+        for listener in self.listeners:
+            listener(txn)
+
+    def chrome_trace(self):
+        """Records as a Chrome trace event dict (one track per channel, times in sim us)"""
+        events = []
+        for txn in self.records:
+            start_us = get_time_from_sim_steps(txn.start_step, "us")
+            events.append({
+                "name": txn.kind,
+                "cat": txn.kind.split("_")[0],
+                "ph": "X",
+                "ts": start_us,
+                "dur": get_time_from_sim_steps(txn.end_step, "us") - start_us,
+                "pid": txn.channel.split(".")[0],
+                "tid": txn.channel,
+                "args": {
+                    "address": None if txn.address is None else hex(txn.address),
+                    "bytes": txn.nbytes,
+                    "cycles": txn.cycles,
+                    "beats": txn.beats,
+                    "dut_stall_cycles": txn.dut_stall,
+                    "overhead_cycles": txn.overhead,
+                    "board_us": txn.board_time * 1e6,
+                    "wall_s": txn.wall,
+                },
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+    def summary(self):
+        """
+        Table of totals per (channel, kind): achieved bytes/cycle, and the
+        estimated board time, mean latency and throughput at the HWH clock
+        """
+        totals = {}
+        for txn in self.records:
+            total = totals.setdefault((txn.channel, txn.kind), [0, 0, 0, 0, 0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += txn.nbytes
+            total[2] += txn.cycles
+            total[3] += txn.dut_stall
+            total[4] += txn.overhead
+            total[5] += txn.wall
+            total[6] += txn.board_time
+        header = (f"{'channel':<40} {'kind':<10} {'count':>7} {'bytes':>10} {'cycles':>10} {'dut stall':>10} {'overhead':>10} "
+                  f"{'B/cycle':>8} {'wall s':>8} {'board us':>10} {'lat. us':>8} {'MB/s':>8}")
+        lines = [header, "-" * len(header)]
+        for (channel, kind), (count, nbytes, cycles, stall, overhead, wall, board) in sorted(totals.items()):
+            per_cycle = nbytes / cycles if cycles else 0.0
+            board_rate = nbytes / board / 1e6 if board else 0.0
+            lines.append(f"{channel:<40} {kind:<10} {count:>7} {nbytes:>10} {cycles:>10} {stall:>10} {overhead:>10} "
+                         f"{per_cycle:>8.3f} {wall:>8.3f} {board*1e6:>10.2f} {board*1e6/count:>8.3f} {board_rate:>8.1f}")
+        return "\n".join(lines)
+
+
+profiler = Profiler()
+if os.getenv("COCOTBPYNQ_PROFILE"):
+    profiler.enable(os.getenv("COCOTBPYNQ_PROFILE"))
@@ -0,0 +1,251 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import cocotb
+import numpy as np
+from cocotb.triggers import RisingEdge, Timer
+from cocotb.utils import get_sim_time as gst
+
+# Transaction kinds, stored by index in the "kind" column
+KINDS = ("mmio_write", "mmio_read", "dma_send", "dma_recv")
+
+TRACE_DTYPE = np.dtype([
+    ("kind", "u1"),
+    ("channel", "u2"),
+    ("address", "<u8"),
+    ("data", "<u8"),
+    ("start_step", "<i8"),
+    ("end_step", "<i8"),
+    ("stall", "<u4"),
+    ("beats", "<u4"),
+    ("last", "u1"),
+    ("payload_offset", "<u8"),
+    ("payload_size", "<u8"),
+])
+
+
+class Trace:
+    """
+    Columnar record of bus transactions.
+
+    `rows` is a TRACE_DTYPE structured array in issue order: transaction
+    kind (index into KINDS), channel (index into `channels`), AXI-Lite
+    address and data (read data for reads), start/end sim steps, stall
+    cycles (cycles beyond the beats transferred) and, for AXI-Stream rows,
+    the beat count, TLAST and the slice of `payload` holding the bytes
+    streamed.
+    """
+    def __init__(self, rows, payload, channels):
+        self.rows = rows
+        self.payload = payload
+        self.channels = list(channels)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def payload_of(self, index):
+        row = self.rows[index]
+        return self.payload[row["payload_offset"]:row["payload_offset"] + row["payload_size"]]
+
+    def save(self, path):
+        from .checkpoint import _npz_path
+        np.savez_compressed(_npz_path(path), rows=self.rows, payload=self.payload, channels=np.array(self.channels, dtype=str))
+
+
+def load_trace(path):
+    from .checkpoint import _npz_path
+    with np.load(_npz_path(path)) as trace_file:
+        return Trace(trace_file["rows"], trace_file["payload"], trace_file["channels"].tolist())
+
+
+class Recorder:
+    """
+    Records every AXI-Lite transaction of MMIO and every AXI-Stream burst of
+    DMA_Channel, for `replay`.
+
+    Disabled by default; enable it with `recorder.enable()` or by setting
+    COCOTBPYNQ_RECORD to the path of an .npz trace to write at the end of
+    each synctest.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.reset()
+
+    def enable(self, trace_path=None):
+        self.enabled = True
+        self.trace_path = trace_path
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.rows = []
+        self.payloads = []
+        self.payload_size = 0
+        self.channels = {}
+
+    def begin(self, kind, channel, clock, address=0, data=0):
+        """Start a row on a CocotbPynqClock's domain, or return None when recording is disabled"""
+        if not self.enabled:
+            return None
+        channel_id = self.channels.setdefault(channel, len(self.channels))
+        return [KINDS.index(kind), channel_id, address, data, gst("step"), 0, 0, 0, 0, 0, 0, clock.period]
+
+    def end(self, row, beats, data=None, payload=None, last=False):
+        """Complete a row: `data` is AXI-Lite read data, `payload` the uint8 bytes of an AXI-Stream burst"""
+        if row is None:
+            return
+        row[5] = gst("step")
+        row[6] = max((row[5] - row[4]) // row.pop() - beats, 0)
+        row[7] = beats
+        row[8] = last
+        if data is not None:
+            row[3] = data
+        if payload is not None:
+            row[9] = self.payload_size
+            row[10] = payload.size
+            self.payloads.append(payload)
+            self.payload_size += payload.size
+        self.rows.append(tuple(row))
+
+    def trace(self):
+        rows = np.array(self.rows, dtype=TRACE_DTYPE)
+        payload = np.concatenate(self.payloads) if self.payloads else np.empty(0, np.uint8)
+        return Trace(rows, payload, sorted(self.channels, key=self.channels.get))
+
+    def save(self, path):
+        self.trace().save(path)
+
+
+recorder = Recorder()
+if os.getenv("COCOTBPYNQ_RECORD"):
+    recorder.enable(os.getenv("COCOTBPYNQ_RECORD"))
+
+
+async def replay(trace, design=None):
+    """
+    Drive a recorded trace back into the DUT, with no test logic in the loop.
+
+    The replay starts once the DUTs are out of reset. Every transaction is
+    issued on its channel in recorded order, as long after the start as it
+    was after the trace's first transaction (or as soon as the channel is
+    free, if the DUT has fallen behind). Channels are replayed concurrently.
+    AXI-Lite reads and DMA receives are checked against the recorded data,
+    so a trace captured once serves as a fixed stimulus for bisecting RTL
+    changes.
+    With the recorder enabled, the replay is itself recorded.
+
+    Parameters
+    ----------
+    trace : Trace or str
+        Trace, or path of a trace saved by `Recorder.save`
+    design : SimulatedDesign
+        Design to drive, the current Overlay's by default
+
+    Returns
+    -------
+    list : (row index, recorded, replayed) for every read whose data differs
+    """
+    from . import overlay
+    if isinstance(trace, (str, os.PathLike)):
+        trace = load_trace(trace)
+    design = design or overlay.current_design
+    if design is None:
+        raise RuntimeError("No design to replay into: load an Overlay or pass a SimulatedDesign")
+    bus_interfaces = design.bus_interfaces()
+    for channel in trace.channels:
+        if channel not in bus_interfaces:
+            raise RuntimeError(f"Trace channel {channel} is not simulated by this design")
+    for channel in trace.channels:
+        await bus_interfaces[channel].cpdut.await_reset()
+    # Added to a recorded start step to give the step it is replayed at
+    offset = gst("step") - int(trace.rows["start_step"].min()) if len(trace) else 0
+    mismatches = []
+    tasks = []
+    for channel_id, channel in enumerate(trace.channels):
+        indices = np.flatnonzero(trace.rows["channel"] == channel_id)
+        if not indices.size:
+            continue
+        replay_channel = _replay_mmio if KINDS[trace.rows[indices[0]]["kind"]].startswith("mmio") else _replay_stream
+        tasks.append(cocotb.start_soon(replay_channel(trace, indices, bus_interfaces[channel], offset, mismatches)))
+    for task in tasks:
+        await task
+    mismatches.sort(key=lambda mismatch: mismatch[0])
+    return mismatches
+
+
+async def _until(step, clock):
+    """
+    Resume on the first edge of a CocotbPynqClock at or after sim step `step`.
+    Recorded transactions start from an edge; a Timer landing on the edge's
+    step could run before it, and a beat offered there would miss the edge
+    """
+    delay = int(step) - gst("step")
+    if delay > 0:
+        if delay > 1:
+            await Timer(delay - 1, "step")
+        await RisingEdge(clock.signal)
+
+
+async def _replay_mmio(trace, indices, cpbus, offset, mismatches):
+    from .mmio import AxiLiteMaster
+    if not hasattr(cpbus, "axi_lite_master"):
+        cpbus.axi_lite_master = AxiLiteMaster(cpbus)
+    master = cpbus.axi_lite_master
+    reads = []
+    writes = []
+    for index in indices:
+        row = trace.rows[index]
+        await _until(row["start_step"] + offset, cpbus.clock)
+        if KINDS[row["kind"]] == "mmio_write":
+            writes.append(await master.issue_write(int(row["address"]), int(row["data"])))
+        else:
+            reads.append((index, int(row["data"]), await master.issue_read(int(row["address"]))))
+    for index, recorded, done in reads:
+        replayed = await master.result(done)
+        if replayed != recorded:
+            mismatches.append((int(index), recorded, replayed))
+    # The replay is over only once every write has been responded to
+    for done in writes:
+        await master.result(done)
+
+
+async def _replay_stream(trace, indices, cpbus, offset, mismatches):
+    from .dma import channel_of
+    send = KINDS[trace.rows[indices[0]]["kind"]] == "dma_send"
+    channel = channel_of(cpbus, "write" if send else "read")
+    # Bursts are queued on the channel's engine: one falling due while the previous is still
+    # streaming follows straight on, and TVALID/TREADY drops whenever the queue runs dry
+    descriptors = []
+    received = []
+    for index in indices:
+        row = trace.rows[index]
+        await _until(row["start_step"] + offset, cpbus.clock)
+        recorded = trace.payload_of(index)
+        if send:
+            descriptors.append(channel.queue_transfer(recorded, last=bool(row["last"])))
+        else:
+            replayed = np.zeros(recorded.size, np.uint8)
+            descriptors.append(channel.queue_transfer(replayed))
+            received.append((index, recorded, replayed))
+    for descriptor in descriptors:
+        await descriptor.wait_async()
+    for index, recorded, replayed in received:
+        if not np.array_equal(replayed, recorded):
+            mismatches.append((int(index), recorded, replayed))
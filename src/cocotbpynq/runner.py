@@ -0,0 +1,306 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from concurrent.futures import ProcessPoolExecutor
+import fcntl
+import hashlib
+import json
+import os
+import subprocess
+import shutil
+import sys
+from pathlib import Path
+from xml.etree import ElementTree
+import cocotb
+from cocotb.runner import get_runner
+from .hwh import is_simulated_module, load_hwh, _cache_dir
+
+# Extra build arguments and waveform setting of each build profile, per simulator
+PROFILES = {
+    "debug": {"waves": True, "build_args": {}},
+    "perf": {
+        "waves": False,
+        "build_args": {
+            "verilator": ["-O3", "--x-assign", "fast", "--x-initial", "fast", "--noassert",
+                          "-CFLAGS", "-O3", "--threads", "{threads}", "-j", "0"],
+            "icarus": ["-O"],
+        },
+    },
+}
+
+# Name of the executable to ask for a version string, where it differs from the simulator name
+SIM_EXECUTABLES = {"icarus": "iverilog"}
+
+def hwh_toplevel(hwh_name):
+    """MODTYPE of the design's first HLS kernel or module_ref (the RTL cocotbpynq simulates), or None"""
+    for module in load_hwh(hwh_name).modules.values():
+        if is_simulated_module(module):
+            return module.modtype
+    return None
+
+
+def _simulator_version(simulator):
+    executable = shutil.which(SIM_EXECUTABLES.get(simulator, simulator))
+    if executable is None:
+        return "unknown"
+    try:
+        result = subprocess.run([executable, "--version"], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return (result.stdout or result.stderr).strip().split("\n")[0]
+
+
+def build_key(sources, hdl_toplevel, simulator, parameters=None, defines=None, includes=None, build_args=None, timescale=None, waves=False):
+    """
+    SHA-256 identifying a compiled model.
+
+    Sources and files under include directories are hashed by content, not
+    path, so the same RTL checked out elsewhere maps to the same model.
+    """
+    parameters, defines = parameters or {}, defines or {}
+    includes, build_args = includes or [], build_args or []
+    key = hashlib.sha256()
+    key.update(json.dumps({
+        "simulator": simulator,
+        "simulator_version": _simulator_version(simulator),
+        "cocotb": cocotb.__version__,
+        "cocotb_libs": str(cocotb.config.libs_dir),
+        "toplevel": hdl_toplevel,
+        "parameters": {str(name): str(value) for name, value in parameters.items()},
+        "defines": {str(name): str(value) for name, value in defines.items()},
+        "build_args": [str(arg) for arg in build_args],
+        "timescale": list(timescale) if timescale else None,
+        "waves": bool(waves),
+    }, sort_keys=True).encode())
+    for source in sources:
+        key.update(Path(source).name.encode())
+        key.update(Path(source).read_bytes())
+    for include in includes:
+        for include_name in sorted(Path(include).rglob("*")):
+            if include_name.is_file():
+                key.update(str(include_name.relative_to(include)).encode())
+                key.update(include_name.read_bytes())
+    return key.hexdigest()
+
+
+def build(sources, hdl_toplevel=None, hwh_name=None, simulator="verilator", profile="debug", parameters=None, defines=None,
+          includes=None, build_args=None, timescale=("1ns", "1ps"), threads=1, use_cache=True):
+    """
+    Compile the RTL, reusing a cached model when one was built from identical inputs.
+
+    Models are kept in $COCOTBPYNQ_CACHE_DIR/builds (default
+    ~/.cache/cocotbpynq/builds), keyed by `build_key`. Concurrent launches
+    building the same model wait for each other instead of compiling twice.
+
+    Parameters
+    ----------
+    sources : list
+        HDL source files
+    hdl_toplevel : str
+        Toplevel module; taken from the module_ref in `hwh_name` if omitted
+    hwh_name : str
+        Path to the design's HWH
+    simulator : str
+        cocotb runner name
+    profile : str
+        "debug" (waveforms on) or "perf" (waveforms off, optimisation and
+        threading flags on)
+    threads : int
+        Verilator --threads in the perf profile. Above 1 the simulator's
+        main must set the VerilatedContext thread count, which cocotb 1.9's
+        does not: the model then aborts at start-up
+    use_cache : bool
+        Reuse and populate the build cache; otherwise build in ./sim_build
+
+    Returns
+    -------
+    (runner, build_dir, hdl_toplevel)
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown build profile {profile}, expected one of {', '.join(PROFILES)}")
+    if hdl_toplevel is None:
+        if hwh_name is None:
+            raise ValueError("Either hdl_toplevel or hwh_name must be given")
+        hdl_toplevel = hwh_toplevel(hwh_name)
+        if hdl_toplevel is None:
+            raise ValueError(f"No HLS kernel or module_ref found in {hwh_name}, please pass hdl_toplevel")
+    waves = PROFILES[profile]["waves"]
+    parameters, defines, includes = parameters or {}, defines or {}, includes or []
+    build_args = [arg.format(threads=threads) for arg in PROFILES[profile]["build_args"].get(simulator, [])] + list(build_args or [])
+    runner = get_runner(simulator)
+    build_kwargs = dict(sources=sources, hdl_toplevel=hdl_toplevel, parameters=parameters, defines=defines,
+                        includes=includes, build_args=build_args, timescale=timescale, waves=waves)
+
+    if not use_cache:
+        build_dir = Path("sim_build").resolve()
+        runner.build(build_dir=build_dir, always=True, **build_kwargs)
+        return runner, build_dir, hdl_toplevel
+
+    key = build_key(sources, hdl_toplevel, simulator, parameters, defines, includes, build_args, timescale, waves)
+    build_dir = Path(_cache_dir()) / "builds" / key
+    build_dir.mkdir(parents=True, exist_ok=True)
+    with open(build_dir / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not (build_dir / ".complete").is_file():
+            runner.build(build_dir=build_dir, always=True, **build_kwargs)
+            (build_dir / ".complete").touch()
+    return runner, build_dir, hdl_toplevel
+
+
+def run(test_module, sources, hwh_name, test_dir=None, hdl_toplevel=None, simulator="verilator", profile="debug",
+        extra_env=None, test_args=None, **build_kwargs):
+    """
+    Build (or reuse) the model and run a cocotbpynq test module against it.
+
+    Parameters
+    ----------
+    test_module : str or list
+        Python module(s) holding the cocotb tests, all run in one simulator session
+    sources : list
+        HDL source files
+    hwh_name : str
+        Path to the design's HWH; its directory becomes HWH_LOCATION_DIR
+    test_dir : str
+        Directory containing `test_module`, also where results.xml is written.
+        Defaults to the current directory
+    **build_kwargs
+        Passed on to `build`
+
+    Returns
+    -------
+    Path to the results XML
+    """
+    runner, build_dir, hdl_toplevel = build(sources, hdl_toplevel, hwh_name, simulator, profile, **build_kwargs)
+    return runner.test(
+        hdl_toplevel=hdl_toplevel,
+        hdl_toplevel_lang="verilog",
+        build_dir=build_dir,
+        test_dir=test_dir or os.getcwd(),
+        test_module=test_module,
+        test_args=test_args or [],
+        extra_env={"HWH_LOCATION_DIR": str(Path(hwh_name).resolve().parent), **(extra_env or {})},
+        timescale=build_kwargs.get("timescale", ("1ns", "1ps")),
+        waves=PROFILES[profile]["waves"]
+    )
+
+
+def _run_shard(simulator, build_dir, hdl_toplevel, hwh_dir, job, shard_dir, timescale, waves):
+    """Run one job in its own simulator process and working directory, returning its results XML (or None)"""
+    # The runner hands sys.path to the simulator as PYTHONPATH, so the test module stays importable
+    # although the simulator runs in the shard directory
+    sys.path.insert(0, str(Path(job["test_dir"]).resolve()))
+    # A worker forked from a pytest session inherits PYTEST_CURRENT_TEST, which the runner
+    # refuses together with results_xml
+    os.environ.pop("PYTEST_CURRENT_TEST", None)
+    os.makedirs(shard_dir, exist_ok=True)
+    results_xml = os.path.join(shard_dir, "results.xml")
+    try:
+        get_runner(simulator).test(
+            hdl_toplevel=hdl_toplevel,
+            hdl_toplevel_lang="verilog",
+            build_dir=build_dir,
+            test_dir=shard_dir,
+            test_module=job["test_module"],
+            testcase=job.get("testcase"),
+            test_args=job.get("test_args", []),
+            extra_env={"HWH_LOCATION_DIR": hwh_dir, **job.get("extra_env", {})},
+            results_xml=results_xml,
+            log_file=os.path.join(shard_dir, "sim.log"),
+            timescale=timescale,
+            waves=waves
+        )
+    except (subprocess.CalledProcessError, SystemExit):
+        # The simulator can exit non-zero after writing its results, e.g. on a failed test
+        pass
+    # The runner deletes a previous results file before starting, so one found here is this run's
+    return results_xml if os.path.isfile(results_xml) else None
+
+
+def merge_results(shards, results_xml):
+    """
+    Merge per-shard results XML files into one xUnit file.
+
+    Each shard's testsuites are renamed after the shard. A shard whose
+    simulator did not produce results is recorded as a single failed test
+    pointing at its log.
+
+    Parameters
+    ----------
+    shards : list
+        (name, results_xml or None, shard_dir) tuples
+    results_xml : str
+        Path of the merged file
+    """
+    merged = ElementTree.Element("testsuites", name="results")
+    for name, shard_xml, shard_dir in shards:
+        if shard_xml is not None and os.path.isfile(shard_xml):
+            for testsuite in ElementTree.parse(shard_xml).getroot().iter("testsuite"):
+                testsuite.set("name", name)
+                merged.append(testsuite)
+            continue
+        testsuite = ElementTree.SubElement(merged, "testsuite", name=name, package=name)
+        testcase = ElementTree.SubElement(testsuite, "testcase", name=name, classname="cocotbpynq.runner")
+        ElementTree.SubElement(testcase, "failure", message=f"Simulation terminated abnormally, see {os.path.join(shard_dir, 'sim.log')}")
+    ElementTree.ElementTree(merged).write(results_xml, encoding="unicode", xml_declaration=True)
+    return Path(results_xml).resolve()
+
+
+def run_parallel(jobs, sources, hwh_name, workers=None, results_xml="results.xml", shard_root="sim_shards",
+                 hdl_toplevel=None, simulator="verilator", profile="debug", **build_kwargs):
+    """
+    Spread test modules or parametrised runs over a pool of simulator processes.
+
+    The model is built (or fetched from the build cache) once, then every job
+    runs as its own simulator instance on that model, in its own directory
+    under `shard_root` (log in sim.log, waveforms and results.xml beside it).
+    The per-job results are merged into `results_xml`.
+
+    Parameters
+    ----------
+    jobs : list
+        Test module names, or dicts with "test_module" and optionally "name",
+        "test_dir" (defaults to the current directory), "extra_env" (e.g.
+        {"COCOTB_SYS_ARGV": "..."}), "test_args" and "testcase"
+    sources : list
+        HDL source files
+    hwh_name : str
+        Path to the design's HWH
+    workers : int
+        Number of simulators run at once, defaults to the number of CPUs
+    **build_kwargs
+        Passed on to `build`
+
+    Returns
+    -------
+    Path to the merged results XML
+    """
+    runner, build_dir, hdl_toplevel = build(sources, hdl_toplevel, hwh_name, simulator, profile, **build_kwargs)
+    hwh_dir = str(Path(hwh_name).resolve().parent)
+    shard_root = Path(shard_root).resolve()
+    jobs = [{"test_module": job} if isinstance(job, str) else dict(job) for job in jobs]
+    names = []
+    for i, job in enumerate(jobs):
+        job.setdefault("test_dir", os.getcwd())
+        test_modules = [job["test_module"]] if isinstance(job["test_module"], str) else job["test_module"]
+        names.append(job.get("name", f"{i}_{'_'.join(test_modules)}"))
+    timescale = build_kwargs.get("timescale", ("1ns", "1ps"))
+    waves = PROFILES[profile]["waves"]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_run_shard, simulator, build_dir, hdl_toplevel, hwh_dir, job, str(shard_root / name), timescale, waves)
+                   for name, job in zip(names, jobs)]
+        shards = [(name, future.result(), str(shard_root / name)) for name, future in zip(names, futures)]
+    return merge_results(shards, results_xml)
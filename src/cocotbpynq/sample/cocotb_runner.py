@@ -1,35 +1,26 @@
 from pathlib import Path
-from cocotb.runner import get_runner
+from cocotbpynq.runner import run
+import os
 import sys
 projdir = Path(__file__).resolve().parent # Set projdir to "sample" folder 
 
 RUNNER="verilator" # Simulator
-TOP="poly" # Toplevel verilog module name
-SOURCES=[projdir / "poly_axi.v", projdir / "poly_AXILiteS_s_axi.v"] # List of 
+PROFILE=os.getenv("COCOTBPYNQ_BUILD_PROFILE", "debug") # "debug" dumps waveforms, "perf" disables them and optimises the build
+SOURCES=[projdir / "poly_axi.v", projdir / "poly_AXILiteS_s_axi.v"] # List of verilog sources
 TEST_MODULE_PATH= projdir / "adapted"
-HWH_LOCATION_DIR = projdir
+HWH_NAME = projdir / "sample.hwh" # Toplevel is taken from the module_ref in the HWH, HWH_LOCATION_DIR is its folder
 SYS_ARGV=" ".join(sys.argv)
 
-runner = get_runner(RUNNER)
-runner.build(
+# Compiled models are cached in ~/.cache/cocotbpynq/builds (or $COCOTBPYNQ_CACHE_DIR/builds)
+# and reused whenever the sources, toplevel, parameters and flags are unchanged
+run(
+    test_module=[TEST_MODULE_PATH.name],
     sources=SOURCES,
-    hdl_toplevel=TOP,
-    always=True,
-    build_args=[],
-    parameters={},
-    timescale = ('1ns', '1ps'),
-    waves=True
-)
-
-runner.test(
-    hdl_toplevel=TOP,
-    hdl_toplevel_lang="verilog",
+    hwh_name=HWH_NAME,
     test_dir=TEST_MODULE_PATH.parent,
-    test_module=[TEST_MODULE_PATH.name],
-    test_args=[],
+    simulator=RUNNER,
+    profile=PROFILE,
     extra_env={ 
-        "HWH_LOCATION_DIR": HWH_LOCATION_DIR,
         "COCOTB_SYS_ARGV": SYS_ARGV # Optionally pass commandline arguments to adapted.py, accessible as os.getenv("COCOTB_SYS_ARGV")
-    },
-    waves=True
+    }
 )
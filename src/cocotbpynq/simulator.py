@@ -15,26 +15,114 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import cocotb
 from cocotb import test, external
+from cocotb.triggers import Event
+from collections import deque
 from os import environ
+from .profiler import profiler
+from .recorder import recorder
 if("COCOTB_SYS_ARGV" in environ):
     argv=environ["COCOTB_SYS_ARGV"].split()
 else:
     argv=None
 
-def synctest(test_func):
+class PostedQueue:
+    """
+    In-order queue of work posted by the synctest thread.
+
+    While posting is enabled, MMIO writes and DMA transfers are appended here
+    and the test thread carries on without handing over to the scheduler. The
+    simulator only advances once the thread blocks (on a read, wait() or
+    flush()), at which point a single scheduler-side coroutine runs the posted
+    work in the order it was issued.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._pending = deque()
+        self._drained = Event()
+        self._drained.set()
+        self._task = None
+
+    def post(self, coro):
+        """Queue a coroutine to be awaited after all previously posted work"""
+        self._pending.append(coro)
+        if self._drained.is_set():
+            self._drained.clear()
+            self._task = cocotb.start_soon(self._run())
+
+    def reset(self):
+        """Drop work left over by a test that ended (e.g. failed) before it was drained.
+
+        cocotb kills the running queue with the test, which would otherwise
+        leave the queue marked busy, and every later drain() hanging, for the
+        rest of the simulator session
+        """
+        if self._task is not None and not self._task.done():
+            self._task.kill()
+        self._task = None
+        while self._pending:
+            self._pending.popleft().close()
+        self._drained.set()
+
+    async def _run(self):
+        while self._pending:
+            await self._pending.popleft()
+        self._drained.set()
+
+    async def drain(self):
+        """Wait (on the scheduler side) until all posted work has completed"""
+        if not self._drained.is_set():
+            await self._drained.wait()
+
+posted = PostedQueue()
+
+def set_posted_writes(enabled: bool):
+    """Enable/disable posted MMIO writes and DMA transfers for the synctest thread"""
+    posted.enabled = enabled
+
+@cocotb.function
+async def flush():
+    """Block the synctest thread until every posted write/transfer has been issued"""
+    await posted.drain()
+
+async def flush_async():
+    """Coroutine version of `flush`"""
+    await posted.drain()
+
+def synctest(test_func=None, posted_writes=False):
     """Wrap synchronous test function as async function so that it can synchronously call
     cocotb.continue decorated functions (like MMIO read/write or DMA wait), such that 
     test_func will block until that call is complete(like await).
 
     The purpose of this is so that a function that is used to interface with a Pynq board
     can also be used exactly as is for simulation with cocotbpynq library, only requiring to
-    be wrapped with cocotbpynq.synctest when used for simulation"""
+    be wrapped with cocotbpynq.synctest when used for simulation.
+
+    With posted_writes=True (``synctest(main, posted_writes=True)``), MMIO writes and DMA
+    transfers return immediately and are queued in order, to be flushed by the next read,
+    wait() or flush(), which saves a thread handoff per write."""
+    if test_func is None:
+        return lambda test_func: synctest(test_func, posted_writes)
     qualname = test_func.__qualname__
     module = test_func.__module__
     test_func = external(test_func) # Replace with bridge/continue in cocotb 2.X
     async def async_test_func(dut):
-        await test_func(dut)
+        from .waves import waves
+        posted.reset()
+        posted.enabled = posted_writes
+        try:
+            await test_func(dut)
+            await posted.drain()
+            if profiler.enabled and profiler.trace_path:
+                profiler.write_chrome_trace(profiler.trace_path)
+                dut._log.info("Transaction profile:\n" + profiler.summary())
+            if recorder.enabled and recorder.trace_path:
+                recorder.save(recorder.trace_path)
+        finally:
+            posted.enabled = False
+            posted.reset()
+            waves.close()
     cocotbtest = test(async_test_func)
 
     # Ensure test result output is same as if you just decorated main with cocotb.test
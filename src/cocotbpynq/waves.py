@@ -0,0 +1,285 @@
+# cocotbpynq - a cocotb based emulation tool for PYNQ-targetting code
+# Copyright (C) 2025 Gavin Lusby and Nachiket Kapre
+# Developed at WatCAG, University of Waterloo
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import cocotb
+from collections import deque
+from cocotb.triggers import RisingEdge, ReadOnly
+from cocotb.utils import get_sim_time as gst
+from .profiler import profiler
+from .simulator import posted
+
+
+class WaveWindow:
+    """Context manager capturing waves while its body runs, with `with` (synctest) or `async with` (native test)"""
+    def __init__(self, capture, label):
+        self.capture = capture
+        self.label = label
+
+    def __enter__(self):
+        self.capture.start(self.label)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.capture.stop()
+
+    async def __aenter__(self):
+        await self.capture.start_async(self.label)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.capture.stop_async()
+
+
+class WaveCapture:
+    """
+    VCD capture of the DUT's ports over chosen windows of a run.
+
+    Signals are sampled by cocotbpynq once per clock cycle, and only while a
+    window is open, so nothing is written (or sampled) outside the
+    transactions of interest. It works with any simulator, including a model
+    built without tracing (`waves=False`, the perf profile). Windows are
+    opened explicitly with `window()`/`start()`, or by a trigger: an
+    AXI-Lite error response or a profiler-detected stall, see `trigger_on`.
+
+    Disabled by default; enable it with `waves.enable(path)` or by setting
+    COCOTBPYNQ_WAVES to the path of the VCD to write.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.signals = None
+        self.clock = None
+        self.on_error = False
+        self.stall_cycles = None
+        self.pre_cycles = 0
+        self.post_cycles = 0
+        self._file = None
+        self._ids = {}
+        self._values = {}
+        self._windows = 0
+        self._post = 0
+        self._ring = deque()
+        # Task of the sampling coroutine; cocotb kills it at the end of each test
+        self._sampler = None
+
+    def enable(self, path, signals=None, clock=None):
+        """
+        Parameters
+        ----------
+        path : str
+            VCD file to write
+        signals : dict
+            Name -> handle of the signals to capture, by default every port
+            of every simulated instance
+        clock : SimHandleBase
+            Clock sampled on, by default the first instance's main clock
+        """
+        self.enabled = True
+        self.path = path
+        self.signals = signals
+        self.clock = clock
+
+    def disable(self):
+        self.enabled = False
+
+    def trigger_on(self, error=True, stall_cycles=None, pre_cycles=0, post_cycles=1000):
+        """
+        Open a window automatically on an AXI-Lite error response (SLVERR/DECERR)
+        and/or when the profiler records a transaction with at least
+        `stall_cycles` DUT stall cycles (this enables the profiler).
+
+        The window covers `post_cycles` after the trigger. With `pre_cycles`,
+        the last cycles before it are kept in memory and written too, which
+        means sampling every cycle while armed.
+        """
+        self.on_error = error
+        self.stall_cycles = stall_cycles
+        self.pre_cycles = pre_cycles
+        self.post_cycles = post_cycles
+        self._ring = deque(maxlen=pre_cycles)
+        if stall_cycles is not None:
+            if not profiler.enabled:
+                profiler.enable()
+            if self._on_transaction not in profiler.listeners:
+                profiler.listeners.append(self._on_transaction)
+        if pre_cycles:
+            cocotb.start_soon(self._arm())
+
+    def window(self, label=None):
+        """`with waves.window("dma"):` captures the enclosed transactions"""
+        return WaveWindow(self, label)
+
+    def start(self, label=None):
+        """Open a window from the synctest thread; posted in order in posted-write mode"""
+        if posted.enabled:
+            posted.post(self.start_async(label))
+        else:
+            self._start_blocking(label)
+
+    def stop(self):
+        if posted.enabled:
+            posted.post(self.stop_async())
+        else:
+            self._stop_blocking()
+
+    async def start_async(self, label=None):
+        if not self.enabled:
+            return
+        self._open()
+        self._windows += 1
+        self._begin_window(label or "window")
+
+    async def stop_async(self):
+        if self._windows:
+            self._windows -= 1
+
+    @cocotb.function
+    async def _start_blocking(self, label):
+        await self.start_async(label)
+
+    @cocotb.function
+    async def _stop_blocking(self):
+        await self.stop_async()
+
+    def trigger(self, reason):
+        """Open a `post_cycles` window now (from a scheduler coroutine), writing the pre-trigger cycles kept"""
+        if not self.enabled:
+            return
+        self._open()
+        self._begin_window(f"trigger: {reason}")
+        for time, values in self._ring:
+            self._write_sample(time, values)
+        self._ring.clear()
+        self._post = max(self._post, self.post_cycles)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """
+        Close the VCD, ending any open window; synctest calls this at the end
+        of every test. A later test of the session appends to the same file
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._windows = 0
+        self._post = 0
+        self._ring.clear()
+
+    def _on_transaction(self, txn):
+        if self.stall_cycles is not None and txn.dut_stall >= self.stall_cycles:
+            self.trigger(f"{txn.channel} {txn.kind} stalled {txn.dut_stall} cycles")
+
+    def _open(self):
+        """Resolve signals and write the VCD header on first use, or reopen the VCD after `close`"""
+        if self._file is not None:
+            return
+        if self._ids:
+            self._file = open(self.path, "a")
+            return
+        from . import overlay
+        design = overlay.current_design
+        signals = self.signals
+        if design is None and (signals is None or self.clock is None):
+            raise RuntimeError("No signals to capture: load an Overlay or pass signals and clock to enable()")
+        if signals is None:
+            signals = {}
+            for instance, cpdut in design.cpduts.items():
+                for port in design.hwh_design.module(instance).ports:
+                    if port.sigis != "clk" and hasattr(cpdut.dut, cpdut.prefix + port.name):
+                        signals[f"{instance}.{port.name}"] = cpdut.signal(port.name)
+        if self.clock is None:
+            self.clock = next(iter(design.cpduts.values())).clk
+        self._file = open(self.path, "w")
+        self._file.write("$timescale 1ps $end\n")
+        scopes = {}
+        for name, handle in signals.items():
+            scope, _, leaf = name.rpartition(".")
+            scopes.setdefault(scope, []).append((leaf, handle))
+        for scope, leaves in scopes.items():
+            if scope:
+                self._file.write(f"$scope module {scope} $end\n")
+            for leaf, handle in leaves:
+                code = _id_code(len(self._ids))
+                self._ids[code] = handle
+                self._file.write(f"$var wire {len(handle)} {code} {leaf} $end\n")
+            if scope:
+                self._file.write("$upscope $end\n")
+        self._file.write("$enddefinitions $end\n")
+
+    def _begin_window(self, label):
+        # Values are dumped in full at the start of every window
+        self._values = {}
+        self._file.write(f"$comment {label} $end\n")
+        self._start_sampler()
+
+    async def _arm(self):
+        self._open()
+        self._start_sampler()
+
+    def _start_sampler(self):
+        if self._sampler is None or self._sampler.done():
+            self._sampler = cocotb.start_soon(self._sample())
+
+    async def _sample(self):
+        """Sample every signal once per cycle while a window is open (or pre-trigger cycles are kept)"""
+        clk_edge, settled = RisingEdge(self.clock), ReadOnly()
+        while self.enabled and (self._windows or self._post or self.pre_cycles):
+            await clk_edge
+            await settled
+            time = int(gst("ps"))
+            values = {code: _bits(handle) for code, handle in self._ids.items()}
+            if self._windows or self._post:
+                self._write_sample(time, values)
+                if self._post:
+                    self._post -= 1
+                    if not self._post:
+                        self._values = {}
+            else:
+                self._ring.append((time, values))
+
+    def _write_sample(self, time, values):
+        changes = [(code, bits) for code, bits in values.items() if self._values.get(code) != bits]
+        if not changes:
+            return
+        self._file.write(f"#{time}\n")
+        for code, bits in changes:
+            self._file.write(f"{bits}{code}\n" if len(bits) == 1 else f"b{bits} {code}\n")
+        self._values.update(changes)
+
+
+def _bits(handle):
+    value = handle.value
+    return value.binstr if hasattr(value, "binstr") else format(int(value), "b")
+
+
+def _id_code(index):
+    """VCD identifier code: base-94 over the printable characters"""
+    code = ""
+    while True:
+        code += chr(33 + index % 94)
+        index //= 94
+        if not index:
+            return code
+
+
+waves = WaveCapture()
+if os.getenv("COCOTBPYNQ_WAVES"):
+    waves.enable(os.getenv("COCOTBPYNQ_WAVES"))
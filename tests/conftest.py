@@ -0,0 +1,23 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+SAMPLE_DIR = Path(__file__).parents[1] / "src" / "cocotbpynq" / "sample"
+
+
+@pytest.fixture
+def simulate(tmp_path, monkeypatch):
+    """Run a cocotb test module from tests/sim against the sample design; skipped without Verilator"""
+    if shutil.which("verilator") is None:
+        pytest.skip("Verilator is not installed")
+    from cocotbpynq.runner import run
+    monkeypatch.syspath_prepend(str(Path(__file__).parent / "sim"))
+
+    def simulate(test_module):
+        try:
+            run(test_module, [SAMPLE_DIR / "poly_axi.v", SAMPLE_DIR / "poly_AXILiteS_s_axi.v"], SAMPLE_DIR / "sample.hwh",
+                test_dir=str(tmp_path), profile="perf")
+        except SystemExit as error:
+            pytest.fail(str(error))
+    return simulate
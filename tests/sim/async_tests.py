@@ -0,0 +1,43 @@
+import cocotb
+import numpy as np
+
+import cocotbpynq
+from cocotbpynq import MMIO, Overlay, allocate
+
+
+@cocotb.test()
+async def mmio_and_dma_without_the_thread_bridge(dut):
+    overlay = Overlay("./sample.bit")
+    dma = overlay.poly_eval.axi_dma
+    mmio = MMIO(0x43C10000, 0x1000)
+    await mmio.write_async(0x10, np.array([1, 0, 2, 0, 3], dtype=np.uint32))
+    assert await mmio.read_async(0x18) == 2
+    assert (await mmio.read_array_async(0x10, 5))[::2].tolist() == [1, 2, 3]
+    in_buffer = allocate(shape=(32,), dtype=np.uint32)
+    out_buffer = allocate(shape=(32,), dtype=np.uint32)
+    in_buffer[:] = np.arange(32)
+    # Two descriptors per direction, each waited on alone
+    received = [dma.recvchannel.queue_transfer(out_buffer, 0, 64), dma.recvchannel.queue_transfer(out_buffer, 64, 64)]
+    dma.sendchannel.queue_transfer(in_buffer, 0, 64)
+    dma.sendchannel.queue_transfer(in_buffer, 64, 64)
+    await received[0].wait_async()
+    assert received[0].finished
+    await received[1].wait_async()
+    await dma.sendchannel.wait_async()
+    await dma.recvchannel.wait_async()
+    assert (out_buffer == in_buffer * in_buffer + 2 * in_buffer + 3).all()
+    await cocotbpynq.flush_async()
+
+
+@cocotb.test()
+async def concurrent_flows_share_the_master(dut):
+    Overlay("./sample.bit")
+    mmio = MMIO(0x43C10000, 0x1000)
+
+    async def flow(offset, value):
+        await mmio.write_async(offset, value)
+        return await mmio.read_async(offset)
+
+    flows = [cocotb.start_soon(flow(offset, value)) for offset, value in ((0x10, 4), (0x18, 5), (0x20, 6))]
+    assert [await task for task in flows] == [4, 5, 6]
+    assert mmio.master.writes == 3
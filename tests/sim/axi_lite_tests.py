@@ -0,0 +1,46 @@
+import cocotb
+from cocotb.utils import get_sim_time
+
+from cocotbpynq import Overlay
+from cocotbpynq.mmio import AxiLiteMaster
+
+
+async def master(max_outstanding):
+    overlay = Overlay("./sample.bit")
+    cpbus = overlay._design.bus_interfaces()["poly_eval_poly_0.s_axi_AXILiteS"]
+    axi_lite = AxiLiteMaster(cpbus, max_outstanding)
+    await cpbus.cpdut.await_reset()
+    return axi_lite, cpbus.clock.period
+
+
+@cocotb.test()
+async def writes_and_reads_complete_in_order(dut):
+    axi_lite, _ = await master(4)
+    writes = [await axi_lite.issue_write(offset, value) for offset, value in ((0x10, 5), (0x18, 6), (0x20, 7))]
+    assert [await axi_lite.result(done) for done in writes] == [0, 0, 0]
+    reads = [await axi_lite.issue_read(offset) for offset in (0x20, 0x18, 0x10)]
+    assert [await axi_lite.result(done) for done in reads] == [7, 6, 5]
+    assert axi_lite.writes == 3
+
+
+@cocotb.test()
+async def outstanding_reads_overlap(dut):
+    axi_lite, period = await master(4)
+    await axi_lite.write(0x10, 9)
+    start = get_sim_time("step")
+    done = [await axi_lite.issue_read(0x10) for _ in range(4)]
+    # Four reads are in flight before the first returns
+    assert get_sim_time("step") == start
+    done += [await axi_lite.issue_read(0x10) for _ in range(4)]
+    assert [await axi_lite.result(event) for event in done] == [9] * 8
+    # Back to back at the sample slave's rate of one read per two cycles
+    assert get_sim_time("step") - start <= (2 * 8 + 2) * period
+
+
+@cocotb.test()
+async def max_outstanding_bounds_reads_in_flight(dut):
+    axi_lite, _ = await master(1)
+    start = get_sim_time("step")
+    first = await axi_lite.issue_read(0x10)
+    await axi_lite.issue_read(0x18)
+    assert first.is_set() and get_sim_time("step") > start
@@ -0,0 +1,52 @@
+import cocotb
+import numpy as np
+from cocotb.utils import get_sim_time
+
+from cocotbpynq import MMIO, Overlay, allocate
+
+REGISTERS = {0x10: "poly_AXILiteS_s_axi_U.int_a_V", 0x18: "poly_AXILiteS_s_axi_U.int_b_V",
+             0x20: "poly_AXILiteS_s_axi_U.int_c_V"}
+
+
+@cocotb.test()
+async def backdoor_accesses_take_no_sim_time(dut):
+    overlay = Overlay("./sample.bit")
+    mmio = MMIO(0x43C10000, 0x1000)
+    mapped = mmio.enable_backdoor(REGISTERS)
+    assert sorted(mapped) == [0x10, 0x18, 0x20]
+    await mmio.read_async(0x10)
+    start = get_sim_time("step")
+    await mmio.write_async(0x10, 2)
+    await mmio.write_async(0x18, 0)
+    await mmio.write_async(0x20, 1)
+    assert await mmio.read_async(0x10) == 2
+    assert (await mmio.read_array_async(0x10, 1)).tolist() == [2]
+    assert get_sim_time("step") == start
+    # The deposited coefficients are what the kernel computes with
+    in_buffer = allocate(shape=(8,), dtype=np.uint32)
+    out_buffer = allocate(shape=(8,), dtype=np.uint32)
+    in_buffer[:] = np.arange(8)
+    dma = overlay.poly_eval.axi_dma
+    dma.recvchannel.transfer(out_buffer)
+    dma.sendchannel.transfer(in_buffer)
+    await dma.sendchannel.wait_async()
+    await dma.recvchannel.wait_async()
+    assert (out_buffer == 2 * in_buffer * in_buffer + 1).all()
+
+
+@cocotb.test()
+async def frontdoor_and_backdoor_see_the_same_registers(dut):
+    Overlay("./sample.bit")
+    mmio = MMIO(0x43C10000, 0x1000)
+    mmio.enable_backdoor({0x18: ("poly_AXILiteS_s_axi_U.int_b_V", 0)})
+    await mmio.write_async(0x18, 7)
+    mmio.disable_backdoor()
+    assert await mmio.read_async(0x18) == 7
+    await mmio.write_async(0x18, 8)
+    mmio.enable_backdoor({0x18: dut.poly_AXILiteS_s_axi_U.int_b_V})
+    assert await mmio.read_async(0x18) == 8
+    # A block touching an unmapped register goes through the bus
+    start = get_sim_time("step")
+    await mmio.write_async(0x18, np.array([9, 0], dtype=np.uint32))
+    assert get_sim_time("step") > start
+    assert await mmio.read_async(0x18) == 9
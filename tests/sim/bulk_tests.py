@@ -0,0 +1,20 @@
+import numpy as np
+
+import cocotbpynq
+from cocotbpynq import MMIO, Overlay
+
+
+def block_write_and_read_array(dut=None):
+    Overlay("./sample.bit")
+    mmio = MMIO(0x43C10000, 0x1000)
+    # a, b and c sit at 0x10, 0x18 and 0x20 with reserved registers between them
+    mmio.write(0x10, np.array([1, 0, 2, 0, 3], dtype=np.uint32))
+    registers = mmio.read_array(0x10, 5)
+    assert registers.dtype == np.uint32 and registers[::2].tolist() == [1, 2, 3]
+    mmio.write(0x18, (7).to_bytes(4, "little"))
+    assert mmio.read(0x18) == 7
+    # Wider elements are written as their little-endian byte image
+    mmio.write(0x10, np.array([5, 6], dtype="<u8"))
+    assert mmio.read_array(0x10, 3)[::2].tolist() == [5, 6]
+    assert mmio.read_array(0x10, 0).size == 0
+block_write_and_read_array = cocotbpynq.synctest(block_write_and_read_array)
@@ -0,0 +1,41 @@
+import numpy as np
+
+import cocotbpynq
+from cocotbpynq import MMIO, Overlay, allocate
+from cocotbpynq.simulator import posted
+
+
+def posted_writes_are_flushed_in_order(dut=None):
+    overlay = Overlay("./sample.bit")
+    dma = overlay.poly_eval.axi_dma
+    mmio = MMIO(0x43C10000, 0x1000)
+    assert posted.enabled
+    mmio.write(0x10, 9)
+    for offset, value in ((0x10, 1), (0x18, 2), (0x20, 3)):
+        mmio.write(offset, value)
+    # Queued, not yet issued: the read flushes every write before it, the last write to 0x10 wins
+    assert not posted._drained.is_set()
+    assert mmio.read(0x10) == 1
+    in_buffer = allocate(shape=(16,), dtype=np.uint32)
+    out_buffer = allocate(shape=(16,), dtype=np.uint32)
+    in_buffer[:] = np.arange(16)
+    mmio.write(0x20, 5)
+    # The transfers start only after the posted write to c
+    dma.recvchannel.transfer(out_buffer)
+    dma.sendchannel.transfer(in_buffer)
+    dma.sendchannel.wait()
+    dma.recvchannel.wait()
+    assert (out_buffer == in_buffer * in_buffer + 2 * in_buffer + 5).all()
+    mmio.write(0x18, 4)
+    cocotbpynq.flush()
+    assert posted._drained.is_set()
+posted_writes_are_flushed_in_order = cocotbpynq.synctest(posted_writes_are_flushed_in_order, posted_writes=True)
+
+
+def blocking_writes_after_a_posted_test(dut=None):
+    Overlay("./sample.bit")
+    mmio = MMIO(0x43C10000, 0x1000)
+    assert not posted.enabled
+    mmio.write(0x18, 6)
+    assert mmio.read(0x18) == 6
+blocking_writes_after_a_posted_test = cocotbpynq.synctest(blocking_writes_after_a_posted_test)
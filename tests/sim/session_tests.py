@@ -0,0 +1,40 @@
+import numpy as np
+
+import cocotbpynq
+from cocotbpynq import MMIO, Overlay, allocate, overlay
+
+designs = []
+
+
+def transfer(dma, coefficients):
+    in_buffer = allocate(shape=(8,), dtype=np.uint32)
+    out_buffer = allocate(shape=(8,), dtype=np.uint32)
+    in_buffer[:] = np.arange(8)
+    dma.recvchannel.transfer(out_buffer)
+    dma.sendchannel.transfer(in_buffer)
+    dma.sendchannel.wait()
+    dma.recvchannel.wait()
+    a, b, c = coefficients
+    assert (out_buffer == a * in_buffer * in_buffer + b * in_buffer + c).all()
+
+
+def first_test(dut=None):
+    dma = Overlay("./sample.bit").poly_eval.axi_dma
+    designs.append(overlay.current_design)
+    mmio = MMIO(0x43C10000, 0x1000)
+    for offset, value in ((0x10, 1), (0x18, 2), (0x20, 3)):
+        mmio.write(offset, value)
+    transfer(dma, (1, 2, 3))
+first_test = cocotbpynq.synctest(first_test)
+
+
+def second_test(dut=None):
+    dma = Overlay("./sample.bit").poly_eval.axi_dma
+    designs.append(overlay.current_design)
+    # Same design, restarted: clocks running again, registers back at their reset values, fresh drivers
+    assert designs[0] is designs[1] and designs[1].running
+    mmio = MMIO(0x43C10000, 0x1000)
+    assert mmio.read_array(0x10, 5)[::2].tolist() == [0, 0, 0]
+    mmio.write(0x10, 3)
+    transfer(dma, (3, 0, 0))
+second_test = cocotbpynq.synctest(second_test)
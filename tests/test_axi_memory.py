@@ -0,0 +1,15 @@
+from cocotbpynq.axi_memory import BURST_FIXED, BURST_INCR, BURST_WRAP, _beat_addresses
+
+
+def test_fixed_burst_repeats_the_address():
+    assert _beat_addresses(0x104, 3, 4, BURST_FIXED) == [0x104] * 4
+
+
+def test_incr_burst_aligns_after_the_first_beat():
+    assert _beat_addresses(0x100, 3, 4, BURST_INCR) == [0x100, 0x104, 0x108, 0x10C]
+    assert _beat_addresses(0x102, 2, 4, BURST_INCR) == [0x102, 0x104, 0x108]
+
+
+def test_wrap_burst_wraps_at_the_burst_boundary():
+    assert _beat_addresses(0x108, 3, 4, BURST_WRAP) == [0x108, 0x10C, 0x100, 0x104]
+    assert _beat_addresses(0x130, 7, 8, BURST_WRAP) == [0x130, 0x138, 0x100, 0x108, 0x110, 0x118, 0x120, 0x128]
@@ -0,0 +1,57 @@
+import pytest
+
+from cocotbpynq.backpressure import BurstIdle, DutyCycle, Pattern, RandomStall, grid
+
+
+def cycles(model, count):
+    return [model.active() for _ in range(count)]
+
+
+def test_pattern_repeats_and_resets():
+    pattern = Pattern([1, 0, 0])
+    assert cycles(pattern, 5) == [True, False, False, True, False]
+    pattern.reset()
+    assert cycles(pattern, 2) == [True, False]
+
+
+def test_pattern_needs_an_active_cycle():
+    with pytest.raises(ValueError):
+        Pattern([0, 0])
+
+
+def test_burst_idle():
+    assert cycles(BurstIdle(2, 1), 6) == [True, True, False, True, True, False]
+
+
+@pytest.mark.parametrize("duty, period", [(0.01, 100), (1 / 3, 3), (0.5, 2), (0.7, 10), (1, 1)])
+def test_duty_cycle_applies_the_exact_duty(duty, period):
+    model = DutyCycle(duty)
+    assert model.period == period
+    assert sum(cycles(model, period)) == round(duty * period)
+
+
+def test_duty_cycle_spreads_active_cycles_evenly():
+    assert cycles(DutyCycle(0.25, period=8), 8) == [False, False, False, True] * 2
+
+
+def test_duty_cycle_rejects_unrepresentable_duties():
+    with pytest.raises(ValueError):
+        DutyCycle(1 / 3, period=16)
+    with pytest.raises(ValueError):
+        DutyCycle(0.123456789)
+    with pytest.raises(ValueError):
+        DutyCycle(0)
+
+
+def test_random_stall_is_reproducible():
+    model = RandomStall(0.5, seed=3)
+    first = cycles(model, 64)
+    model.reset()
+    assert cycles(model, 64) == first
+    assert 0 < sum(first) < 64
+
+
+def test_grid_is_cartesian_product():
+    points = grid(send=[None, 1], recv=["a", "b"])
+    assert points == [{"send": None, "recv": "a"}, {"send": None, "recv": "b"},
+                      {"send": 1, "recv": "a"}, {"send": 1, "recv": "b"}]
@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+
+from cocotbpynq.bench.rss import peak_rss_kb, reset_peak_rss
+
+
+def test_peak_rss_is_per_workload():
+    if not reset_peak_rss():
+        pytest.skip("peak RSS cannot be reset on this platform")
+    large = np.ones(64 << 20, dtype=np.uint8)
+    large_peak = peak_rss_kb()
+    del large
+    assert reset_peak_rss()
+    assert peak_rss_kb() < large_peak - (32 << 10)
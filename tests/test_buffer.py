@@ -0,0 +1,72 @@
+import gc
+
+import numpy as np
+import pytest
+
+from cocotbpynq.buffer import PynqBuffer, SimulatedDDR, allocate, ddr
+
+
+def test_alloc_is_aligned_first_fit():
+    memory = SimulatedDDR(base=0x1000, size=0x4000, alignment=0x1000)
+    first, _ = memory.alloc(20)
+    second, _ = memory.alloc(0x1001)
+    assert (first, second) == (0x1000, 0x2000)
+    memory.free(first)
+    assert memory.alloc(0x1000)[0] == 0x1000
+
+
+def test_free_coalesces_extents():
+    memory = SimulatedDDR(base=0, size=0x3000, alignment=0x1000)
+    addresses = [memory.alloc(1)[0] for _ in range(3)]
+    with pytest.raises(MemoryError):
+        memory.alloc(1)
+    for address in (addresses[0], addresses[2], addresses[1]):
+        memory.free(address)
+    assert memory.alloc(0x3000)[0] == 0
+
+
+def test_read_write_little_endian_with_strobes():
+    memory = SimulatedDDR(base=0, size=0x2000, alignment=0x1000)
+    address, backing = memory.alloc(16)
+    assert memory.write(address + 4, 4, 0x11223344)
+    assert memory.read(address + 4, 4) == (0x11223344, True)
+    assert memory.write(address + 4, 4, 0xAABBCCDD, strb=0b0101)
+    assert memory.read(address + 4, 4) == (0x11BB33DD, True)
+    assert backing[4] == 0xDD
+
+
+def test_bus_width_read_of_buffer_tail_is_in_range():
+    memory = SimulatedDDR(base=0, size=0x2000, alignment=0x1000)
+    address, backing = memory.alloc(20)
+    backing[16:20] = [1, 2, 3, 4]
+    # An 8-byte beat covering the last 4 bytes of a 20-byte buffer
+    assert memory.read(address + 16, 8) == (0x04030201, True)
+    assert memory.write(address + 16, 8, 0)
+
+
+def test_unallocated_access_fails():
+    memory = SimulatedDDR(base=0, size=0x2000, alignment=0x1000)
+    assert memory.read(0x100, 4) == (0, False)
+    assert not memory.write(0x100, 4, 1)
+
+
+def test_allocate_returns_buffer_in_ddr():
+    buffer = allocate((4, 3), dtype=np.uint16)
+    assert isinstance(buffer, PynqBuffer)
+    assert buffer.shape == (4, 3) and buffer.dtype == np.uint16
+    buffer[:] = np.arange(12, dtype=np.uint16).reshape(4, 3)
+    assert ddr.read(buffer.physical_address + 2, 2) == (1, True)
+    assert buffer[1:].physical_address == buffer.physical_address + 6
+    assert (buffer + 1).physical_address is None
+    buffer.freebuffer()
+
+
+def test_buffer_memory_is_released():
+    with allocate(1024) as buffer:
+        address = buffer.physical_address
+    assert ddr.read(address, 4) == (0, False)
+    buffer = allocate(1024)
+    address = buffer.physical_address
+    del buffer
+    gc.collect()
+    assert ddr.read(address, 4) == (0, False)
@@ -0,0 +1,27 @@
+import asyncio
+import os
+
+import numpy as np
+
+from cocotbpynq.checkpoint import _npz_path, restore_async, save_async
+
+
+def test_restore_looks_for_the_file_save_writes(tmp_path):
+    for path in (tmp_path / "setup", str(tmp_path / "setup"), str(tmp_path / "other.npz")):
+        np.savez(_npz_path(path), values=np.arange(3))
+        assert os.path.isfile(_npz_path(path))
+    assert sorted(os.listdir(tmp_path)) == ["other.npz", "setup.npz"]
+
+
+def test_restore_fills_non_contiguous_buffers():
+    backing = np.arange(12, dtype=np.uint32).reshape(3, 4)
+    column = backing[:, 1]
+    asyncio.run(save_async("column", buffers=[column]))
+    column[:] = 0
+    assert asyncio.run(restore_async("column", buffers=[column]))
+    assert backing.tolist() == np.arange(12, dtype=np.uint32).reshape(3, 4).tolist()
+    transposed = backing.T
+    asyncio.run(save_async("transposed", buffers=[transposed]))
+    backing[:] = 0
+    assert asyncio.run(restore_async("transposed", buffers=[transposed]))
+    assert backing.tolist() == np.arange(12, dtype=np.uint32).reshape(3, 4).tolist()
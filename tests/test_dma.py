@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from cocotbpynq.dma import _beats_to_bytes, _chunk_beats, _pack_beats, _unpack_beats
+
+
+def test_pack_contiguous_with_partial_last_beat():
+    data = np.arange(10, dtype=np.uint8)
+    assert _pack_beats(data, 0, 10, 4) == ([0x03020100, 0x07060504, 0x0908], 0b0011)
+    assert _pack_beats(data, 2, 8, 4) == ([0x05040302, 0x09080706], 0b1111)
+
+
+def test_pack_odd_stream_width():
+    data = np.arange(7, dtype=np.uint8)
+    assert _pack_beats(data, 0, 7, 3) == ([0x020100, 0x050403, 0x06], 0b001)
+
+
+def test_pack_strided_in_logical_order():
+    data = np.arange(8, dtype=np.uint16)[::2]
+    assert _pack_beats(data, 0, data.nbytes, 4) == ([0x00020000, 0x00060004], 0b1111)
+    wide = np.array([0x1122334455667788, 0, 0x0102030405060708], dtype=np.uint64)[::2]
+    assert _pack_beats(wide, 0, wide.nbytes, 4) == ([0x55667788, 0x11223344, 0x05060708, 0x01020304], 0b1111)
+
+
+def test_pack_strided_rejects_mismatched_widths():
+    with pytest.raises(MemoryError):
+        _pack_beats(np.zeros(8, dtype=np.uint16)[::2], 0, 8, 3)
+
+
+@pytest.mark.parametrize("beat_bytes", [1, 3, 4, 8, 16])
+def test_unpack_inverts_pack(beat_bytes):
+    data = np.arange(45, dtype=np.uint8)
+    beats, last_keep = _pack_beats(data, 0, data.size, beat_bytes)
+    assert np.array_equal(_beats_to_bytes(beats, last_keep, beat_bytes), data)
+    received = np.zeros(48, dtype=np.uint8)
+    _unpack_beats(beats, last_keep, received, 3, data.size, beat_bytes)
+    assert np.array_equal(received[3:48], data) and not received[:3].any()
+
+
+def test_unpack_into_strided_array():
+    received = np.zeros(8, dtype=np.uint16)
+    _unpack_beats([0x00020001, 0x00040003], 0b1111, received[::2], 0, 8, 4)
+    assert received.tolist() == [1, 0, 2, 0, 3, 0, 4, 0]
+
+
+def test_chunk_array_keeps_elements_whole():
+    data = np.arange(10, dtype=np.uint32)
+    pieces = list(_chunk_beats(data, 20, 8, False))
+    assert [len(beats) for beats, _ in pieces] == [2, 2, 1]
+    assert np.concatenate([_beats_to_bytes(beats, keep, 8) for beats, keep in pieces]).view(np.uint32).tolist() == list(range(10))
+
+
+def test_chunk_iterable_carries_partial_beats():
+    chunks = [np.arange(3, dtype=np.uint8), np.arange(3, 8, dtype=np.uint8), np.arange(8, 10, dtype=np.uint8)]
+    assert list(_chunk_beats(chunks, 0, 4, False)) == [([0x03020100, 0x07060504], 0b1111), ([0x0908], 0b0011)]
+
+
+def test_chunk_packetised_keeps_items_apart():
+    chunks = [np.arange(3, dtype=np.uint8), np.empty(0, np.uint8), np.arange(3, 5, dtype=np.uint8)]
+    assert list(_chunk_beats(chunks, 0, 4, True)) == [([0x020100], 0b0111), ([0x0403], 0b0011)]
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import cocotb.utils
+import pytest
+
+from cocotbpynq.dut import CocotbPynqClock, CocotbPynqDut
+from cocotbpynq.hwh import HwhModule
+
+# Control on ap_clk (100 MHz, by ASSOCIATED_BUSIF), x on the 250 MHz ap_clk_2 by FREQ_HZ, y at a frequency no clock has
+MODULE = """
+<MODULE INSTANCE="k0" MODTYPE="k0" VLNV="xilinx.com:hls:k0:1.0">
+  <PORTS>
+    <PORT DIR="I" NAME="ap_clk" SIGIS="clk"/>
+    <PORT CLKFREQUENCY="250000000" DIR="I" NAME="ap_clk_2" SIGIS="clk"/>
+  </PORTS>
+  <BUSINTERFACES>
+    <BUSINTERFACE NAME="ap_clk" TYPE="SLAVE" VLNV="xilinx.com:signal:clock:1.0">
+      <PARAMETER NAME="ASSOCIATED_BUSIF" VALUE="s_axi_control:y"/>
+      <PARAMETER NAME="FREQ_HZ" VALUE="1e+08"/>
+      <PORTMAPS><PORTMAP LOGICAL="CLK" PHYSICAL="ap_clk"/></PORTMAPS>
+    </BUSINTERFACE>
+    <BUSINTERFACE NAME="s_axi_control" TYPE="SLAVE" VLNV="xilinx.com:interface:aximm:1.0"/>
+    <BUSINTERFACE NAME="x" TYPE="TARGET" VLNV="xilinx.com:interface:axis:1.0">
+      <PARAMETER NAME="FREQ_HZ" VALUE="250000000"/>
+    </BUSINTERFACE>
+    <BUSINTERFACE NAME="y" TYPE="INITIATOR" VLNV="xilinx.com:interface:axis:1.0">
+      <PARAMETER NAME="FREQ_HZ" VALUE="250000000"/>
+    </BUSINTERFACE>
+    <BUSINTERFACE NAME="z" TYPE="INITIATOR" VLNV="xilinx.com:interface:axis:1.0">
+      <PARAMETER NAME="FREQ_HZ" VALUE="50000000"/>
+    </BUSINTERFACE>
+  </BUSINTERFACES>
+</MODULE>
+"""
+
+
+@pytest.fixture(autouse=True)
+def picosecond_precision(monkeypatch):
+    monkeypatch.setattr(cocotb.utils, "_get_simulator_precision", lambda: -12)
+
+
+def test_clock_period_is_even_whole_steps():
+    assert CocotbPynqClock("clk", None, 100000000).period == 10000
+    # 6666.7ps rounds to 6667, then up to the next even step count
+    assert CocotbPynqClock("clk", None, 150000000).period == 6668
+    assert CocotbPynqClock("clk", None, 10 ** 13).period == 2
+    assert CocotbPynqClock("clk", None, 250000000).cycles_to_seconds(500) == pytest.approx(2e-6)
+
+
+def test_clocks_and_bus_clocks_from_hwh():
+    module = HwhModule(ElementTree.fromstring(MODULE))
+    cpdut = CocotbPynqDut.__new__(CocotbPynqDut)
+    cpdut.dut = SimpleNamespace(ap_clk="ap_clk handle", ap_clk_2="ap_clk_2 handle")
+    cpdut.prefix = ""
+    cpdut.clocks = cpdut._find_clocks(module)
+    assert {name: (clock.signal, clock.freq_hz) for name, clock in cpdut.clocks.items()} == {
+        "ap_clk": ("ap_clk handle", 100000000), "ap_clk_2": ("ap_clk_2 handle", 250000000)}
+    bus_clocks = {bus_interface.name: cpdut._bus_clock(module, bus_interface).name
+                  for bus_interface in module.bus_interfaces if bus_interface.vlnv.startswith("xilinx.com:interface")}
+    # ASSOCIATED_BUSIF wins over FREQ_HZ; an unmatched frequency falls back to the main clock
+    assert bus_clocks == {"s_axi_control": "ap_clk", "x": "ap_clk_2", "y": "ap_clk", "z": "ap_clk"}
@@ -0,0 +1,41 @@
+from pathlib import Path
+from xml.etree import ElementTree
+
+from cocotbpynq import hwh
+from cocotbpynq.hwh import AddressMap, HwhMemRange, is_simulated_module, load_hwh
+
+SAMPLE_HWH = str(Path(__file__).parents[1] / "src" / "cocotbpynq" / "sample" / "sample.hwh")
+
+
+def memrange(instance, base, high):
+    return HwhMemRange(ElementTree.Element("MEMRANGE", INSTANCE=instance, BASEVALUE=hex(base), HIGHVALUE=hex(high)))
+
+
+def test_address_map_resolves_ranges():
+    address_map = AddressMap([memrange("b", 0x2000, 0x2FFF), memrange("a", 0x1000, 0x1FFF)])
+    assert address_map.resolve(0x1000).instance == "a"
+    assert address_map.resolve(0x1FFC, 4).instance == "a"
+    assert address_map.resolve(0x2800).instance == "b"
+    assert address_map.resolve(0x1FFE, 4) is None
+    assert address_map.resolve(0x0FFF) is None
+    assert address_map.resolve(0x3000) is None
+
+
+def test_sample_design_model_and_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("COCOTBPYNQ_CACHE_DIR", str(tmp_path))
+    # Parsed and cached, then read back from the cache by a fresh process
+    for _ in range(2):
+        monkeypatch.setattr(hwh, "_loaded", {})
+        design = load_hwh(SAMPLE_HWH)
+        assert len(list(tmp_path.glob("*.pickle"))) == 1
+        assert design.module_of_type("poly").instance == "poly_eval_poly_0"
+        assert design.address_map.resolve(0x43C10010).instance == "poly_eval_poly_0"
+        assert design.address_map.resolve(0x40400030).slave_bus_interface == "S_AXI_LITE"
+        assert len(design.module("poly_eval_axi_dma").find_addressblock("Reg").registers) == 19
+
+
+def test_simulated_modules():
+    design = load_hwh(SAMPLE_HWH, use_cache=False)
+    assert [module.instance for module in design.modules.values() if is_simulated_module(module)] == ["poly_eval_poly_0"]
+    assert is_simulated_module(design.module("poly_eval_axi_dma"), "axi_dma")
+    assert not is_simulated_module(design.module("poly_eval_axi_dma"), "poly")
@@ -0,0 +1,77 @@
+from cocotbpynq.hwh import parse_hwh
+from cocotbpynq.interrupt import _interrupt_sources
+
+# Two kernels' interrupts through an xlconcat into an axi_intc, whose irq drives the PS
+HWH = """<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+<EDKSYSTEM>
+  <MODULES>
+    <MODULE FULLNAME="/processing_system7_0" INSTANCE="processing_system7_0" MODTYPE="processing_system7" VLNV="xilinx.com:ip:processing_system7:5.5">
+      <PORTS>
+        <PORT DIR="I" NAME="IRQ_F2P" SENSITIVITY="LEVEL_HIGH" SIGIS="INTERRUPT">
+          <CONNECTIONS><CONNECTION INSTANCE="intc" PORT="irq"/></CONNECTIONS>
+        </PORT>
+      </PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/intc" INSTANCE="intc" MODTYPE="axi_intc" VLNV="xilinx.com:ip:axi_intc:4.1">
+      <PORTS>
+        <PORT DIR="I" NAME="intr" SENSITIVITY="LEVEL_HIGH" SIGIS="INTERRUPT">
+          <CONNECTIONS><CONNECTION INSTANCE="concat" PORT="dout"/></CONNECTIONS>
+        </PORT>
+        <PORT DIR="O" NAME="irq" SENSITIVITY="LEVEL_HIGH" SIGIS="INTERRUPT">
+          <CONNECTIONS><CONNECTION INSTANCE="processing_system7_0" PORT="IRQ_F2P"/></CONNECTIONS>
+        </PORT>
+      </PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/concat" INSTANCE="concat" MODTYPE="xlconcat" VLNV="xilinx.com:ip:xlconcat:2.1">
+      <PORTS>
+        <PORT DIR="I" NAME="In0" SIGIS="undef">
+          <CONNECTIONS><CONNECTION INSTANCE="k0" PORT="interrupt"/></CONNECTIONS>
+        </PORT>
+        <PORT DIR="I" NAME="In1" SIGIS="undef">
+          <CONNECTIONS><CONNECTION INSTANCE="k1" PORT="interrupt"/></CONNECTIONS>
+        </PORT>
+        <PORT DIR="I" NAME="In2" SIGIS="undef">
+          <CONNECTIONS><CONNECTION INSTANCE="k1" PORT="ap_done"/></CONNECTIONS>
+        </PORT>
+        <PORT DIR="O" NAME="dout" SIGIS="undef">
+          <CONNECTIONS><CONNECTION INSTANCE="intc" PORT="intr"/></CONNECTIONS>
+        </PORT>
+      </PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/k0" INSTANCE="k0" MODTYPE="k0" VLNV="xilinx.com:hls:k0:1.0">
+      <PORTS>
+        <PORT DIR="O" NAME="interrupt" SENSITIVITY="LEVEL_HIGH" SIGIS="INTERRUPT">
+          <CONNECTIONS><CONNECTION INSTANCE="concat" PORT="In0"/></CONNECTIONS>
+        </PORT>
+      </PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/k1" INSTANCE="k1" MODTYPE="k1" VLNV="xilinx.com:module_ref:k1:1.0">
+      <PORTS>
+        <PORT DIR="O" NAME="interrupt" SENSITIVITY="LEVEL_LOW" SIGIS="INTERRUPT">
+          <CONNECTIONS><CONNECTION INSTANCE="concat" PORT="In1"/></CONNECTIONS>
+        </PORT>
+        <PORT DIR="O" NAME="ap_done" SIGIS="undef">
+          <CONNECTIONS><CONNECTION INSTANCE="concat" PORT="In2"/></CONNECTIONS>
+        </PORT>
+      </PORTS>
+    </MODULE>
+  </MODULES>
+</EDKSYSTEM>
+"""
+
+
+def sources(tmp_path, instance, port_name):
+    hwh_name = tmp_path / "design.hwh"
+    hwh_name.write_text(HWH)
+    design = parse_hwh(str(hwh_name))
+    return [(module.instance, port.name) for module, port in _interrupt_sources(design, instance, port_name, set())]
+
+
+def test_pin_resolves_through_axi_intc_and_xlconcat(tmp_path):
+    assert sources(tmp_path, "processing_system7_0", "IRQ_F2P") == [("k0", "interrupt"), ("k1", "interrupt")]
+    assert sources(tmp_path, "intc", "irq") == [("k0", "interrupt"), ("k1", "interrupt")]
+
+
+def test_kernel_pin_is_its_own_source(tmp_path):
+    assert sources(tmp_path, "k1", "interrupt") == [("k1", "interrupt")]
+    assert sources(tmp_path, "k1", "ap_done") == []
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from cocotbpynq.mmio import _write_words_of
+
+
+def test_write_words_of_blocks():
+    assert _write_words_of(0x10, 5) == [5]
+    assert _write_words_of(0x10, bytes([1, 0, 0, 0, 2, 0, 0, 0])) == [1, 2]
+    assert _write_words_of(0x10, np.array([[1, 2], [3, 4]], dtype=np.uint32)) == [1, 2, 3, 4]
+    assert _write_words_of(0, np.array([1 << 32 | 7], dtype="<u8")) == [7, 1]
+    assert _write_words_of(0, np.arange(6, dtype=np.uint32)[::2]) == [0, 2, 4]
+    with pytest.raises(MemoryError):
+        _write_words_of(0x12, 1)
+    with pytest.raises(MemoryError):
+        _write_words_of(0, bytes(6))
+    with pytest.raises(ValueError):
+        _write_words_of(-4, 1)
+    with pytest.raises(ValueError):
+        _write_words_of(0, [1, 2])
+
+
+def test_axi_lite_master_in_simulation(simulate):
+    simulate("axi_lite_tests")
+
+
+def test_bulk_register_access_in_simulation(simulate):
+    simulate("bulk_tests")
+
+
+def test_async_api_in_simulation(simulate):
+    simulate("async_tests")
+
+
+def test_backdoor_in_simulation(simulate):
+    simulate("backdoor_tests")
@@ -0,0 +1,89 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from cocotbpynq import overlay
+from cocotbpynq.dma import DMA
+from cocotbpynq.hwh import load_hwh, parse_hwh
+from cocotbpynq.overlay import DefaultIP, HierarchyObject, Overlay, SimulatedDesign
+
+SAMPLE_HWH = str(Path(__file__).parents[1] / "src" / "cocotbpynq" / "sample" / "sample.hwh")
+
+# Two instances of HLS kernel k and one of kernel other
+HWH = """<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+<EDKSYSTEM>
+  <MODULES>
+    <MODULE FULLNAME="/k_0" INSTANCE="k_0" MODTYPE="k" VLNV="xilinx.com:hls:k:1.0">
+      <PORTS><PORT DIR="I" NAME="ap_clk" SIGIS="clk"/></PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/k_1" INSTANCE="k_1" MODTYPE="k" VLNV="xilinx.com:hls:k:1.0">
+      <PORTS><PORT DIR="I" NAME="ap_clk" SIGIS="clk"/></PORTS>
+    </MODULE>
+    <MODULE FULLNAME="/other_0" INSTANCE="other_0" MODTYPE="other" VLNV="xilinx.com:hls:other:1.0">
+      <PORTS><PORT DIR="I" NAME="ap_clk" SIGIS="clk"/></PORTS>
+    </MODULE>
+  </MODULES>
+</EDKSYSTEM>
+"""
+
+
+class Top(SimpleNamespace):
+    def __init__(self, name, **handles):
+        super().__init__(**handles)
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class Dut:
+    """Stands in for CocotbPynqDut, recording where each instance was found"""
+
+    def __init__(self, handle, module, reset_on_init, prefix):
+        self.instance_name = module.instance
+        self.found = (str(handle), prefix)
+        self.bus_interfaces = {}
+
+
+def simulated(tmp_path, monkeypatch, top):
+    monkeypatch.setattr(overlay, "CocotbPynqDut", Dut)
+    hwh_name = tmp_path / "design.hwh"
+    hwh_name.write_text(HWH)
+    design = SimulatedDesign(parse_hwh(str(hwh_name)), top)
+    return {instance: cpdut.found for instance, cpdut in design.cpduts.items()}
+
+
+def test_ips_are_created_on_first_access():
+    design = SimpleNamespace(hwh_design=load_hwh(SAMPLE_HWH, use_cache=False), cpduts={}, bus_interfaces=dict)
+    hierarchy = HierarchyObject({"poly_0": "poly_eval_poly_0", "eval": {"axi_dma": "poly_eval_axi_dma"}}, design)
+    assert hierarchy._instantiated == {}
+    assert isinstance(hierarchy.poly_0, DefaultIP)
+    assert list(hierarchy._instantiated) == ["poly_0"]
+    assert hierarchy.poly_0 is hierarchy.poly_0
+    assert isinstance(hierarchy.eval.axi_dma, DMA)
+    assert "eval" in dir(hierarchy)
+    with pytest.raises(AttributeError, match="no IP or hierarchy named missing"):
+        hierarchy.missing
+
+
+def test_unset_slots_are_not_resolved_as_ips():
+    with pytest.raises(AttributeError):
+        HierarchyObject.__new__(HierarchyObject).hierarchy_dict
+    # Overlay.ip_dict is a slot of the subclass, read before __init__ assigned anything
+    with pytest.raises(AttributeError, match="ip_dict"):
+        Overlay.__new__(Overlay).ip_dict
+
+
+def test_instances_found_as_sub_instances_prefixed_ports_or_the_toplevel(tmp_path, monkeypatch):
+    # A wrapper holding k_0 as a sub-instance and exposing k_1's ports with a prefix
+    wrapper = Top("wrapper", k_0=Top("k_0"), k_1_ap_clk=None)
+    assert simulated(tmp_path, monkeypatch, wrapper) == {"k_0": ("k_0", ""), "k_1": ("wrapper", "k_1_")}
+    # The toplevel is only taken for an instance of its type when no other instance shares it
+    assert simulated(tmp_path, monkeypatch, Top("other")) == {"other_0": ("other", "")}
+    with pytest.raises(RuntimeError, match="No instance"):
+        simulated(tmp_path, monkeypatch, Top("k"))
+
+
+def test_session_reuse_in_simulation(simulate):
+    simulate("session_tests")
@@ -0,0 +1,52 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from cocotbpynq.profiler import Profiler
+
+CLOCK = SimpleNamespace(period=10000, freq_hz=100000000)
+
+
+def profiled(monkeypatch, steps):
+    """Profiler whose sim time (in 1ps steps) advances through `steps`, one value per read"""
+    module = sys.modules["cocotbpynq.profiler"]
+    times = iter(steps)
+    monkeypatch.setattr(module, "gst", lambda unit: next(times))
+    monkeypatch.setattr(module, "get_time_from_sim_steps", lambda steps, unit: steps / 1e6)
+    profiler = Profiler()
+    profiler.enable()
+    return profiler
+
+
+def test_cycles_are_split_into_beats_stall_and_overhead(monkeypatch):
+    profiler = profiled(monkeypatch, [0, 100000])
+    seen = []
+    profiler.listeners.append(seen.append)
+    txn = profiler.begin("dma_send", "poly_0.x", CLOCK, nbytes=16)
+    profiler.end(txn, 4, 3)
+    assert (txn.cycles, txn.beats, txn.dut_stall, txn.overhead) == (10, 4, 3, 3)
+    assert txn.board_time == 10 / 100000000
+    assert seen == [txn]
+    profiler.disable()
+    assert profiler.begin("dma_send", "poly_0.x", CLOCK) is None
+
+
+def test_summary_and_chrome_trace(monkeypatch, tmp_path):
+    profiler = profiled(monkeypatch, [0, 20000, 20000, 60000, 100000, 140000])
+    profiler.end(profiler.begin("mmio_write", "poly_0.s_axi_control", CLOCK, 0x10, 4), 2, 0)
+    profiler.end(profiler.begin("mmio_write", "poly_0.s_axi_control", CLOCK, 0x18, 4), 2, 1)
+    profiler.end(profiler.begin("dma_send", "poly_0.x", CLOCK, nbytes=16), 4, 0)
+    lines = profiler.summary().splitlines()
+    assert len(lines) == 4
+    writes = lines[2].split()
+    assert writes[:8] == ["poly_0.s_axi_control", "mmio_write", "2", "8", "6", "1", "1", "1.333"]
+    assert lines[3].split()[:3] == ["poly_0.x", "dma_send", "1"]
+    profiler.write_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [(event["pid"], event["tid"]) for event in events] == [
+        ("poly_0", "poly_0.s_axi_control"), ("poly_0", "poly_0.s_axi_control"), ("poly_0", "poly_0.x")]
+    assert [event["ts"] for event in events] == pytest.approx([0.0, 0.02, 0.1])
+    assert [event["dur"] for event in events] == pytest.approx([0.02, 0.04, 0.04])
+    assert events[1]["args"]["address"] == "0x18" and events[1]["args"]["dut_stall_cycles"] == 1
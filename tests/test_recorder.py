@@ -0,0 +1,30 @@
+import numpy as np
+
+from cocotbpynq.recorder import KINDS, TRACE_DTYPE, Recorder, Trace, load_trace
+
+
+def test_trace_round_trip(tmp_path):
+    rows = np.array([(KINDS.index("mmio_write"), 0, 0x10, 5, 10, 20, 0, 1, 0, 0, 0),
+                     (KINDS.index("dma_send"), 1, 0, 0, 30, 60, 2, 3, 1, 0, 10)], dtype=TRACE_DTYPE)
+    trace = Trace(rows, np.arange(10, dtype=np.uint8), ["poly_0.s_axi_control", "poly_0.x"])
+    trace.save(str(tmp_path / "trace.npz"))
+    loaded = load_trace(str(tmp_path / "trace.npz"))
+    assert len(loaded) == 2
+    assert np.array_equal(loaded.rows, rows) and loaded.rows.dtype == TRACE_DTYPE
+    assert loaded.channels == trace.channels
+    assert loaded.payload_of(1).tolist() == list(range(10))
+    assert loaded.payload_of(0).size == 0
+
+
+def test_disabled_recorder_records_nothing():
+    recorder = Recorder()
+    assert recorder.begin("mmio_read", "poly_0.s_axi_control", None) is None
+    recorder.end(None, 1, data=3)
+    assert len(recorder.trace()) == 0
+
+
+def test_trace_path_without_extension(tmp_path):
+    rows = np.array([(KINDS.index("mmio_read"), 0, 0x18, 2, 10, 20, 0, 1, 0, 0, 0)], dtype=TRACE_DTYPE)
+    Trace(rows, np.empty(0, np.uint8), ["poly_0.s_axi_control"]).save(tmp_path / "run")
+    assert [path.name for path in tmp_path.iterdir()] == ["run.npz"]
+    assert np.array_equal(load_trace(tmp_path / "run").rows, rows)
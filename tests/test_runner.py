@@ -0,0 +1,64 @@
+import os
+from pathlib import Path
+from xml.etree import ElementTree
+
+from cocotbpynq import runner
+from cocotbpynq.runner import _run_shard, build_key, merge_results
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_build_key_hashes_sources_by_content(tmp_path):
+    first = write(tmp_path / "a" / "top.v", "module top; endmodule")
+    moved = write(tmp_path / "b" / "top.v", "module top; endmodule")
+    key = build_key([first], "top", "verilator")
+    assert build_key([moved], "top", "verilator") == key
+    assert build_key([first], "top", "verilator", parameters={"W": 8}) != key
+    assert build_key([first], "other", "verilator") != key
+    assert build_key([first], "top", "verilator", waves=True) != key
+    write(moved, "module top(input a); endmodule")
+    assert build_key([moved], "top", "verilator") != key
+
+
+def test_build_key_hashes_include_directories(tmp_path):
+    source = write(tmp_path / "top.v", "`include \"defs.vh\"")
+    header = write(tmp_path / "inc" / "defs.vh", "`define W 8")
+    key = build_key([source], "top", "verilator", includes=[tmp_path / "inc"])
+    write(header, "`define W 16")
+    assert build_key([source], "top", "verilator", includes=[tmp_path / "inc"]) != key
+
+
+def test_merge_results_renames_suites_and_reports_crashes(tmp_path):
+    shard_xml = write(tmp_path / "s0" / "results.xml",
+                      '<testsuites><testsuite name="all"><testcase name="test_a"/></testsuite></testsuites>')
+    merged = merge_results([("s0", str(shard_xml), str(tmp_path / "s0")), ("s1", None, str(tmp_path / "s1"))],
+                           str(tmp_path / "results.xml"))
+    testsuites = ElementTree.parse(merged).getroot().findall("testsuite")
+    assert [testsuite.get("name") for testsuite in testsuites] == ["s0", "s1"]
+    assert testsuites[0].find("testcase").get("name") == "test_a"
+    failure = testsuites[1].find("testcase/failure")
+    assert str(tmp_path / "s1" / "sim.log") in failure.get("message")
+
+
+class ExitingRunner:
+    """Stands in for a cocotb runner whose simulator wrote results, then exited non-zero"""
+
+    def test(self, results_xml, **kwargs):
+        assert "PYTEST_CURRENT_TEST" not in os.environ
+        write(Path(results_xml), "<testsuites/>")
+        raise SystemExit("ERROR: Failed 1 of 1 tests.")
+
+
+def test_run_shard_keeps_results_of_failing_simulator(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, "get_runner", lambda simulator: ExitingRunner())
+    monkeypatch.setattr(runner.sys, "path", list(runner.sys.path))
+    # Restored after the test, as _run_shard clears it in the (here: this) worker process
+    monkeypatch.setenv("PYTEST_CURRENT_TEST", "test_runner.py::test (call)")
+    shard_dir = str(tmp_path / "shard")
+    job = {"test_module": "test_mod", "test_dir": str(tmp_path)}
+    assert _run_shard("verilator", tmp_path, "top", str(tmp_path), job, shard_dir, ("1ns", "1ps"), False) \
+        == os.path.join(shard_dir, "results.xml")
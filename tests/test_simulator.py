@@ -0,0 +1,65 @@
+import asyncio
+
+from cocotbpynq import simulator
+from cocotbpynq.simulator import PostedQueue
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.killed = False
+
+    def done(self):
+        return self.killed
+
+    def kill(self):
+        self.killed = True
+        self.coro.close()
+
+
+def started_tasks(monkeypatch):
+    tasks = []
+    monkeypatch.setattr(simulator.cocotb, "start_soon", lambda coro: tasks.append(Task(coro)) or tasks[-1])
+    return tasks
+
+
+def test_posted_work_runs_in_order(monkeypatch):
+    tasks = started_tasks(monkeypatch)
+    queue = PostedQueue()
+    order = []
+
+    async def work(n):
+        order.append(n)
+
+    for n in range(3):
+        queue.post(work(n))
+    # One coroutine runs the whole batch, started by the first post
+    assert len(tasks) == 1 and not queue._drained.is_set()
+    asyncio.run(tasks[0].coro)
+    assert order == [0, 1, 2] and queue._drained.is_set()
+    queue.post(work(3))
+    assert len(tasks) == 2
+    queue.reset()
+
+
+def test_reset_drops_work_left_by_a_failed_test(monkeypatch):
+    tasks = started_tasks(monkeypatch)
+    queue = PostedQueue()
+    ran = []
+
+    async def work():
+        ran.append(True)
+
+    first, second = work(), work()
+    queue.post(first)
+    queue.post(second)
+    queue.reset()
+    assert tasks[0].killed and queue._drained.is_set() and not queue._pending
+    assert first.cr_frame is None and second.cr_frame is None
+    queue.post(work())
+    asyncio.run(tasks[1].coro)
+    assert ran == [True]
+
+
+def test_posted_writes_in_simulation(simulate):
+    simulate("posted_tests")
@@ -0,0 +1,36 @@
+from cocotbpynq.waves import WaveCapture, _id_code
+
+
+class Handle:
+    def __init__(self, width, value=0):
+        self.width = width
+        self.value = value
+
+    def __len__(self):
+        return self.width
+
+
+def test_id_codes_are_unique_printable():
+    codes = [_id_code(i) for i in range(94 * 94 + 1)]
+    assert codes[0] == "!" and codes[93] == "~" and codes[94] == "!\""
+    assert len(set(codes)) == len(codes)
+    assert all(33 <= ord(char) <= 126 for code in codes for char in code)
+
+
+def test_samples_write_changes_only_and_reopen_appends(tmp_path):
+    path = tmp_path / "window.vcd"
+    capture = WaveCapture()
+    capture.enable(str(path), signals={"poly_0.valid": Handle(1), "poly_0.data": Handle(8)}, clock=Handle(1))
+    capture._open()
+    capture._write_sample(10, {"!": "1", "\"": "101"})
+    capture._write_sample(20, {"!": "1", "\"": "101"})
+    capture._write_sample(30, {"!": "0", "\"": "101"})
+    capture.close()
+    capture._open()
+    capture._write_sample(40, {"!": "0", "\"": "110"})
+    capture.close()
+    lines = path.read_text().splitlines()
+    assert lines.count("$enddefinitions $end") == 1
+    assert "$var wire 8 \" data $end" in lines
+    body = lines[lines.index("$enddefinitions $end") + 1:]
+    assert body == ["#10", "1!", "b101 \"", "#30", "0!", "#40", "b110 \""]